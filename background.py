@@ -0,0 +1,138 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Run a search on a worker thread, so whatever is drawing it never has to wait for it.
+
+The search runs on a copy of the grid taken when it starts (see grid.copy), so the grid can keep
+being edited while it runs without the search ever seeing half an edit - it finishes the search
+it started, on the grid as it was. Its cost, g, f and parent arrays end up in that copy, in
+search.grid, not in the grid it was started from.
+
+Progress comes back through a queue, search.messages, as it happens:
+    ('steps', steps)       a list of (node, nodes it reached for the first time) pairs, in order -
+                           the same steps search_steps hands out one at a time (see solver.py)
+    ('done', found, path)  the search is over. path is the cell indices from start to end, or []
+Nothing else is posted once a search is cancelled.
+
+pace says how fast to go. With pace = (count, interval) the worker runs count steps, posts them,
+and waits interval seconds before the next lot, so a search can still be watched a node at a
+time. With pace = None it runs flat out and posts whatever it has done every batch_time seconds.
+pace can be changed while the search is running, and cancel() stops it wherever it is - even
+in the middle of a wait. skip() runs the rest of the search flat out and holds its steps back
+until it's done, then posts them as one last batch right before 'done' - so whatever is drawing
+it jumps straight to the result without drawing anything in between.
+
+search.stats is live, so its counters can be read while the search runs. search_time only
+counts time spent searching, not time spent waiting on the pace.
+
+Usage:
+    from background import BackgroundSearch
+    search = BackgroundSearch(grid, (0, 0), (19, 19), 'astar', pace=None)
+    while True:
+        message = search.messages.get()
+        if message[0] == 'done':
+            break
+    print(message[1], len(message[2]), search.stats)
+
+    search.cancel()                  # to give up on a search part way through
+
+It's a thread rather than a process so the copy of the grid and the stats can be read straight
+from it. Searches are pure Python, so it shares the interpreter with whatever started it - the
+point is that the caller never blocks on it, not that the two run side by side.
+"""
+import queue
+import threading
+import time
+
+from solver import search_steps
+from stats import SearchStats
+
+# Steps run between checks for a cancel or a change of pace when there's no pace to wait on.
+CHUNK = 64
+
+
+class BackgroundSearch:
+    def __init__(self, grid, start, end, algorithm='bfs', diagonal_movement=False, pace=None, batch_time=1 / 60):
+        began = time.perf_counter()
+        self.version = grid.version
+        self.grid = grid.copy()
+        self.stats = SearchStats(algorithm, live=True)
+        # a bad query raises here, before there's a thread to raise it on.
+        self.steps = search_steps(self.grid, start, end, algorithm, diagonal_movement, self.stats)
+        self.stats.setup_time = time.perf_counter() - began
+        # what was searched for, to tell whether the answer still holds once it's done.
+        self.start = self.grid.index(*start)
+        self.end = self.grid.index(*end)
+        self.algorithm = algorithm
+        self.diagonal_movement = diagonal_movement
+        self.pace = pace
+        self.batch_time = batch_time
+        self.skipping = False
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+        # set by cancel() and skip(), so neither has to sit out the rest of a wait.
+        self.woken = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # Stop the search. Any steps it already posted are still in the queue.
+    def cancel(self):
+        self.cancelled.set()
+        self.woken.set()
+
+    # Finish the search as fast as it will go, and only post what it did once it's done.
+    def skip(self):
+        self.skipping = True
+        self.woken.set()
+
+    def running(self):
+        return self.thread.is_alive()
+
+    # Wait for the worker to stop, after it finishes or is cancelled.
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        posted = time.perf_counter()
+        found = None
+        while found is None:
+            skipping = self.skipping
+            pace = None if skipping else self.pace
+            began = time.perf_counter()
+            try:
+                for _ in range(CHUNK if pace is None else pace[0]):
+                    batch.append(next(self.steps))
+            except StopIteration as finished:
+                found = bool(finished.value)
+            self.stats.search_time += time.perf_counter() - began
+            if self.cancelled.is_set():
+                return
+            # a skipping search holds everything back for one last batch.
+            due = pace is not None or time.perf_counter() - posted > self.batch_time
+            if found is not None or (due and not skipping):
+                self.messages.put(('steps', batch))
+                batch = []
+                posted = time.perf_counter()
+            if found is None and pace is not None:
+                self.woken.wait(pace[1])
+                if self.cancelled.is_set():
+                    return
+
+        self.stats.found = found
+        began = time.perf_counter()
+        path = self._retrace() if found else []
+        self.stats.path_time = time.perf_counter() - began
+        self.messages.put(('done', found, path))
+
+    # Follow the previous nodes back from the end, as cell indices.
+    def _retrace(self):
+        parent = memoryview(self.grid.parent)
+        path = []
+        current = self.end
+        while current >= 0:
+            path.append(current)
+            current = parent[current]
+        path.reverse()
+        return path
@@ -0,0 +1,235 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Solve lots of (map, start, end, algorithm) jobs at once across a pool of worker processes.
+
+Jobs are JSON objects, one per line:
+    {"id": 7, "map": "maps/maze.txt", "start": [0, 0], "end": [19, 19], "algorithm": "astar", "diagonal": false}
+Only map, start and end are needed - algorithm defaults to astar, diagonal to false, and id to
+the job's line number. Maps are loaded with maps.py.
+
+A MovingAI scenario file (.scen) works as a job file too - every query in it becomes a job, with
+its map found next to the .scen file and the algorithm picked with --algorithm.
+
+Each map is loaded once, in this process, and written out to a scratch file as raw bytes (cells
+then weights). Jobs only carry the name of that file, and every worker memory-maps it the first
+time it sees it and searches the mapped file directly, so a map is never pickled and sent along with
+a job, and the workers all share one copy of it. Each worker keeps its last few maps' grids around.
+Jobs go out to the pool in chunks so the overhead of handing work to another process is paid
+once per chunk rather than once per job, and only a few chunks per worker are in flight at a
+time, so a huge job file is read as it goes instead of all up front.
+
+Results come back as soon as their chunk finishes - so in completion order, not job order -
+one JSON object per line with the job's id, status, path steps and cost, expansions and time.
+A job that can't be solved (a line that isn't JSON, a missing map, start or end, a position off
+the map, an unknown algorithm) gets an "error" instead, and the rest of the batch carries on.
+
+Usage:
+    python batch.py jobs.jsonl                       results to stdout
+    python batch.py jobs.jsonl --output out.jsonl    results to a file
+    cat jobs.jsonl | python batch.py -              jobs from stdin
+    python batch.py jobs.jsonl --workers 8 --chunk-size 64 --paths
+    python batch.py arena.map.scen --algorithm jps
+
+Or from Python, where run_batch takes any iterable of job dicts and yields results:
+    from batch import run_batch
+    for result in run_batch(jobs, workers=4):
+        print(result)
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from cache import LRUCache
+from grid import Grid
+from maps import load_map, load_scenarios
+from solver import solve
+
+# how many grids a worker keeps mapped in before dropping the least recently used one.
+WORKER_GRIDS = 8
+# grids this worker has already mapped in, by scratch file.
+_worker_grids = LRUCache(WORKER_GRIDS, 'grid')
+
+
+# Build a grid around a map's scratch file. The cells and weights are the read-only mapped file itself -
+# searches never write to them - so every worker shares the same pages of it instead of keeping its own
+# copy. Only the search arrays and links are the worker's own. Every job on this map in this worker reuses
+# the same grid, as long as it's one of the last few maps the worker used.
+def _worker_grid(path, width, height):
+    grid = _worker_grids.lookup(path)
+    if grid is None:
+        data = np.memmap(path, dtype=np.uint8, mode='r', shape=(2, width * height))
+        grid = Grid.from_arrays(width, height, data[0], data[1])
+        _worker_grids.store(path, grid)
+    return grid
+
+
+# The part of a result that just repeats the job.
+def _result(job):
+    return {'id': job['id'], 'map': job['map'], 'start': job['start'], 'end': job['end'], 'algorithm': job['algorithm']}
+
+
+# Runs in a worker. Solve one chunk of jobs and hand back a result for each.
+def _solve_chunk(chunk, include_path):
+    results = []
+    for job, (path, width, height) in chunk:
+        result = _result(job)
+        try:
+            grid = _worker_grid(path, width, height)
+            solved = solve(grid, tuple(job['start']), tuple(job['end']), job['algorithm'], job['diagonal'])
+        except (ValueError, TypeError, IndexError) as error:
+            result['error'] = str(error)
+            results.append(result)
+            continue
+        result.update({
+            'status': solved.status,
+            'path_steps': len(solved.path) - 1 if solved.status else None,
+            'path_cost': solved.path_cost if solved.status else None,
+            'expanded': solved.expanded,
+            'elapsed': solved.elapsed,
+        })
+        if include_path:
+            result['path'] = [list(position) for position in solved.path]
+        results.append(result)
+    return results
+
+
+# Fill in the optional parts of a job. Raises ValueError or TypeError for a job that can't be run.
+def _normalize(job, number):
+    if not isinstance(job, dict):
+        raise ValueError('job {} is not a JSON object'.format(number))
+    if 'error' in job:
+        raise ValueError(job['error'])
+    if 'map' not in job or 'start' not in job or 'end' not in job:
+        raise ValueError('job {} needs a map, start and end'.format(number))
+    return {
+        'id': job.get('id', number),
+        'map': job['map'],
+        'start': list(job['start']),
+        'end': list(job['end']),
+        'algorithm': job.get('algorithm', 'astar'),
+        'diagonal': bool(job.get('diagonal', False)),
+    }
+
+
+# Read jobs from a JSON lines file, skipping blank lines. A line that isn't JSON still becomes a job,
+# carrying the error, so it gets an error result like any other bad job.
+def read_jobs(job_file):
+    for number, line in enumerate(job_file):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as error:
+            job = {'error': 'line {} is not valid JSON: {}'.format(number + 1, error)}
+        if isinstance(job, dict):
+            job.setdefault('id', number)
+        yield job
+
+
+# Turn every query in a .scen file into a job. Map paths in a .scen are relative to the file itself.
+def read_scenarios(path, algorithm='astar'):
+    directory = os.path.dirname(path)
+    for number, scenario in enumerate(load_scenarios(path)):
+        yield {
+            'id': number,
+            'map': os.path.join(directory, scenario.map_path),
+            'start': list(scenario.start),
+            'end': list(scenario.end),
+            'algorithm': algorithm,
+        }
+
+
+# Solve every job across a pool of worker processes and yield the results in the order they finish.
+def run_batch(jobs, workers=None, chunk_size=32, include_path=False):
+    workers = workers or os.cpu_count() or 1
+    scratch = tempfile.mkdtemp(prefix='pathfinding-batch-')
+    # map reference -> (scratch file, width, height), or an error message if it couldn't be loaded.
+    shared = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            chunk = []
+            for number, job in enumerate(jobs):
+                # a bad job gets an error result, the rest of the batch carries on.
+                try:
+                    job = _normalize(job, number)
+                except (ValueError, TypeError) as error:
+                    yield {'id': job.get('id', number) if isinstance(job, dict) else number, 'error': str(error)}
+                    continue
+                if job['map'] not in shared:
+                    shared[job['map']] = _share_map(job['map'], scratch, len(shared))
+                if isinstance(shared[job['map']], str):
+                    yield dict(_result(job), error=shared[job['map']])
+                    continue
+                chunk.append((job, shared[job['map']]))
+                if len(chunk) < chunk_size:
+                    continue
+                pending.add(pool.submit(_solve_chunk, chunk, include_path))
+                chunk = []
+                # keep a few chunks per worker queued up, and hand back whatever finished in the meantime.
+                if len(pending) >= workers * 4:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        for result in future.result():
+                            yield result
+            if chunk:
+                pending.add(pool.submit(_solve_chunk, chunk, include_path))
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    for result in future.result():
+                        yield result
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+# Load a map and write its cells and weights to a scratch file the workers can map in.
+def _share_map(reference, scratch, number):
+    try:
+        grid = load_map(reference)
+    except (OSError, ValueError) as error:
+        return 'could not load map {}: {}'.format(reference, error)
+    path = os.path.join(scratch, '{}.cells'.format(number))
+    np.stack([grid.cells, grid.weights]).tofile(path)
+    return path, grid.width, grid.height
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve a file of pathfinding jobs across a pool of processes.')
+    parser.add_argument('jobs', help='JSON lines file of jobs, a .scen file, or - for stdin')
+    parser.add_argument('--output', help='write results to this file instead of stdout')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=32, help='jobs handed to a worker at a time')
+    parser.add_argument('--paths', action='store_true', help='include every path in the results')
+    parser.add_argument('--algorithm', default='astar', help='algorithm for the queries in a .scen file')
+    args = parser.parse_args(argv)
+
+    job_file = None
+    if args.jobs.lower().endswith('.scen'):
+        jobs = read_scenarios(args.jobs, args.algorithm)
+    else:
+        job_file = sys.stdin if args.jobs == '-' else open(args.jobs)
+        jobs = read_jobs(job_file)
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in run_batch(jobs, args.workers, args.chunk_size, args.paths):
+            output.write(json.dumps(result) + '\n')
+    finally:
+        if job_file is not None and job_file is not sys.stdin:
+            job_file.close()
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
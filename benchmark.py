@@ -0,0 +1,353 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Benchmark the algorithms headlessly across a seeded corpus of maps.
+
+Every map in the corpus is a random grid of some size and obstacle density, with a handful of
+start/end scenarios picked from its open cells. Each scenario is run through BFS, DFS, Dijkstra's,
+A*, A* and Jump Point Search moving diagonally as well, Jump Point Search, bidirectional BFS and A*,
+the wavefront BFS and hierarchical A* (HPA*), and for every run we record the wall time, nodes expanded,
+peak frontier size, path steps and peak memory. Expansions are also reported relative to plain A*
+on the same scenario. The saved runs also have the rest of the search counters from stats.py -
+pushes, pops, decrease keys, cells touched and the time spent in each phase. HPA* builds its
+clusters once per map before its queries run, and its runs record that build time too.
+
+Usage:
+    python benchmark.py                                  run the default corpus and print a summary table
+    python benchmark.py --output results.json            also save every run as JSON
+    python benchmark.py --csv results.csv                also save every run as CSV, one row each
+    python benchmark.py --baseline results.json          compare against an earlier run, exit 1 on regressions
+    python benchmark.py --save-corpus corpus.json        save the generated maps so they can be reloaded
+    python benchmark.py --corpus corpus.json             run against a saved corpus instead of generating one
+    python benchmark.py --startup                        time a cold start of the solver and the visualizer instead
+
+The same seed always generates the same corpus, so two runs with the same arguments are comparable.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from grid import Grid
+from hierarchical import HierarchicalPlanner
+from solver import solve
+
+# What gets run on every scenario - (name in the results, solver algorithm, diagonal movement).
+# The diagonal runs are 8-connected, so their paths are cheaper and their expansions are worth comparing with astar's.
+RUNS = (
+    ('bfs', 'bfs', False),
+    ('dfs', 'dfs', False),
+    ('dijkstra', 'dijkstra', False),
+    ('astar', 'astar', False),
+    ('astar-diagonal', 'astar', True),
+    ('jps', 'jps', False),
+    ('jps-diagonal', 'jps', True),
+    ('bibfs', 'bibfs', False),
+    ('biastar', 'biastar', False),
+    ('wavefront', 'wavefront', False),
+    ('hpastar', 'hpastar', False),
+)
+
+
+# Make one random map. Rows are strings of '0' (blank) and '1' (obstacle) so the corpus saves nicely as JSON.
+def generate_map(size, density, scenarios, seed):
+    rng = random.Random(seed)
+    rows = [''.join('1' if rng.random() < density else '0' for _ in range(size)) for _ in range(size)]
+    open_cells = [(x, y) for x in range(size) for y in range(size) if rows[x][y] == '0']
+    pairs = []
+    if len(open_cells) >= 2:
+        for _ in range(scenarios):
+            start, end = rng.sample(open_cells, 2)
+            pairs.append({'start': list(start), 'end': list(end)})
+    return {
+        'name': '{0}x{0}-{1:.2f}-{2}'.format(size, density, seed),
+        'width': size,
+        'height': size,
+        'density': density,
+        'seed': seed,
+        'rows': rows,
+        'scenarios': pairs,
+    }
+
+
+def generate_corpus(sizes, densities, scenarios, seed):
+    corpus = []
+    for size in sizes:
+        for density in densities:
+            # every map gets its own seed so adding a size or density never changes the other maps.
+            map_seed = seed * 1000003 + size * 101 + int(density * 1000)
+            corpus.append(generate_map(size, density, scenarios, map_seed))
+    return corpus
+
+
+def build_grid(game_map):
+    return Grid.from_rows([[int(cell) for cell in row] for row in game_map['rows']])
+
+
+# Run one algorithm on one scenario.
+def run_one(grid, scenario, algorithm, diagonal_movement, repeat):
+    start = tuple(scenario['start'])
+    end = tuple(scenario['end'])
+    return measure(lambda: solve(grid, start, end, algorithm, diagonal_movement), repeat)
+
+
+# Run one scenario through the hierarchical planner. Its clusters are built once per map before any of
+# the scenarios run, so this only times the queries - the build time goes in the record on its own.
+def run_hierarchical(planner, scenario, repeat):
+    start = tuple(scenario['start'])
+    end = tuple(scenario['end'])
+    record = measure(lambda: planner.find_path(start, end), repeat)
+    record['build_time'] = planner.build_time
+    return record
+
+
+# Run a search repeat times and keep the fastest, then once more under tracemalloc for its peak memory.
+# The timing runs are kept separate from the memory run, since tracing every allocation slows the
+# search down a lot. find is anything that runs the search and hands back its SearchResult.
+def measure(find, repeat):
+    times = []
+    for _ in range(repeat):
+        result = find()
+        times.append(result.elapsed)
+
+    tracemalloc.start()
+    find()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result_record(result, min(times), peak_memory)
+
+
+# The numbers a run's record keeps from its SearchResult.
+def result_record(result, elapsed, peak_memory):
+    return {
+        'status': result.status,
+        'elapsed': elapsed,
+        'expanded': result.expanded,
+        'peak_frontier': result.peak_frontier,
+        'pushes': result.stats.pushes,
+        'pops': result.stats.pops,
+        'decrease_keys': result.stats.decrease_keys,
+        'touched': result.stats.touched,
+        'setup_time': result.stats.setup_time,
+        'search_time': result.stats.search_time,
+        'path_time': result.stats.path_time,
+        'path_steps': len(result.path) - 1 if result.status else None,
+        'path_cost': result.path_cost if result.status else None,
+        'peak_memory': peak_memory,
+    }
+
+
+def run_corpus(corpus, repeat):
+    runs = []
+    for game_map in corpus:
+        grid = build_grid(game_map)
+        planner = HierarchicalPlanner(grid)
+        planner.build()
+        for number, scenario in enumerate(game_map['scenarios']):
+            scenario_runs = []
+            for name, algorithm, diagonal_movement in RUNS:
+                record = {
+                    'map': game_map['name'],
+                    'width': game_map['width'],
+                    'height': game_map['height'],
+                    'density': game_map['density'],
+                    'scenario': number,
+                    'start': scenario['start'],
+                    'end': scenario['end'],
+                    'algorithm': name,
+                }
+                if algorithm == 'hpastar':
+                    record.update(run_hierarchical(planner, scenario, repeat))
+                else:
+                    record.update(run_one(grid, scenario, algorithm, diagonal_movement, repeat))
+                scenario_runs.append(record)
+            # expansions as a fraction of plain A*'s on the same scenario.
+            astar_expanded = next((run['expanded'] for run in scenario_runs if run['algorithm'] == 'astar'), 0)
+            for run in scenario_runs:
+                run['expanded_vs_astar'] = run['expanded'] / astar_expanded if astar_expanded else None
+            runs.extend(scenario_runs)
+        planner.close()
+    return runs
+
+
+# Average every run of an algorithm on maps of the same size and density.
+def summarize(runs):
+    groups = {}
+    for run in runs:
+        key = (run['width'], run['height'], run['density'], run['algorithm'])
+        groups.setdefault(key, []).append(run)
+    rows = []
+    for (width, height, density, algorithm), group in groups.items():
+        solved = [run for run in group if run['status']]
+        ratios = [run['expanded_vs_astar'] for run in group if run.get('expanded_vs_astar') is not None]
+        rows.append({
+            'size': '{}x{}'.format(width, height),
+            'density': density,
+            'algorithm': algorithm,
+            'runs': len(group),
+            'solved': len(solved),
+            'mean_ms': 1000 * sum(run['elapsed'] for run in group) / len(group),
+            'mean_expanded': sum(run['expanded'] for run in group) / len(group),
+            'mean_touched': sum(run['touched'] for run in group) / len(group),
+            'mean_expanded_vs_astar': sum(ratios) / len(ratios) if ratios else None,
+            'mean_peak_frontier': sum(run['peak_frontier'] for run in group) / len(group),
+            'mean_path_steps': sum(run['path_steps'] for run in solved) / len(solved) if solved else None,
+            'max_peak_kib': max(run['peak_memory'] for run in group) / 1024,
+        })
+    return rows
+
+
+def print_table(summary):
+    header = '{:>9} {:>7} {:>15} {:>7} {:>10} {:>12} {:>8} {:>12} {:>10} {:>10} {:>10}'.format(
+        'size', 'density', 'algorithm', 'solved', 'mean ms', 'expanded', 'vs A*', 'touched', 'frontier', 'steps',
+        'peak KiB')
+    print(header)
+    print('-' * len(header))
+    for row in summary:
+        path_steps = '-' if row['mean_path_steps'] is None else '{:.1f}'.format(row['mean_path_steps'])
+        versus = '-' if row.get('mean_expanded_vs_astar') is None else '{:.3f}'.format(row['mean_expanded_vs_astar'])
+        print('{:>9} {:>7.2f} {:>15} {:>7} {:>10.3f} {:>12.1f} {:>8} {:>12.1f} {:>10.1f} {:>10} {:>10.1f}'.format(
+            row['size'], row['density'], row['algorithm'], '{}/{}'.format(row['solved'], row['runs']),
+            row['mean_ms'], row['mean_expanded'], versus, row['mean_touched'], row['mean_peak_frontier'],
+            path_steps, row['max_peak_kib']))
+
+
+# Line runs up with the baseline by map, scenario and algorithm and list everything that got worse.
+# Timing has to be slower by more than the tolerance and by at least min_delta seconds to count, so tiny
+# searches don't flag timer noise. Everything else is deterministic, so any increase in expansions or any
+# change in path steps or status is reported.
+def compare(runs, baseline_runs, tolerance, min_delta):
+    baseline = {(run['map'], run['scenario'], run['algorithm']): run for run in baseline_runs}
+    regressions = []
+    matched = 0
+    for run in runs:
+        key = (run['map'], run['scenario'], run['algorithm'])
+        old = baseline.get(key)
+        if old is None:
+            continue
+        matched += 1
+        label = '{} scenario {} {}'.format(*key)
+        if run['status'] != old['status'] or run['path_steps'] != old['path_steps']:
+            regressions.append('{}: path steps {} -> {}'.format(label, old['path_steps'], run['path_steps']))
+        if run['expanded'] > old['expanded']:
+            regressions.append('{}: expanded {} -> {}'.format(label, old['expanded'], run['expanded']))
+        slower = run['elapsed'] - old['elapsed']
+        if run['elapsed'] > old['elapsed'] * (1 + tolerance) and slower > min_delta:
+            regressions.append('{}: {:.3f} ms -> {:.3f} ms'.format(label, 1000 * old['elapsed'], 1000 * run['elapsed']))
+    return matched, regressions
+
+
+# What a fresh interpreter has to do before it can answer a query - just the solver, the solver plus a search
+# on the default 20x20 grid, and importing the visualizer (which shouldn't open a window or load anything).
+STARTUP = (
+    ('import solver', 'import solver'),
+    ('first search', 'from grid import Grid; from solver import solve; solve(Grid(20, 20), (0, 0), (19, 19), "astar")'),
+    ('import main', 'import main'),
+)
+
+
+# Time each startup in a new process, keeping the fastest of repeat runs. The empty interpreter's own
+# startup is measured the same way and taken off, so what's left is what this project costs.
+def measure_startup(repeat):
+    # run from the project folder, so the modules import wherever the benchmark was started from.
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def fastest(code):
+        times = []
+        for _ in range(repeat):
+            began = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.DEVNULL, cwd=here)
+            times.append(time.perf_counter() - began)
+        return min(times)
+
+    interpreter = fastest('pass')
+    return [(name, fastest(code) - interpreter) for name, code in STARTUP]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pathfinding algorithms on a seeded map corpus.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32, 64, 128, 256], help='map sizes to generate')
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.0, 0.1, 0.2, 0.3],
+                        help='obstacle densities to generate')
+    parser.add_argument('--scenarios', type=int, default=5, help='start/end pairs per map')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the generated corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='timing runs per scenario, the fastest one is kept')
+    parser.add_argument('--corpus', help='load the corpus from this JSON file instead of generating it')
+    parser.add_argument('--save-corpus', help='save the corpus to this JSON file')
+    parser.add_argument('--output', help='save every run to this JSON file')
+    parser.add_argument('--csv', help='save every run to this CSV file')
+    parser.add_argument('--baseline', help='compare against the runs in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='how much slower than the baseline a run can be before it counts as a regression')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore slowdowns smaller than this many milliseconds')
+    parser.add_argument('--startup', action='store_true', help='time a cold start instead of running the corpus')
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        for name, elapsed in measure_startup(max(args.repeat, 5)):
+            print('{:>15} {:>10.1f} ms'.format(name, 1000 * elapsed))
+        return 0
+
+    if args.corpus:
+        with open(args.corpus) as corpus_file:
+            corpus = json.load(corpus_file)
+    else:
+        corpus = generate_corpus(args.sizes, args.densities, args.scenarios, args.seed)
+    if args.save_corpus:
+        with open(args.save_corpus, 'w') as corpus_file:
+            json.dump(corpus, corpus_file)
+
+    runs = run_corpus(corpus, args.repeat)
+    summary = summarize(runs)
+    print_table(summary)
+
+    if args.output:
+        results = {
+            'meta': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'seed': args.seed,
+                'repeat': args.repeat,
+                'corpus': args.corpus,
+            },
+            'runs': runs,
+            'summary': summary,
+        }
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as csv_file:
+            # start and end are lists, which CSV has no column type for - write them as "x y".
+            # only the HPA* runs have a build time, so the columns are every key any run has.
+            fieldnames = list(dict.fromkeys(key for run in runs for key in run))
+            writer = csv.DictWriter(csv_file, fieldnames=fieldnames, restval='')
+            writer.writeheader()
+            for run in runs:
+                writer.writerow(dict(run, start='{} {}'.format(*run['start']), end='{} {}'.format(*run['end'])))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline_runs = json.load(baseline_file)['runs']
+        matched, regressions = compare(runs, baseline_runs, args.tolerance, args.min_delta_ms / 1000)
+        print()
+        print('compared {} runs against {}'.format(matched, args.baseline))
+        for regression in regressions:
+            print('  REGRESSION ' + regression)
+        if regressions:
+            return 1
+        print('  no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+A bounded cache of finished searches, so asking the same question about the same map twice
+doesn't run the search twice.
+
+Results are keyed by (grid version, start, end, algorithm, diagonal movement). The grid
+gets a new version whenever an obstacle or terrain weight changes (see grid.py), so an edit makes
+every cached result for the old map unreachable without having to go looking for them - they
+just age out. The least recently used result is dropped once the cache is full.
+
+Usage:
+    from cache import PathCache
+    from solver import solve
+    cache = PathCache(maxsize=256)
+    result = solve(grid, (0, 0), (19, 19), algorithm='astar', cache=cache)
+    print(cache.hits, cache.misses)
+
+A cache hit hands back the same SearchResult as the first search and leaves the grid's search
+arrays alone, so read the path off the result rather than the grid's previous nodes.
+"""
+from collections import OrderedDict
+
+
+# A dict that only keeps the maxsize entries used most recently, and counts how often lookups found
+# something. PathCache is one; distance.py's DistanceFields and batch.py's worker grids use it too.
+# `what` is what it holds, for the error when maxsize is too small.
+class LRUCache:
+    def __init__(self, maxsize, what='entry'):
+        if maxsize < 1:
+            raise ValueError('cache needs room for at least 1 {}, got {}'.format(what, maxsize))
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # The entry for this key, or None. Counts a hit or a miss either way.
+    def lookup(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    # Keep this entry, dropping the least recently used one if that's one too many.
+    def store(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return '{}(size={}, maxsize={}, hits={}, misses={})'.format(
+            type(self).__name__, len(self.entries), self.maxsize, self.hits, self.misses)
+
+
+class PathCache(LRUCache):
+    def __init__(self, maxsize=128):
+        super().__init__(maxsize, 'result')
+
+    @staticmethod
+    def key(grid, start, end, algorithm, diagonal_movement=False):
+        return (grid.version, tuple(start), tuple(end), algorithm, bool(diagonal_movement))
+
+    # The cached result for this question, or None. Counts a hit or a miss either way.
+    def get(self, grid, start, end, algorithm, diagonal_movement=False):
+        return self.lookup(self.key(grid, start, end, algorithm, diagonal_movement))
+
+    def put(self, grid, start, end, algorithm, diagonal_movement, result):
+        self.store(self.key(grid, start, end, algorithm, diagonal_movement), result)
@@ -0,0 +1,144 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Distance fields - one search from the end node that answers "how far is it to the end?" for
+every cell at once, for when lots of searches all head to the same place.
+
+Building a field runs Dijkstra's backwards from the goal (plain BFS when every cell costs the
+same). Walking backwards, stepping from a cell into its neighbor costs the neighbor's weight, so
+a cell's distance is exactly the path cost a forward search from it would find. After that:
+    field.reachable(start)   - O(1), just a lookup
+    field.distance(start)    - O(1), the cost of the cheapest path to the goal
+    field.path(start)        - O(path length), keep stepping to the neighbor the distance says
+                               is on the way down, until we reach the goal
+
+Distances are kept in the smallest unsigned NumPy type that holds the biggest one, with that
+type's largest value meaning unreachable, so a field is 2 bytes a cell on most maps.
+
+Usage:
+    from distance import DistanceFields
+    fields = DistanceFields(maxsize=8)
+    field = fields.get(grid, (19, 19))       # built once per grid version and goal
+    print(field.reachable((0, 0)), field.distance((0, 0)), field.path((0, 0)))
+
+A field is for the grid as it was when it was built. DistanceFields keys them by grid version
+(see grid.py) and goal, so after an edit get() builds a fresh one.
+"""
+import heapq
+import time
+from collections import deque
+
+import numpy as np
+
+from cache import LRUCache
+
+
+class DistanceField:
+    def __init__(self, grid, goal):
+        began = time.perf_counter()
+        self.width = grid.width
+        self.version = grid.version
+        self.goal = grid.index(*goal)
+        self.links = grid.links.copy()
+        self.weights = grid.weights.copy()
+        self.neighbor_table = grid.neighbor_table
+
+        distance = np.full(grid.size, -1, dtype=np.int64)
+        if grid.cells[self.goal] != 1:
+            if np.count_nonzero(grid.weight_counts) == 1:
+                self._breadth_first(distance, grid.min_weight())
+            else:
+                self._dijkstra(distance)
+        # the smallest type that fits, with its largest value kept back to mean unreachable.
+        largest = int(distance.max())
+        dtype = np.uint16 if largest < np.iinfo(np.uint16).max else np.uint32
+        self.unreachable = int(np.iinfo(dtype).max)
+        self.distances = np.where(distance < 0, self.unreachable, distance).astype(dtype)
+        self.reached = int(np.count_nonzero(distance >= 0))
+        self.elapsed = time.perf_counter() - began
+
+    # Every cell costs the same, so the order cells are reached in is already the order of their distance.
+    def _breadth_first(self, distance, weight):
+        links = memoryview(self.links)
+        neighbor_table = self.neighbor_table
+        steps = [-1] * len(distance)
+        steps[self.goal] = 0
+        queue = deque([self.goal])
+        while queue:
+            current = queue.popleft()
+            for offset in neighbor_table[links[current]]:
+                neighbor = current + offset
+                if steps[neighbor] < 0:
+                    steps[neighbor] = steps[current] + 1
+                    queue.append(neighbor)
+        steps = np.asarray(steps, dtype=np.int64)
+        distance[:] = np.where(steps < 0, -1, steps * weight)
+
+    # Dijkstra's from the goal. Coming from a neighbor into the current cell costs the current cell's weight.
+    def _dijkstra(self, distance):
+        links = memoryview(self.links)
+        weights = memoryview(self.weights)
+        neighbor_table = self.neighbor_table
+        best = {self.goal: 0}
+        open_heap = [(0, self.goal)]
+        closed = set()
+        while open_heap:
+            current_distance, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            step = current_distance + weights[current]
+            for offset in neighbor_table[links[current]]:
+                neighbor = current + offset
+                if neighbor not in closed and step < best.get(neighbor, step + 1):
+                    best[neighbor] = step
+                    heapq.heappush(open_heap, (step, neighbor))
+        indices = np.fromiter(best.keys(), dtype=np.int64, count=len(best))
+        distance[indices] = np.fromiter(best.values(), dtype=np.int64, count=len(best))
+
+    def reachable(self, position):
+        return int(self.distances[position[0] * self.width + position[1]]) != self.unreachable
+
+    # Cost of the cheapest path from position to the goal, or None if there isn't one.
+    def distance(self, position):
+        value = int(self.distances[position[0] * self.width + position[1]])
+        return None if value == self.unreachable else value
+
+    # The cheapest path from position to the goal as (x, y) positions, empty if the goal can't be reached.
+    # Each step goes to a neighbor whose distance plus what it costs to move into it adds up to ours.
+    def path(self, position):
+        distances = memoryview(self.distances)
+        links = memoryview(self.links)
+        weights = memoryview(self.weights)
+        current = position[0] * self.width + position[1]
+        if distances[current] == self.unreachable:
+            return []
+        path = [divmod(current, self.width)]
+        while current != self.goal:
+            for offset in self.neighbor_table[links[current]]:
+                neighbor = current + offset
+                if distances[neighbor] != self.unreachable and distances[neighbor] + weights[neighbor] == distances[current]:
+                    current = neighbor
+                    break
+            path.append(divmod(current, self.width))
+        return path
+
+    def __repr__(self):
+        return 'DistanceField(goal={}, reached={}, bytes={}, elapsed={:.6f})'.format(
+            divmod(self.goal, self.width), self.reached, self.distances.nbytes, self.elapsed)
+
+
+# A few distance fields kept by (grid version, goal), dropping the least recently used one when full.
+class DistanceFields(LRUCache):
+    def __init__(self, maxsize=8):
+        super().__init__(maxsize, 'field')
+
+    # The field for this grid and goal, built now if we don't have it.
+    def get(self, grid, goal):
+        key = (grid.version, tuple(goal))
+        field = self.lookup(key)
+        if field is None:
+            field = DistanceField(grid, goal)
+            self.store(key, field)
+        return field
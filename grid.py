@@ -0,0 +1,483 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+The grid that every algorithm searches.
+Width and height are picked when the grid is built, so it is no longer stuck at 20x20.
+
+Instead of one Python object per cell, the grid keeps a handful of flat NumPy arrays
+with one entry per cell, where index = x * width + y (x = row, y = column):
+    cells   - uint8 cell value (see below)
+    cost    - float64 cost from the start node, shown by Dijkstra's
+    g, f    - float64 A* scores
+    parent  - int32 index of the previous node on the path, -1 for none
+    stamp   - uint32 search generation the cell was last reached in, see below
+    links   - uint8 bit mask of which of the 8 neighbors can be travelled to
+    weights - uint8 terrain cost of moving into the cell, see TERRAIN
+That comes to 35 bytes a cell. Costs are floats because a diagonal step costs sqrt(2) times the
+weight of the cell it moves into - with 4 directions they always come out whole. grid[x][y] still
+hands back a Node, but a Node is only a thin view onto those arrays so the visualizer can keep
+using node.value, node.cost and so on.
+The grid also remembers where its start and end nodes are as they get placed, in grid.start
+and grid.end (cell indices, or None when there isn't one).
+
+grid.version changes whenever something that could change a path does - an obstacle placed or
+removed, or a terrain weight changed. Versions come from one counter shared by every grid, so
+no two grids (or two states of the same grid) ever have the same version, and a version is
+enough to know a cached path is still good. Painting visited/path cells doesn't count.
+Anything that wants to hear about those changes as they happen (like the incremental planner
+in incremental.py) can add a listener - it gets called with the index of the cell that changed,
+or None when the whole grid could have changed at once.
+
+Cell values:
+0 = blank space
+1 = obstacle
+2 = start node
+3 = end node
+4 = visited
+5 = unvisited
+6 = path
+
+Every search gets a new generation number (grid.generation). A cell counts as visited in the
+current search only when its stamp matches it, and cost, g, f and parent only mean anything for
+cells that are - everything else reads as unvisited, with cost, g and f of 0 and no parent. So
+starting a new search with reset_search() just bumps the generation instead of wiping every
+array, and a search only pays for the cells it actually reaches. clear_search() wipes the arrays
+too, for when the numbers themselves need to go back to 0 (like the visualizer's overlays).
+A search only fills in the fields it uses - parent always, cost for Dijkstra's, g and f for A*.
+
+Movement is 4-connected unless a search asks for diagonal movement. The low 4 bits of a cell's
+links are down, right, up and left, and the high 4 are the diagonals. A diagonal is only open when
+both cells beside it are too, so a path never cuts the corner of an obstacle or squeezes between
+two that touch at a corner. neighbor_table only looks at the low 4 bits, so anything that only
+moves 4 ways can ignore the diagonals completely.
+
+Terrain is kept apart from the cell value, so a grass cell is still blank, visited or part of
+the path like any other. Moving into a cell costs its weight - Dijkstra's and A* add it up,
+BFS and DFS ignore it.
+"""
+import itertools
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# Directions a node can move in, as bits in the links mask. Down, right, up, left is the order
+# BFS has always looked at neighbors in, and the diagonals come after them. The opposite of
+# direction d is d ^ 2.
+DOWN, RIGHT, UP, LEFT = 0, 1, 2, 3
+DOWN_RIGHT, UP_RIGHT, UP_LEFT, DOWN_LEFT = 4, 5, 6, 7
+DIRECTIONS = (DOWN, RIGHT, UP, LEFT)
+DIAGONAL_DIRECTIONS = DIRECTIONS + (DOWN_RIGHT, UP_RIGHT, UP_LEFT, DOWN_LEFT)
+# DFS pushes west -> south -> east -> north so the stack pops north -> east -> south -> west.
+DFS_DIRECTIONS = (LEFT, DOWN, RIGHT, UP)
+# with diagonals it pops clockwise from north - north, north-east, east and so on round.
+DIAGONAL_DFS_DIRECTIONS = (UP_LEFT, LEFT, DOWN_LEFT, DOWN, DOWN_RIGHT, RIGHT, UP_RIGHT, UP)
+# the two straight directions beside each diagonal.
+BESIDE = {DOWN_RIGHT: (DOWN, RIGHT), UP_RIGHT: (UP, RIGHT), UP_LEFT: (UP, LEFT), DOWN_LEFT: (DOWN, LEFT)}
+# what a diagonal step costs compared with a straight one.
+DIAGONAL_COST = math.sqrt(2)
+
+# Terrain types and what it costs to move into a cell of each.
+ROAD = 1
+GRASS = 2
+SWAMP = 5
+TERRAIN = {'road': ROAD, 'grass': GRASS, 'swamp': SWAMP}
+
+# where every grid's version numbers come from.
+_versions = itertools.count()
+
+
+# For every possible links mask, the directions that are set, in the given order.
+def _direction_table(order):
+    return [tuple(d for d in order if mask & (1 << d)) for mask in range(256)]
+
+
+# Everything a grid of this width steps around with - the offset for each direction, then per links mask the
+# offsets to step by (in search, DFS, diagonal and diagonal DFS order), and the same moves as (offset, what moving
+# that way costs per unit of weight) for the searches that add up costs. They're 256 entries each and only
+# depend on the width, so every grid of the same width shares one set instead of building its own.
+@lru_cache(maxsize=None)
+def _step_tables(width):
+    offsets = (width, 1, -width, -1, width + 1, 1 - width, -width - 1, width - 1)
+
+    def table(order):
+        return tuple(tuple(offsets[d] for d in dirs) for dirs in _direction_table(order))
+
+    neighbor_table = table(DIRECTIONS)
+    move_table = tuple(tuple((offset, 1) for offset in steps) for steps in neighbor_table)
+    diagonal_move_table = tuple(tuple((offsets[d], DIAGONAL_COST if d >= DOWN_RIGHT else 1) for d in dirs)
+                                for dirs in _direction_table(DIAGONAL_DIRECTIONS))
+    return (offsets, neighbor_table, table(DFS_DIRECTIONS), table(DIAGONAL_DIRECTIONS),
+            table(DIAGONAL_DFS_DIRECTIONS), move_table, diagonal_move_table)
+
+
+# A view of one cell in the grid. It holds no state of its own, everything lives in the grid's arrays.
+class Node:
+    __slots__ = ('grid', 'index')
+
+    def __init__(self, grid, index):
+        self.grid = grid
+        self.index = index
+
+    # remember... x value = which row it is in. y value = which column it is in.
+    @property
+    def x(self):
+        return self.index // self.grid.width
+
+    @property
+    def y(self):
+        return self.index % self.grid.width
+
+    @property
+    def value(self):
+        return int(self.grid.cells[self.index])
+
+    @value.setter
+    def value(self, value):
+        self.grid.set_value(self.index, value)
+
+    @property
+    def weight(self):
+        return int(self.grid.weights[self.index])
+
+    @weight.setter
+    def weight(self, weight):
+        self.grid.set_weight(self.index, weight)
+
+    # search state from an earlier search is stale, and reads as the defaults.
+    @property
+    def cost(self):
+        return float(self.grid.cost[self.index]) if self.visited else 0.0
+
+    @property
+    def g(self):
+        return float(self.grid.g[self.index]) if self.visited else 0.0
+
+    @property
+    def f(self):
+        return float(self.grid.f[self.index]) if self.visited else 0.0
+
+    @property
+    def h(self):
+        return self.f - self.g
+
+    @property
+    def visited(self):
+        return int(self.grid.stamp[self.index]) == self.grid.generation
+
+    @property
+    def previous_node(self):
+        parent = int(self.grid.parent[self.index]) if self.visited else -1
+        return None if parent < 0 else Node(self.grid, parent)
+
+    @property
+    def neighbors(self):
+        return [Node(self.grid, neighbor) for neighbor in self.grid.neighbors(self.index)]
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and other.grid is self.grid and other.index == self.index
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def __repr__(self):
+        return 'Node(x={}, y={}, value={})'.format(self.x, self.y, self.value)
+
+
+# One row of the grid, so grid[x][y] keeps working.
+class GridRow:
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.grid.width:
+            raise IndexError('column {} is outside a grid {} wide'.format(y, self.grid.width))
+        return Node(self.grid, self.x * self.grid.width + y)
+
+    def __iter__(self):
+        for y in range(self.grid.width):
+            yield self[y]
+
+    def __len__(self):
+        return self.grid.width
+
+
+# A height x width grid. grid[x][y] is the node in row x, column y.
+class Grid:
+    def __init__(self, width=20, height=20):
+        self._allocate(width, height)
+        # every cell starts blank, so everything inside the grid is linked.
+        self.cells = np.zeros(self.size, dtype=np.uint8)
+        self.links = np.zeros(self.size, dtype=np.uint8)
+        self.rebuild_links()
+        self.start = None
+        self.end = None
+        # everything starts out as road. weight_counts tracks how many cells have each weight,
+        # so the cheapest weight on the grid is always a quick lookup.
+        self.weights = np.full(self.size, ROAD, dtype=np.uint8)
+        self.weight_counts = np.zeros(256, dtype=np.int64)
+        self.weight_counts[ROAD] = self.size
+
+    # Everything a grid has apart from its map - the size, the search arrays and the step tables.
+    def _allocate(self, width, height):
+        if width < 1 or height < 1:
+            raise ValueError('grid must be at least 1x1, got {}x{}'.format(width, height))
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.version = next(_versions)
+        self.listeners = []
+        self.cost = np.zeros(self.size, dtype=np.float64)
+        self.g = np.zeros(self.size, dtype=np.float64)
+        self.f = np.zeros(self.size, dtype=np.float64)
+        self.parent = np.full(self.size, -1, dtype=np.int32)
+        # no cell is stamped with the first generation until a search reaches it.
+        self.stamp = np.zeros(self.size, dtype=np.uint32)
+        self.generation = 1
+        # offsets to add to an index to step in each direction, and per links mask the offsets to step by.
+        (self.offsets, self.neighbor_table, self.dfs_neighbor_table, self.diagonal_neighbor_table,
+         self.diagonal_dfs_neighbor_table, self.move_table, self.diagonal_move_table) = _step_tables(width)
+        # where jump point search's straight jumps stop, built by solver.py the first time it's needed.
+        self.jump_tables = None
+
+    # Build a grid from rows of cell values (or anything with a .value), like the old list of lists of Nodes.
+    # weights can be rows of terrain costs in the same shape, otherwise everything is road.
+    @classmethod
+    def from_rows(cls, rows, weights=None):
+        values = [[getattr(cell, 'value', cell) for cell in row] for row in rows]
+        grid = cls(len(values[0]), len(values))
+        grid.cells[:] = np.asarray(values, dtype=np.uint8).reshape(-1)
+        grid.rebuild_links()
+        grid.find_start_and_end()
+        if weights is not None:
+            grid.weights[:] = np.asarray(weights, dtype=np.uint8).reshape(-1)
+            grid.count_weights()
+        return grid
+
+    # Build a grid around cell, weight and (optionally) links arrays that already exist, without copying them.
+    # This is how a memory-mapped map file becomes a grid - see maps.py. It doesn't build a blank grid first,
+    # and when the caller already knows the weight counts and where the start and end nodes are - summary is
+    # (weight_counts, start, end) - nothing has to look at every cell, so a mapped file stays untouched until
+    # a search reaches into it.
+    @classmethod
+    def from_arrays(cls, width, height, cells, weights, links=None, summary=None):
+        for name, array in (('cells', cells), ('weights', weights), ('links', links)):
+            if array is not None and (array.dtype != np.uint8 or array.shape != (width * height,)):
+                raise ValueError('{} must be {} uint8 values'.format(name, width * height))
+        grid = cls.__new__(cls)
+        grid._allocate(width, height)
+        grid.cells = cells
+        grid.weights = weights
+        if links is None:
+            grid.links = np.zeros(grid.size, dtype=np.uint8)
+            grid.rebuild_links()
+        else:
+            grid.links = links
+        grid.weight_counts = np.zeros(256, dtype=np.int64)
+        if summary is None:
+            grid.count_weights()
+            grid.find_start_and_end()
+        else:
+            weight_counts, grid.start, grid.end = summary
+            if weight_counts[0] != 0 or sum(weight_counts) != grid.size:
+                raise ValueError('weight counts must add up to {} cells, all with a weight of at least 1'.format(
+                    grid.size))
+            grid.weight_counts[:] = weight_counts
+        return grid
+
+    # What from_arrays needs to know to skip looking at every cell - see above.
+    def summary(self):
+        return self.weight_counts, self.start, self.end
+
+    # A copy of the map - cells, terrain and links - with search arrays of its own, so it can be searched
+    # while this grid keeps being edited (see background.py).
+    def copy(self):
+        return Grid.from_arrays(self.width, self.height, self.cells.copy(), self.weights.copy(), self.links.copy(),
+                                self.summary())
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.height:
+            raise IndexError('row {} is outside a grid {} tall'.format(x, self.height))
+        return GridRow(self, x)
+
+    def __iter__(self):
+        for x in range(self.height):
+            yield GridRow(self, x)
+
+    def __len__(self):
+        return self.height
+
+    # Walk every node once, row by row.
+    def nodes(self):
+        for index in range(self.size):
+            yield Node(self, index)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.height and 0 <= y < self.width
+
+    def index(self, x, y):
+        return x * self.width + y
+
+    def position(self, index):
+        return divmod(index, self.width)
+
+    # Call listener(index) whenever a cell changes in a way that could change a path.
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    # Something that could change a path just happened - to one cell, or to any of them when index is None.
+    def _changed(self, index):
+        self.version = next(_versions)
+        for listener in self.listeners:
+            listener(index)
+
+    # Change a cell's value. Turning a cell into an obstacle, or back, relinks its neighbors and gives the grid a new version.
+    # Placing or overwriting the start or end node updates grid.start and grid.end.
+    def set_value(self, index, value):
+        old_value = self.cells[index]
+        self.cells[index] = value
+        if (old_value != 1) != (value != 1):
+            self._relink(index)
+            self._changed(index)
+        if old_value == 2 and value != 2:
+            self.start = None
+        elif old_value == 3 and value != 3:
+            self.end = None
+        if value == 2:
+            self.start = index
+        elif value == 3:
+            self.end = index
+
+    # Change what it costs to move into a cell. Setting the weight it already has is not a change.
+    def set_weight(self, index, weight):
+        if not 1 <= weight <= 255:
+            raise ValueError('terrain weight must be between 1 and 255, got {}'.format(weight))
+        if self.weights[index] == weight:
+            return
+        self.weight_counts[self.weights[index]] -= 1
+        self.weights[index] = weight
+        self.weight_counts[weight] += 1
+        self._changed(index)
+
+    # Recount the weights after the weights array was filled in some other way than set_weight.
+    # Weights could be anything now, so this counts as a new version too.
+    def count_weights(self):
+        if self.weights.min() < 1:
+            raise ValueError('terrain weights must be at least 1')
+        self.weight_counts[:] = np.bincount(self.weights, minlength=256)
+        self._changed(None)
+
+    # The cheapest cell to move into. A* scales its heuristic by this so it never overestimates.
+    def min_weight(self):
+        return int(np.flatnonzero(self.weight_counts)[0])
+
+    # Look for the start and end nodes after the cells were filled in some other way than set_value.
+    def find_start_and_end(self):
+        starts = np.flatnonzero(self.cells == 2)
+        ends = np.flatnonzero(self.cells == 3)
+        self.start = int(starts[0]) if len(starts) > 0 else None
+        self.end = int(ends[0]) if len(ends) > 0 else None
+
+    # Travellable neighbors of a cell - down, right, up, left - straight out of the links table.
+    def neighbors(self, index):
+        return [index + offset for offset in self.neighbor_table[self.links[index]]]
+
+    # Same neighbors in the order of desired stack for DFS - north -> east -> south -> west.
+    def dfs_neighbors(self, index):
+        return [index + offset for offset in self.dfs_neighbor_table[self.links[index]]]
+
+    # All 8 travellable neighbors, straight ones first, leaving out any diagonal that would cut a corner.
+    def diagonal_neighbors(self, index):
+        return [index + offset for offset in self.diagonal_neighbor_table[self.links[index]]]
+
+    # Work out every cell's links from scratch. Each direction is a single shifted comparison over the whole grid.
+    # This is what gets called after cells were changed without set_value, so it also moves to a new version.
+    def rebuild_links(self):
+        open_cells = (self.cells != 1).reshape(self.height, self.width).astype(np.uint8)
+        links = np.zeros((self.height, self.width), dtype=np.uint8)
+        links[:-1, :] |= open_cells[1:, :] << DOWN
+        links[:, :-1] |= open_cells[:, 1:] << RIGHT
+        links[1:, :] |= open_cells[:-1, :] << UP
+        links[:, 1:] |= open_cells[:, :-1] << LEFT
+        # a diagonal needs the cell it lands on and both cells beside it open.
+        links[:-1, :-1] |= (open_cells[1:, 1:] & open_cells[1:, :-1] & open_cells[:-1, 1:]) << DOWN_RIGHT
+        links[1:, :-1] |= (open_cells[:-1, 1:] & open_cells[:-1, :-1] & open_cells[1:, 1:]) << UP_RIGHT
+        links[1:, 1:] |= (open_cells[:-1, :-1] & open_cells[:-1, 1:] & open_cells[1:, :-1]) << UP_LEFT
+        links[:-1, 1:] |= (open_cells[1:, :-1] & open_cells[1:, 1:] & open_cells[:-1, :-1]) << DOWN_LEFT
+        self.links[:] = links.reshape(-1)
+        self._changed(None)
+
+    # A cell just became (or stopped being) an obstacle, so flip the bit pointing at it in each of its neighbors.
+    def _relink(self, index):
+        x, y = divmod(index, self.width)
+        is_open = self.cells[index] != 1
+        for direction, inside in ((DOWN, x < self.height - 1), (RIGHT, y < self.width - 1), (UP, x > 0), (LEFT, y > 0)):
+            if not inside:
+                continue
+            neighbor = index + self.offsets[direction]
+            bit = 1 << (direction ^ 2)
+            if is_open:
+                self.links[neighbor] |= bit
+            else:
+                self.links[neighbor] &= ~bit & 0xFF
+        # the cell is what a diagonal lands on or squeezes past for every cell around it, so work theirs out again.
+        for neighbor_x in range(max(x - 1, 0), min(x + 2, self.height)):
+            for neighbor_y in range(max(y - 1, 0), min(y + 2, self.width)):
+                self._relink_diagonals(neighbor_x * self.width + neighbor_y)
+
+    # Work out a cell's diagonal bits again. A diagonal is open when the straight steps on both sides of it are
+    # and the cell it lands on isn't an obstacle.
+    def _relink_diagonals(self, index):
+        mask = self.links[index] & 0x0F
+        for direction, (first, second) in BESIDE.items():
+            if mask & (1 << first) and mask & (1 << second) and self.cells[index + self.offsets[direction]] != 1:
+                mask |= 1 << direction
+        self.links[index] = mask
+
+    # Start a new search generation, which makes every cell's search state stale at once. Cell values are left alone.
+    # Only when the uint32 stamps are about to wrap around do they actually get wiped.
+    def reset_search(self):
+        if self.generation == np.iinfo(np.uint32).max:
+            self.stamp.fill(0)
+            self.generation = 0
+        self.generation += 1
+
+    # Wipe the per-search arrays as well as starting a new generation, so every cost, g and f really is 0 again.
+    def clear_search(self):
+        self.cost.fill(0)
+        self.g.fill(0)
+        self.f.fill(0)
+        self.parent.fill(-1)
+        self.reset_search()
+
+    # Bool array of the cells reached in the current search.
+    @property
+    def visited(self):
+        return self.stamp == self.generation
+
+    # Turn visited, unvisited and path cells back into blank space, keeping obstacles and start/end nodes.
+    def clear_visuals(self):
+        self.cells[self.cells > 3] = 0
+
+    # Set every cell back to blank space and road.
+    def clear(self):
+        self.cells.fill(0)
+        self.weights.fill(ROAD)
+        self.count_weights()
+        self.clear_search()
+        self.rebuild_links()
+        self.start = None
+        self.end = None
+
+    # Bytes used per cell across all of the arrays.
+    def bytes_per_cell(self):
+        arrays = (self.cells, self.cost, self.g, self.f, self.parent, self.stamp, self.links, self.weights)
+        return sum(array.itemsize for array in arrays)
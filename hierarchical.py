@@ -0,0 +1,411 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Hierarchical pathfinding (HPA*), for long queries across big maps where even A* expands too much.
+
+The grid is cut into square clusters, cluster_size cells on a side. Wherever two clusters touch,
+every run of open cells along the border that lines up with open cells on the other side is an
+entrance. A short entrance gets one crossing in its middle, a long one gets a crossing at each
+end. The cells on either side of a crossing are the nodes of a small abstract graph:
+    crossings     - between the two cells of a crossing, costing the weight of the cell moved into
+    intra edges   - between every two nodes of the same cluster, costing the cheapest path between
+                    them that never leaves the cluster
+A query connects the start and end to the nodes of their own clusters, runs A* over the abstract
+graph, and then refines only the edges it picked into cells, with one small search inside one
+cluster per edge. Paths aren't always the cheapest one, since the abstract graph only knows how
+to cross a border at its crossings - on random maps they come out a few percent longer on
+average when every cell costs the same, and somewhat more on mixed terrain.
+
+Entrances are found for the whole grid up front, which only looks at border cells. Each cluster's
+intra edges are worked out the first time a query needs them and kept after that - build() works
+them all out at once. The planner listens to the grid (see grid.add_listener), so an edit only
+throws away what it could have changed: the intra edges of the edited cluster, and of a neighbor
+when the entrances on the border between them changed. Anything that changes the whole grid at
+once starts over.
+
+Usage:
+    from hierarchical import HierarchicalPlanner
+    planner = HierarchicalPlanner(grid, cluster_size=16)
+    planner.build()                                  # optional, otherwise clusters are built as needed
+    result = planner.find_path((0, 0), (1999, 1999))
+    print(result.path, result.expanded, result.elapsed)
+    planner.close()                                  # stop listening to the grid
+
+result.stats splits the time between connecting the start and end (setup), the abstract search
+(search) and refining the path (path), and expanded counts the nodes all three expanded. Like
+incremental.py, the planner only moves 4 ways and keeps its own dicts, so it never touches the
+grid's search arrays.
+"""
+import heapq
+import time
+
+import numpy as np
+
+from grid import DOWN, LEFT, RIGHT, UP
+from solver import SearchResult
+from stats import SearchStats
+
+# Entrances at least this long get a crossing at each end instead of one in the middle.
+LONG_ENTRANCE = 6
+
+
+class HierarchicalPlanner:
+    def __init__(self, grid, cluster_size=16):
+        if cluster_size < 2:
+            raise ValueError('clusters must be at least 2 cells wide, got {}'.format(cluster_size))
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.cluster_rows = -(-grid.height // cluster_size)
+        self.cluster_columns = -(-grid.width // cluster_size)
+        self.clusters = self.cluster_rows * self.cluster_columns
+        # clusters edited since the last query, or None when everything has to be worked out again.
+        self.dirty = None
+        # how many times a cluster's intra edges were worked out, and how long building took in total.
+        self.built_clusters = 0
+        self.build_time = 0.0
+        self.touched = []
+        # every cell's links with the ones that lead out of its cluster masked off, so searching inside a cluster
+        # never has to check where it is. inner_links is the grid's links with the mask applied.
+        rows = np.arange(grid.height) % cluster_size
+        columns = np.arange(grid.width) % cluster_size
+        mask = np.full((grid.height, grid.width), 0xFF, dtype=np.uint8)
+        mask[rows == cluster_size - 1, :] &= ~np.uint8(1 << DOWN)
+        mask[:, columns == cluster_size - 1] &= ~np.uint8(1 << RIGHT)
+        mask[rows == 0, :] &= ~np.uint8(1 << UP)
+        mask[:, columns == 0] &= ~np.uint8(1 << LEFT)
+        self.inner_mask = mask.reshape(-1)
+        self.inner_links = grid.links & self.inner_mask
+        grid.add_listener(self.cell_changed)
+
+    # Stop listening to the grid.
+    def close(self):
+        self.grid.remove_listener(self.cell_changed)
+
+    # Grid listener. Edits are only remembered here and worked through on the next query.
+    def cell_changed(self, index):
+        if index is None:
+            self.dirty = None
+        elif self.dirty is not None:
+            self.dirty.add(self.cluster_of(index))
+
+    def cluster_of(self, index):
+        x, y = divmod(index, self.grid.width)
+        return (x // self.cluster_size) * self.cluster_columns + y // self.cluster_size
+
+    # First row, first column, and one past the last row and column of a cluster.
+    def bounds(self, cluster):
+        cx, cy = divmod(cluster, self.cluster_columns)
+        size = self.cluster_size
+        return cx * size, cy * size, min((cx + 1) * size, self.grid.height), min((cy + 1) * size, self.grid.width)
+
+    # The borders of a cluster as (cluster, direction) keys - a border is owned by the cluster above or left of it.
+    def borders_of(self, cluster):
+        cx, cy = divmod(cluster, self.cluster_columns)
+        borders = []
+        if cy + 1 < self.cluster_columns:
+            borders.append((cluster, RIGHT))
+        if cx + 1 < self.cluster_rows:
+            borders.append((cluster, DOWN))
+        if cy > 0:
+            borders.append((cluster - 1, RIGHT))
+        if cx > 0:
+            borders.append((cluster - self.cluster_columns, DOWN))
+        return borders
+
+    # The crossings over one border, as (cell on the owner's side, cell on the other side) pairs.
+    def _find_crossings(self, border):
+        cluster, direction = border
+        grid = self.grid
+        cells = grid.cells
+        links = grid.links
+        top, left, bottom, right = self.bounds(cluster)
+        # cell pairs along the border, in order.
+        if direction == RIGHT:
+            pairs = [(x * grid.width + right - 1, x * grid.width + right) for x in range(top, bottom)]
+        else:
+            pairs = [((bottom - 1) * grid.width + y, bottom * grid.width + y) for y in range(left, right)]
+        crossings = []
+        run = []
+        for inside, outside in pairs + [(-1, -1)]:
+            if inside >= 0 and cells[inside] != 1 and links[inside] & (1 << direction):
+                run.append((inside, outside))
+                continue
+            if len(run) >= LONG_ENTRANCE:
+                crossings.extend((run[0], run[-1]))
+            elif run:
+                crossings.append(run[len(run) // 2])
+            run = []
+        return crossings
+
+    # Work out every border's crossings again, and forget every cluster's intra edges.
+    def _restart(self):
+        self.inner_links = self.grid.links & self.inner_mask
+        self.crossings = {}
+        # node -> cells on the other side of a crossing from it.
+        self.across = {}
+        self.intra = {}
+        for cluster in range(self.clusters):
+            for border in self.borders_of(cluster):
+                if border[0] != cluster:
+                    continue
+                self._set_crossings(border, self._find_crossings(border))
+        self.dirty = set()
+
+    def _set_crossings(self, border, crossings):
+        for inside, outside in self.crossings.get(border, ()):
+            for node, other in ((inside, outside), (outside, inside)):
+                self.across[node].remove(other)
+                if not self.across[node]:
+                    del self.across[node]
+        self.crossings[border] = crossings
+        for inside, outside in crossings:
+            self.across.setdefault(inside, []).append(outside)
+            self.across.setdefault(outside, []).append(inside)
+
+    # Catch up on edits. Only borders of edited clusters are looked at again, and a cluster's intra edges
+    # are only thrown away if it was edited or the crossings on one of its borders moved.
+    def _refresh(self):
+        if self.dirty is None:
+            self._restart()
+            return
+        width = self.grid.width
+        for cluster in self.dirty:
+            self.intra.pop(cluster, None)
+            # links pointing out of the cluster are masked off anyway, so only its own cells need updating.
+            top, left, bottom, right = self.bounds(cluster)
+            for x in range(top, bottom):
+                cells = slice(x * width + left, x * width + right)
+                self.inner_links[cells] = self.grid.links[cells] & self.inner_mask[cells]
+            for border in self.borders_of(cluster):
+                crossings = self._find_crossings(border)
+                if crossings != self.crossings[border]:
+                    self._set_crossings(border, crossings)
+                    owner, direction = border
+                    self.intra.pop(owner, None)
+                    self.intra.pop(owner + (1 if direction == RIGHT else self.cluster_columns), None)
+        self.dirty = set()
+
+    # The abstract nodes inside a cluster - its side of every crossing on its borders.
+    def nodes_of(self, cluster):
+        nodes = set()
+        for border in self.borders_of(cluster):
+            for inside, outside in self.crossings[border]:
+                nodes.add(inside if border[0] == cluster else outside)
+        return nodes
+
+    # Dijkstra's from source that never leaves source's cluster, stopping once every target is settled. With a
+    # single target it's A* instead, with the same scaled Manhattan estimate as everywhere else.
+    # Hands back the best cost to every cell it reached, their previous cells, and its counters as
+    # [expanded, pushes, pops, decrease keys, peak open].
+    def _cluster_search(self, source, targets):
+        grid = self.grid
+        width = grid.width
+        links = memoryview(self.inner_links)
+        weights = memoryview(grid.weights)
+        neighbor_table = grid.neighbor_table
+        best = {source: 0}
+        previous = {source: -1}
+        open_heap = [(0, source)]
+        closed = set()
+        remaining = set(targets)
+        remaining.discard(source)
+        toward = next(iter(remaining)) if len(remaining) == 1 else -1
+        toward_x, toward_y = divmod(toward, width)
+        min_weight = grid.min_weight() if toward >= 0 else 0
+        counters = [0, 1, 0, 0, 1]
+        while open_heap and remaining:
+            if len(open_heap) > counters[4]:
+                counters[4] = len(open_heap)
+            current = heapq.heappop(open_heap)[1]
+            counters[2] += 1
+            if current in closed:
+                continue
+            closed.add(current)
+            remaining.discard(current)
+            counters[0] += 1
+            current_cost = best[current]
+            for offset in neighbor_table[links[current]]:
+                neighbor = current + offset
+                if neighbor in closed:
+                    continue
+                placeholder = current_cost + weights[neighbor]
+                if neighbor in best:
+                    if placeholder >= best[neighbor]:
+                        continue
+                    counters[3] += 1
+                best[neighbor] = placeholder
+                previous[neighbor] = current
+                if min_weight:
+                    x, y = divmod(neighbor, width)
+                    placeholder += (abs(x - toward_x) + abs(y - toward_y)) * min_weight
+                heapq.heappush(open_heap, (placeholder, neighbor))
+                counters[1] += 1
+        return best, previous, counters
+
+    # A cluster's intra edges, node -> {other node: cost}, worked out now if we don't have them.
+    def _intra_edges(self, cluster):
+        edges = self.intra.get(cluster)
+        if edges is None:
+            began = time.perf_counter()
+            nodes = self.nodes_of(cluster)
+            edges = {}
+            for node in nodes:
+                best = self._cluster_search(node, nodes)[0]
+                edges[node] = {other: best[other] for other in nodes if other != node and other in best}
+            self.intra[cluster] = edges
+            self.built_clusters += 1
+            self.build_time += time.perf_counter() - began
+        return edges
+
+    # Work out every cluster's intra edges now, so no query has to.
+    def build(self):
+        self._refresh()
+        for cluster in range(self.clusters):
+            self._intra_edges(cluster)
+
+    # The cheapest path from start to end that HPA* finds, as a SearchResult named 'hpastar'.
+    def find_path(self, start, end):
+        grid = self.grid
+        for x, y in (start, end):
+            if not grid.in_bounds(x, y):
+                raise ValueError('position ({}, {}) is outside the {}x{} grid'.format(x, y, grid.height, grid.width))
+        began = time.perf_counter()
+        stats = SearchStats('hpastar')
+        totals = [0, 0, 0, 0, 0]
+
+        def add(counters):
+            for number in range(4):
+                totals[number] += counters[number]
+            totals[4] = max(totals[4], counters[4])
+
+        self._refresh()
+        source = grid.index(*start)
+        goal = grid.index(*end)
+        weights = grid.weights
+        width = grid.width
+        min_weight = grid.min_weight()
+        # hook the start and end up to the nodes of their clusters. A start node on an obstacle can still be left,
+        # so then it's hooked up through each of its neighbors instead, remembering which one each edge went through.
+        # Going from a node x into the end costs whatever the end's search paid to reach x, minus the weight of x,
+        # plus the weight of the end.
+        if grid.cells[source] == 1:
+            entries = [(source + offset, int(weights[source + offset])) for offset in grid.neighbor_table[grid.links[source]]]
+        else:
+            entries = [(source, 0)]
+        end_cluster = self.cluster_of(goal)
+        start_edges = {}
+        start_through = {}
+        for entry, entry_cost in entries:
+            targets = self.nodes_of(self.cluster_of(entry))
+            if self.cluster_of(entry) == end_cluster:
+                targets.add(goal)
+            best, _, counters = self._cluster_search(entry, targets)
+            add(counters)
+            for node in targets:
+                if node != source and node in best and entry_cost + best[node] < start_edges.get(node, entry_cost + best[node] + 1):
+                    start_edges[node] = entry_cost + best[node]
+                    start_through[node] = entry
+        end_nodes = self.nodes_of(end_cluster)
+        end_edges = {}
+        # obstacles are never linked to, so an end node on one can't be reached - same as the flat searches.
+        if grid.cells[goal] != 1:
+            best, _, counters = self._cluster_search(goal, end_nodes)
+            add(counters)
+            end_edges = {node: best[node] - int(weights[node]) + int(weights[goal])
+                         for node in end_nodes if node != goal and node in best}
+        searching = time.perf_counter()
+
+        # A* over the abstract graph, with the same scaled Manhattan estimate as the flat A*. Most abstract paths
+        # tie with lots of others, so equal f values go to the deepest node first instead of the oldest.
+        goal_x, goal_y = divmod(goal, width)
+        g = {source: 0}
+        previous = {source: -1}
+        order = {source: 0}
+        open_heap = [(0, 0, 0, source)]
+        closed = set()
+        self.touched = []
+        expanded = 0
+        decreased = 0
+        peak = 1
+        found = False
+        while open_heap:
+            if len(open_heap) > peak:
+                peak = len(open_heap)
+            current = heapq.heappop(open_heap)[3]
+            if current in closed:
+                continue
+            expanded += 1
+            self.touched.append(current)
+            if current == goal:
+                found = True
+                break
+            closed.add(current)
+            successors = list(self._intra_edges(self.cluster_of(current)).get(current, {}).items())
+            successors.extend((other, int(weights[other])) for other in self.across.get(current, ()))
+            if current == source:
+                successors.extend(start_edges.items())
+            if current in end_edges:
+                successors.append((goal, end_edges[current]))
+            for neighbor, cost in successors:
+                if neighbor in closed:
+                    continue
+                placeholder = g[current] + cost
+                if neighbor in g:
+                    if placeholder >= g[neighbor]:
+                        continue
+                    decreased += 1
+                else:
+                    order[neighbor] = len(order)
+                g[neighbor] = placeholder
+                previous[neighbor] = current
+                x, y = divmod(neighbor, width)
+                estimate = (abs(x - goal_x) + abs(y - goal_y)) * min_weight
+                heapq.heappush(open_heap, (placeholder + estimate, -placeholder, order[neighbor], neighbor))
+        pushes = len(order) + decreased
+        add([expanded, pushes, pushes - len(open_heap), decreased, peak])
+        retracing = time.perf_counter()
+
+        # refine each abstract edge into cells - a crossing is one step, an intra edge one search inside its cluster.
+        stats.found = found
+        path = []
+        if found:
+            abstract = []
+            current = goal
+            while current >= 0:
+                abstract.append(current)
+                current = previous[current]
+            abstract.reverse()
+            cells = [abstract[0]]
+            for node, following in zip(abstract, abstract[1:]):
+                # off an obstacle start, first step onto the neighbor the edge went through.
+                if node == source and start_through.get(following, source) != source:
+                    node = start_through[following]
+                    cells.append(node)
+                    if node == following:
+                        continue
+                if self.cluster_of(node) != self.cluster_of(following):
+                    cells.append(following)
+                    continue
+                _, steps, counters = self._cluster_search(node, (following,))
+                add(counters)
+                segment = []
+                current = following
+                while current != node:
+                    segment.append(current)
+                    current = steps[current]
+                cells.extend(reversed(segment))
+            path = [divmod(index, width) for index in cells]
+        finished = time.perf_counter()
+
+        stats.count(totals[0], totals[1], totals[2], totals[3], totals[4], len(g))
+        stats.setup_time = searching - began
+        stats.search_time = retracing - searching
+        stats.path_time = finished - retracing
+        path_cost = sum(int(weights[grid.index(x, y)]) for x, y in path[1:])
+        return SearchResult('hpastar', path, stats.visited_nodes(), finished - began, stats.expanded, stats.peak_open,
+                            path_cost, stats)
+
+    def __repr__(self):
+        return 'HierarchicalPlanner(cluster_size={}, clusters={}, built={}, build_time={:.6f})'.format(
+            self.cluster_size, self.clusters, self.built_clusters, self.build_time)
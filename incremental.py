@@ -0,0 +1,174 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Incremental replanning with Lifelong Planning A* (LPA*), for when the start and end stay put
+but obstacles keep coming and going.
+
+A normal search throws everything away and starts over after every edit. The planner instead
+keeps two numbers for every node it has looked at:
+    g   - the best cost to it found so far
+    rhs - a one step lookahead, the cheapest g of its neighbors plus the cost of moving in
+A node whose g and rhs agree is consistent. When a cell turns into an obstacle (or back, or
+its terrain changes) only that cell and its neighbors get their rhs recomputed, and the next
+plan() only expands nodes that became inconsistent because of it - so the work done is about
+the size of the change, not the size of the map. The first plan() is a normal A* search.
+
+The planner listens to the grid (see grid.add_listener), so edits made through set_value and
+set_weight are picked up on their own. Anything that changes the whole grid at once, moving
+the start or end, or a change to the cheapest terrain weight (which the heuristic is scaled by)
+makes the next plan() start over from scratch.
+
+Usage:
+    from incremental import IncrementalPlanner
+    planner = IncrementalPlanner(grid, (0, 0), (19, 19))
+    result = planner.plan()          # full search
+    grid[5][5].value = 1
+    result = planner.plan()          # only repairs around (5, 5)
+    print(result.path, result.expanded)
+    planner.close()                  # stop listening to the grid
+
+The planner only moves 4 ways, with the Manhattan heuristic. The planner keeps its g and rhs
+values in its own dicts, so it never touches the grid's search arrays.
+"""
+import heapq
+import time
+
+from solver import SearchResult, calculate_heuristic
+
+INFINITY = float('inf')
+
+
+class IncrementalPlanner:
+    def __init__(self, grid, start, end):
+        self.grid = grid
+        self.start = grid.index(*start)
+        self.end = grid.index(*end)
+        # nodes that changed since the last plan, or None when the next plan has to start over.
+        self.changed = None
+        self.plans = 0
+        grid.add_listener(self.cell_changed)
+
+    # Stop listening to the grid.
+    def close(self):
+        self.grid.remove_listener(self.cell_changed)
+
+    # Move the start and end. Anything we worked out was for the old ones, so start over.
+    def move(self, start, end):
+        start = self.grid.index(*start)
+        end = self.grid.index(*end)
+        if start != self.start or end != self.end:
+            self.start = start
+            self.end = end
+            self.changed = None
+
+    # Has anything changed since the last plan()?
+    def stale(self):
+        return self.changed is None or len(self.changed) > 0 or self.grid.min_weight() != self.min_weight
+
+    # Grid listener. Edits are only remembered here and worked through on the next plan().
+    def cell_changed(self, index):
+        if index is None:
+            self.changed = None
+        elif self.changed is not None:
+            self.changed.add(index)
+
+    # Throw away everything and set up a brand new search from the start node.
+    def _restart(self):
+        self.g = {}
+        self.rhs = {self.start: 0}
+        self.min_weight = self.grid.min_weight()
+        self.open_heap = []
+        # the key every node on the open list is queued with. Heap entries that don't match are stale.
+        self.queued = {}
+        self._queue(self.start)
+
+    # LPA* sorts by (the smaller of g and rhs plus the heuristic, then the smaller of g and rhs).
+    def _key(self, index):
+        best = min(self.g.get(index, INFINITY), self.rhs.get(index, INFINITY))
+        return (best + calculate_heuristic(index, self.end, self.grid.width, False, self.min_weight), best)
+
+    def _queue(self, index):
+        key = self._key(index)
+        self.queued[index] = key
+        heapq.heappush(self.open_heap, (key, index))
+
+    # Drop stale heap entries and return the lowest key still queued.
+    def _top_key(self):
+        while self.open_heap and self.queued.get(self.open_heap[0][1]) != self.open_heap[0][0]:
+            heapq.heappop(self.open_heap)
+        return self.open_heap[0][0] if self.open_heap else (INFINITY, INFINITY)
+
+    # Recompute a node's rhs from its neighbors, and put it on the open list only if it's now inconsistent.
+    # Moving into a cell costs its terrain weight and obstacles can't be moved into at all. Obstacles are
+    # never linked as neighbors, so they never count as a way in either.
+    def _update(self, index):
+        if index != self.start:
+            if self.grid.cells[index] == 1:
+                self.rhs[index] = INFINITY
+            else:
+                g = self.g
+                best = min((g.get(neighbor, INFINITY) for neighbor in self.grid.neighbors(index)), default=INFINITY)
+                self.rhs[index] = best + int(self.grid.weights[index])
+        self.queued.pop(index, None)
+        if self.g.get(index, INFINITY) != self.rhs.get(index, INFINITY):
+            self._queue(index)
+
+    # Bring the search up to date and return the path as a SearchResult. expanded only counts the nodes
+    # this call had to expand, which is the number to watch - it stays small when the edit was small.
+    def plan(self):
+        began = time.perf_counter()
+        grid = self.grid
+        if self.changed is None or grid.min_weight() != self.min_weight:
+            self._restart()
+        else:
+            for index in self.changed:
+                self._update(index)
+                # the changed cell's neighbors could have been getting in through it.
+                for neighbor in grid.neighbors(index):
+                    self._update(neighbor)
+        self.changed = set()
+        self.plans += 1
+
+        g = self.g
+        rhs = self.rhs
+        end = self.end
+        expanded = 0
+        peak = len(self.queued)
+        self.touched = []
+        while self._top_key() < self._key(end) or rhs.get(end, INFINITY) != g.get(end, INFINITY):
+            if not self.open_heap:
+                break
+            if len(self.queued) > peak:
+                peak = len(self.queued)
+            current = heapq.heappop(self.open_heap)[1]
+            del self.queued[current]
+            expanded += 1
+            self.touched.append(current)
+            if g.get(current, INFINITY) > rhs[current]:
+                # overconsistent - it got cheaper. Settle it and let the neighbors know.
+                g[current] = rhs[current]
+            else:
+                # underconsistent - it got more expensive. Forget its g and let everything recompute.
+                g[current] = INFINITY
+                self._update(current)
+            for neighbor in grid.neighbors(current):
+                self._update(neighbor)
+
+        path = self._path()
+        path_cost = sum(int(grid.weights[grid.index(x, y)]) for x, y in path[1:])
+        return SearchResult('lpastar', path, len(self.touched), time.perf_counter() - began, expanded, peak, path_cost)
+
+    # Walk back from the end, always stepping to the neighbor with the lowest g, which is the way we came in.
+    def _path(self):
+        g = self.g
+        if g.get(self.end, INFINITY) == INFINITY:
+            return []
+        width = self.grid.width
+        path = [divmod(self.end, width)]
+        current = self.end
+        while current != self.start:
+            current = min(self.grid.neighbors(current), key=lambda neighbor: g.get(neighbor, INFINITY))
+            path.append(divmod(current, width))
+        path.reverse()
+        return path
@@ -3,19 +3,45 @@ Author: Jarett Sutula
 Pathfinding Algorithms Thesis Project
 
 General controls:
-Left click mouse = place obstacle block.
-Right click mouse = set grid block back to blank block.
+Left click mouse = paint with the current brush (obstacle block by default).
+Right click mouse = set grid block back to blank road block.
+press 1-4 = pick the brush: 1 obstacle, 2 road, 3 grass, 4 swamp.
 press Q = place starting node wherever mouse is hovering.
 press E = place ending node wherever mouse is hovering.
+press D = show (or hide) every cell's distance to the end node, and the path down to it from the start node.
+press H = find a path with hierarchical A* (HPA*), showing the cluster entrances it looked at as visited.
+press S = save the counters of every search run so far to search_stats.json and search_stats.csv.
+press Escape = cancel the running search.
+Mouse wheel or +/- = zoom in and out. Arrow keys or dragging with the middle mouse = move around the grid.
+press Home = zoom back out to fit the whole grid in.
 Click 'Clear Grid' button on screen = clear grid.
 Click buttons on right side = Run different algorithms
+Click the steps button to pick how many nodes a search expands at a time (1, 10, 100 or as fast as it can go),
+and 'skip' to jump straight to the result without drawing anything in between.
+Searches run on a worker thread on a copy of the grid, so the window keeps drawing at 60 fps and everything
+still works while one runs - editing the grid doesn't change the search that's already going, and clicking
+another algorithm starts over with that one.
 
-"""
-from collections import deque
+Run with --width and --height to change the size of the grid, e.g. python main.py --width 100 --height 60.
+Grids of any size work - only the part of the grid in view is drawn, and zoomed far out each cell is a pixel.
 
-import pygame
-pygame.init()
-pygame.font.init()
+"""
+import argparse
+import math
+import queue
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from background import BackgroundSearch
+from cache import PathCache
+from distance import DistanceFields
+from grid import GRASS, ROAD, SWAMP, TERRAIN, Grid
+from hierarchical import HierarchicalPlanner
+from incremental import IncrementalPlanner
+from solver import SearchResult, path_cost
+from stats import save_csv, save_json
 
 # Define colors for screen fill, font
 WHITE = (255, 255, 255)
@@ -26,253 +52,393 @@ BLACK = (0, 0, 0)
 
 # FPS for drawing grid.
 fps_speed = 60
+# how many times a second a search that isn't running flat out takes its next few steps.
 run_speed = 20
-
-# Set font and create text objects.
-font = pygame.font.SysFont('Calibri', 24)
-smaller_font = pygame.font.SysFont('Calibri', 18)
-smallest_font = pygame.font.SysFont('Calibri', 12)
-clear_text = font.render('Click to clear the grid', True, WHITE)
-start_text = smaller_font.render('Press Q to create start node', True, WHITE)
-end_text = smaller_font.render('Press E to create end node', True, WHITE)
-obstacle_text_1 = smaller_font.render('Click and drag left mouse', True, WHITE)
-obstacle_text_2 = smaller_font.render('to create obstacles', True, WHITE)
-obstacle_text_3 = smaller_font.render('Click and drag right mouse', True, WHITE)
-obstacle_text_4 = smaller_font.render('to erase obstacles', True, WHITE)
-diagonal_priority1 = smallest_font.render('diagonal movement', True, WHITE)
-diagonal_priority2 = smallest_font.render('priority for A*', True, WHITE)
-show_f = smallest_font.render('show f values', True, WHITE)
-
-# Set the width and height of the screen. 20x20 of 32 pixel pngs
-size = (880, 640)
-screen = pygame.display.set_mode(size)
-pygame.display.set_caption("pathfinding-algorithms")
-
-# Import grid units as pngs
-start_node = pygame.image.load("images/start_node.png").convert()
-end_node = pygame.image.load("images/end_node.png").convert()
-blank_space = pygame.image.load("images/blank_space.png").convert()
-obstacle = pygame.image.load("images/obstacle.png").convert()
-unvisited = pygame.image.load("images/unvisited.png").convert()
-visited = pygame.image.load("images/visited.png").convert()
-path_block = pygame.image.load("images/path.png").convert()
-
-# Import algorithm buttons as pngs.
-astar = pygame.image.load("images/astar.png").convert()
-bfs = pygame.image.load("images/bfs.png").convert()
-da = pygame.image.load("images/da.png").convert()
-dfs = pygame.image.load("images/dfs.png").convert()
-on = pygame.image.load("images/on.png").convert()
-off = pygame.image.load("images/off.png").convert()
-
-
-# Keep loop running until we quit
-done = False
-
-# FPS clock
-clock = pygame.time.Clock()
-
-
-# every node in the grid should start at value = 0 for blank space.
-# Track value, its neighbors, and its coordinates on the grid.
-class Node:
-    def __init__(self, x, y):
-        self.value = 0
-        self.neighbors = []
-        self.x = x
-        self.y = y
-        self.previous_node = None
-        self.visited = False
-        self.start_node = False
-        self.cost = 0
-        # track f, g, h for A* calculations.
-        self.f = 0
-        self.g = 0
-        self.h = 0
-
-    # Look in 4 directions around node and add neighbors to self.neighbors
-    def add_neighbors(self):
-        # make sure we are not going out of bounds!
-        # remember... x value = which row it is in. y value = which column it is in.
-        # add down neighbor. x + 1.
-        if self.x < 19:
-            self.neighbors.append(grid[self.x + 1][self.y])
-        # add right neighbor
-        if self.y < 19:
-            self.neighbors.append(grid[self.x][self.y + 1])
-        # add up neighbor
-        if self.x > 0:
-            self.neighbors.append(grid[self.x - 1][self.y])
-        # add left neighbor
-        if self.y > 0:
-            self.neighbors.append(grid[self.x][self.y - 1])
-
-    def add_dfs_neighbors(self):
-        # Add them in the order of desired stack - north -> east -> south -> west
-        if self.y > 0:
-            self.neighbors.append(grid[self.x][self.y - 1])
-        # add South neighbor. x + 1.
-        if self.x < 19:
-            self.neighbors.append(grid[self.x + 1][self.y])
-        # add right neighbor
-        if self.y < 19:
-            self.neighbors.append(grid[self.x][self.y + 1])
-        # add North neighbor
-        if self.x > 0:
-            self.neighbors.append(grid[self.x - 1][self.y])
-
-
-# Let's set the grid that we will use for finding paths. 20x20.
-# 0 = blank space
-# 1 = obstacle
-# 2 = start node
-# 3 = end node
-# 4 = visited
-# 5 = unvisited
-# 6 = path
-
-# Create the grid, then replace it with new Nodes().
-grid = [[0 for a in range(20)] for b in range(20)]
-
-for i in range(20):
-    for j in range(20):
-        grid[i][j] = Node(i, j)
-
-# Let's set the flags for start_node and end_nodes.
-start_node_placed = False
-start_pos = [0, 0]
-end_node_placed = False
-end_pos = [0, 0]
-
-# a deque allows us to quickly append and pop instantly. here will go the nodes to be added and searched.
-bfs_queue = deque()
-# a "stack" will let us use DFS.
-dfs_stack = deque()
-# # a queue for dijkstras.
-# dijkstras_queue = deque()
-
-# 'sets' for A*. Need one of them to be closed so we can compare.
-a_star_open = []
-a_star_closed = []
-# list to hold path from start to end.
+# how many nodes a running search expands each time. None runs it as fast as it will go.
+STEP_CHOICES = (1, 10, 100, None)
+steps_per_frame = 1
+
+# Nothing in here touches pygame until main() runs, so importing this file doesn't open a window or even
+# import pygame. Fonts, images and text are loaded the first time something draws them, and kept after that.
+pygame = None
+
+
+# Import pygame, and fill in the key tables that need its key codes. main() does this before anything else.
+def load_pygame():
+    global pygame
+    import pygame
+    PAN_KEYS.update({pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1)})
+    BRUSHES.update({pygame.K_1: 'obstacle', pygame.K_2: 'road', pygame.K_3: 'grass', pygame.K_4: 'swamp'})
+
+
+# Font sizes by name.
+FONTS = {'font': 24, 'smaller': 18, 'smallest': 12}
+
+
+@lru_cache(maxsize=None)
+def get_font(name):
+    return pygame.font.SysFont('Calibri', FONTS[name])
+
+
+# Rendering text is slow, and the overlays and stats draw the same few numbers over and over.
+# Keep the most recently used text surfaces around so each one only gets rasterized once.
+@lru_cache(maxsize=2048)
+def render_text(font_name, text, color):
+    return get_font(font_name).render(text, True, color)
+
+
+# A png from the images folder. Tiles are scaled to the tile size, buttons are used as they are.
+@lru_cache(maxsize=None)
+def load_image(name, scale=None):
+    image = pygame.image.load('images/{}.png'.format(name))
+    if scale is not None:
+        image = pygame.transform.scale(image, (scale, scale))
+    return image.convert()
+
+
+# The steps and skip buttons change their label, so they're drawn here instead of loaded,
+# in the same style as the button pngs - white border, gray inside, white text.
+@lru_cache(maxsize=None)
+def make_button(label):
+    button = pygame.Surface((40, 40)).convert()
+    button.fill(WHITE)
+    button.fill(GRAY, button.get_rect().inflate(-2, -2))
+    text = pygame.font.Font(None, 17).render(label, True, WHITE)
+    button.blit(text, text.get_rect(center=(20, 20)))
+    return button
+
+
+def step_button(choice):
+    return make_button('max' if choice is None else 'x{}'.format(choice))
+
+
+# The grid and the window are set up by setup().
+grid = None
+# Painting and retracing work on cell indices (x * width + y) and read and write the grid's arrays directly.
+# memoryviews index much faster than NumPy does one item at a time.
+cells = None
+parents = None
+weights = None
+screen = None
+
+# The grid is drawn through a camera, so it can be any size. The camera shows VIEW_WIDTH x VIEW_HEIGHT pixels
+# of it, with the cell at column camera_x, row camera_y (which can be fractions) in the top left corner, and
+# zoom pixels to a cell. Mouse wheel or +/- zooms, the arrow keys or dragging with the middle mouse pan,
+# and Home fits the whole grid back in.
+VIEW_WIDTH = 640
+VIEW_HEIGHT = 736
+# zoom levels, in pixels per cell. Below PIXEL_ZOOM tiles are too small to make out, so each cell is drawn as
+# plain pixels of its tile's color instead. Below 1, only every few cells get a pixel.
+ZOOMS = (0.125, 0.25, 0.5, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64)
+PIXEL_ZOOM = 8
+# how far the arrow keys move the camera, in pixels, and which way each one moves it (filled in by load_pygame).
+PAN_STEP = 64
+PAN_KEYS = {}
+camera_x = 0
+camera_y = 0
+zoom = 32
+# the camera position and zoom the view was last drawn at, and what was drawn at it.
+drawn_view = None
+drawn_pixels = None
+
+# The search that's running, if any. It's a BackgroundSearch from background.py - it searches a copy of the grid
+# on a worker thread and tells us which nodes it found, so we can paint as we go. None when nothing is running.
+search = None
+# the cells of the last path found, from start to end.
 path = []
-# dijkstras_path = []
-
-# a flag to tell us when to stop searching for the end.
-bfs_done = True
-dfs_done = True
-dijkstras_done = True
-a_star_done = True
 
 # stats for post-algorithm work
 visited_nodes = 0
 path_length = 0
 status = False
-
-# a flag to track if A* is using diagonal movement heuristic.
+# The running (or last) search's counters, kept up to date after every step so the sidebar can show them live.
+# Every finished search's counters also go in finished_runs, for S to save.
+search_stats = None
+finished_runs = []
+
+# Finished searches, so clicking the same algorithm again on an unchanged grid shows the answer straight away.
+# Any obstacle or terrain edit gives the grid a new version, which is part of the cache key.
+path_cache = PathCache(maxsize=64)
+# which algorithm is running and when it started, so it can go in the cache when it finishes.
+current_algorithm = None
+search_began = 0
+
+# While incremental replanning is on, this is the LPA* planner. It listens to the grid and every edit
+# repairs the path right away, only redoing the part of the search the edit touched.
+lpa_planner = None
+
+# The hierarchical planner, made the first time H is pressed. It listens to the grid, so edits after that
+# only rebuild the clusters they touched.
+hpa_planner = None
+
+# While the distance field is showing, every cell's cost overlay is its distance to the end node. Fields are
+# built with one search backwards from the end node, and kept per grid version and end node.
+distance_fields = DistanceFields(maxsize=4)
+show_distance_field = False
+# the grid version, start and end the field on screen was drawn for.
+drawn_distance_field = None
+
+# a flag to track if searches can move diagonally as well as straight.
 diagonal_movement = False
 show_f_values = False
 
-# Let's call a function that will render the grid. Pass in start/end node flags.
+# what left mouse paints with. Either 'obstacle' or one of the terrain types, picked with the keys in
+# BRUSHES (filled in by load_pygame).
+BRUSHES = {}
+brush = 'obstacle'
+
+# what start_search prints for each algorithm.
+ALGORITHM_NAMES = {'bfs': 'BFS', 'dfs': 'DFS', 'dijkstra': "Dijkstra's Algorithm", 'astar': 'A* Algorithm',
+                   'jps': 'Jump Point Search', 'bibfs': 'Bidirectional BFS', 'biastar': 'Bidirectional A*'}
+
+# Tile pngs by cell value, so drawing a tile is a single lookup.
+TILE_IMAGES = ('blank_space', 'obstacle', 'start_node', 'end_node', 'visited', 'unvisited', 'path')
+
+
+# Blank tiles get tinted by terrain so you can see what the costs are before running anything.
+def tint(surface, color):
+    tinted = surface.copy()
+    tinted.fill(color, special_flags=pygame.BLEND_MULT)
+    return tinted
+
+
+# The tiles for every cell value, and the blank tile for every terrain, at the current tile size.
+@lru_cache(maxsize=None)
+def load_tiles(size):
+    tiles = [load_image(name, size) for name in TILE_IMAGES]
+    blank_space = tiles[0]
+    terrain_tiles = {ROAD: blank_space, GRASS: tint(blank_space, (150, 230, 130)),
+                     SWAMP: tint(blank_space, (160, 130, 90))}
+    return tiles, terrain_tiles
+
+
+# Zoomed far out every cell is drawn as a single pixel, the average color of its tile. This is those colors as
+# pixel values, for every cell value and terrain weight - the color for a cell is palette[value << 8 | weight].
+@lru_cache(maxsize=None)
+def pixel_palette():
+    tiles, terrain_tiles = load_tiles(32)
+    surface = pygame.Surface((1, 1), 0, 32)
+    palette = np.zeros((len(tiles), 256), dtype=np.uint32)
+    for value, tile in enumerate(tiles):
+        palette[value] = surface.map_rgb(pygame.transform.average_color(tile))
+    for weight, tile in terrain_tiles.items():
+        palette[0, weight] = surface.map_rgb(pygame.transform.average_color(tile))
+    return palette.reshape(-1)
+
+
+# Make the grid, and open a window with room for the camera's view of it and the sidebar.
+def setup(width, height):
+    global grid
+    global cells
+    global parents
+    global weights
+    global screen
+    global sidebar_x
+    global sidebar_rect
+    global view_rect
+    # Let's set the grid that we will use for finding paths. See grid.py for what each value means.
+    grid = Grid(width, height)
+    cells = memoryview(grid.cells)
+    parents = memoryview(grid.parent)
+    weights = memoryview(grid.weights)
+
+    # the sidebar with all the buttons and text sits to the right of the view.
+    sidebar_x = VIEW_WIDTH
+    size = (sidebar_x + 240, VIEW_HEIGHT)
+    screen = pygame.display.set_mode(size)
+    pygame.display.set_caption("pathfinding-algorithms")
+    sidebar_rect = pygame.Rect(sidebar_x, 0, 240, size[1])
+    view_rect = pygame.Rect(0, 0, VIEW_WIDTH, VIEW_HEIGHT)
+    fit_camera()
+
+
+# Zoom in as far as we can with the whole grid still in view (tiles no bigger than 32 pixels), from the top left.
+def fit_camera():
+    global zoom
+    fits = min(VIEW_WIDTH / grid.width, VIEW_HEIGHT / grid.height, 32)
+    zoom = max([level for level in ZOOMS if level <= fits] or ZOOMS[:1])
+    move_camera(0, 0)
+
+
+# Point the camera at the given column and row, without letting it wander off the grid.
+def move_camera(x, y):
+    global camera_x
+    global camera_y
+    camera_x = min(max(x, 0), max(grid.width - VIEW_WIDTH / zoom, 0))
+    camera_y = min(max(y, 0), max(grid.height - VIEW_HEIGHT / zoom, 0))
+
+
+# Zoom one level in (direction 1) or out (-1), keeping whatever is under pos where it is.
+def zoom_camera(direction, pos):
+    global zoom
+    level = ZOOMS.index(zoom) + direction
+    if not 0 <= level < len(ZOOMS):
+        return
+    x = camera_x + pos[0] / zoom
+    y = camera_y + pos[1] / zoom
+    zoom = ZOOMS[level]
+    move_camera(x - pos[0] / zoom, y - pos[1] / zoom)
+
+
+# Where on the screen the top left corner of a cell goes.
+def screen_position(row, column):
+    return int(column * zoom - round(camera_x * zoom)), int(row * zoom - round(camera_y * zoom))
+
+
+# The (row, column) of the cell under a point on the screen, or None when there isn't one.
+def cell_at(pos):
+    if not view_rect.collidepoint(pos):
+        return None
+    row = int((pos[1] + round(camera_y * zoom)) // zoom)
+    column = int((pos[0] + round(camera_x * zoom)) // zoom)
+    return (row, column) if grid.in_bounds(row, column) else None
+
+
+# The rows and columns the camera can see, as slices. Below a pixel a cell, only every few cells are drawn.
+def visible_cells():
+    step = max(1, round(1 / zoom))
+    rows = slice(int(camera_y), min(grid.height, math.ceil(camera_y + VIEW_HEIGHT / zoom)), step)
+    columns = slice(int(camera_x), min(grid.width, math.ceil(camera_x + VIEW_WIDTH / zoom)), step)
+    return rows, columns
+
+
+# Let's call a function that will render the grid. Only the cells the camera can see are looked at, so a frame
+# costs about the same however big the grid is. Zoomed in, only tiles whose value or overlay changed since the
+# last frame get blitted, and we hand back the screen rects that need updating. Moving the camera redraws the view.
 def render_grid():
-    # Loop through the entirety of the grid and render the correct png.
-    for i in range(20):
-        for j in range(20):
-            if grid[i][j].value == 0:
-                screen.blit(blank_space, (32 * j, 32 * i))
-            elif grid[i][j].value == 1:
-                screen.blit(obstacle, (32 * j, 32 * i))
-            elif grid[i][j].value == 2:
-                screen.blit(start_node, (32 * j, 32 * i))
-            elif grid[i][j].value == 3:
-                screen.blit(end_node, (32 * j, 32 * i))
-            elif grid[i][j].value == 4:
-                screen.blit(visited, (32 * j, 32 * i))
-            elif grid[i][j].value == 5:
-                screen.blit(unvisited, (32 * j, 32 * i))
-            elif grid[i][j].value == 6:
-                screen.blit(path_block, (32 * j, 32 * i))
-
-    # Update the start_node and end_node flags to make sure this is runnable.
-    start_flag = False
-    end_flag = False
-    global start_pos
-    global end_pos
-    for i in range(20):
-        for j in range(20):
-            if grid[i][j].value == 2:
-                start_flag = True
-                start_pos = [i, j]
-            if grid[i][j].value == 3:
-                end_flag = True
-                end_pos = [i, j]
-    if not start_flag:
-        global start_node_placed
-        start_node_placed = False
-    if not end_flag:
-        global end_node_placed
-        end_node_placed = False
+    global drawn_view
+    global drawn_cells
+    global drawn_weights
+    global drawn_cost
+    global drawn_f
+    rows, columns = visible_cells()
+    if zoom < PIXEL_ZOOM:
+        return render_pixels(rows, columns)
+    values = grid.cells.reshape(grid.height, grid.width)[rows, columns]
+    terrain = grid.weights.reshape(grid.height, grid.width)[rows, columns]
+    costs = grid.cost.reshape(grid.height, grid.width)[rows, columns]
+    f_values = grid.f.reshape(grid.height, grid.width)[rows, columns]
+
+    # What is on screen right now, for the cells in view. 255 is never a real cell value, so after the camera
+    # moves every tile gets drawn.
+    view = (camera_x, camera_y, zoom)
+    redraw = view != drawn_view
+    if redraw:
+        drawn_view = view
+        drawn_cells = np.full(values.shape, 255, dtype=np.uint8)
+        drawn_weights = np.zeros(values.shape, dtype=np.uint8)
+        drawn_cost = np.zeros(values.shape, dtype=np.float64)
+        drawn_f = np.zeros(values.shape, dtype=np.float64)
+        screen.fill(GRAY, view_rect)
+
+    show_overlays = zoom >= 20
+    changed = (values != drawn_cells) | (terrain != drawn_weights)
+    if show_overlays:
+        changed |= costs != drawn_cost
+        if show_f_values:
+            changed |= f_values != drawn_f
+        else:
+            changed |= drawn_f != 0
+    dirty_rows, dirty_columns = np.nonzero(changed)
+    if len(dirty_rows) == 0:
+        return [view_rect] if redraw else []
+
+    dirty = (dirty_rows + rows.start) * grid.width + dirty_columns + columns.start
+    tiles, terrain_tiles = load_tiles(zoom)
+    blank_space = tiles[0]
+    # tiles at the edges hang off the view, and shouldn't be drawn over the sidebar.
+    screen.set_clip(view_rect)
+    for index in dirty.tolist():
+        value = cells[index]
+        tile = terrain_tiles.get(weights[index], blank_space) if value == 0 else tiles[value]
+        screen.blit(tile, screen_position(index // grid.width, index % grid.width))
+    drawn_cells[changed] = values[changed]
+    drawn_weights[changed] = terrain[changed]
+
+    # numbers go back on top of any tile we just redrew.
+    if show_overlays:
+        if show_f_values:
+            print_f_values(dirty)
+            drawn_f[changed] = f_values[changed]
+        else:
+            drawn_f[changed] = 0
+        print_cost_values(dirty)
+        drawn_cost[changed] = costs[changed]
+    screen.set_clip(None)
+
+    # past a certain point one big rect is cheaper than thousands of little ones.
+    if redraw or len(dirty) > values.size // 4:
+        return [view_rect]
+    return [pygame.Rect(screen_position(index // grid.width, index % grid.width), (zoom, zoom)).clip(view_rect)
+            for index in dirty.tolist()]
+
+
+# Zoomed out, the cells in view are turned straight into pixels of their tile's color, and that little
+# surface is scaled up to the zoom. It's cheap enough to rebuild whenever anything in view changes.
+def render_pixels(rows, columns):
+    global drawn_view
+    global drawn_pixels
+    values = grid.cells.reshape(grid.height, grid.width)[rows, columns]
+    terrain = grid.weights.reshape(grid.height, grid.width)[rows, columns]
+    colors = np.take(pixel_palette(), (values.astype(np.uint16) << 8) | terrain)
+
+    view = (camera_x, camera_y, zoom)
+    if view == drawn_view and np.array_equal(colors, drawn_pixels):
+        return []
+    drawn_view = view
+    drawn_pixels = colors
+    screen.fill(GRAY, view_rect)
+    if colors.size:
+        # surfarray wants (x, y), the grid is (row, column).
+        surface = pygame.Surface((colors.shape[1], colors.shape[0]), 0, 32)
+        pygame.surfarray.blit_array(surface, colors.T)
+        cell_size = rows.step * zoom
+        if cell_size != 1:
+            surface = pygame.transform.scale(surface, (round(colors.shape[1] * cell_size),
+                                                       round(colors.shape[0] * cell_size)))
+        screen.set_clip(view_rect)
+        screen.blit(surface, screen_position(rows.start, columns.start))
+        screen.set_clip(None)
+    return [view_rect]
 
 
 # Let's call a function that will clear the grid.
 def clear_grid():
-    # Loop through the entirety of the grid and set back to 0.
-    for i in range(20):
-        for j in range(20):
-            grid[i][j].value = 0
-            grid[i][j].neighbors = []
-            grid[i][j].previous_node = None
-            grid[i][j].start_node = False
-            grid[i][j].visited = False
-            grid[i][j].cost = 0
-            grid[i][j].f = 0
-            grid[i][j].g = 0
-            grid[i][j].h = 0
-            global path
-            path = []
-            bfs_queue.clear()
-            dfs_stack.clear()
-            global visited_nodes
-            global path_length
-            global status
-            visited_nodes = 0
-            path_length = 0
-            status = False
-            global a_star_open
-            global a_star_closed
-            a_star_open = []
-            a_star_closed = []
+    # Set the entirety of the grid back to 0.
+    global show_distance_field
+    show_distance_field = False
+    stop_incremental()
+    grid.clear()
+    reset_search()
 
 
 # Let's reset the grid between searches but without clearing the obstacles and start/end nodes
 def reset_grid():
-    # Loop through the grid and only reset values that are NOT obstacles or nodes.
-    for i in range(20):
-        for j in range(20):
-            if grid[i][j].value > 3:
-                grid[i][j].value = 0
-            grid[i][j].neighbors = []
-            grid[i][j].previous_node = None
-            grid[i][j].start_node = False
-            grid[i][j].visited = False
-            grid[i][j].cost = 0
-            grid[i][j].f = 0
-            grid[i][j].g = 0
-            grid[i][j].h = 0
-            global path
-            path = []
-            bfs_queue.clear()
-            dfs_stack.clear()
-            global visited_nodes
-            global path_length
-            global status
-            visited_nodes = 0
-            path_length = 0
-            status = False
-            global a_star_open
-            global a_star_closed
-            a_star_open = []
-            a_star_closed = []
+    # Only reset values that are NOT obstacles or nodes.
+    global show_distance_field
+    show_distance_field = False
+    stop_incremental()
+    grid.clear_visuals()
+    grid.clear_search()
+    reset_search()
+
+
+# Drop any running search and put the stats back to empty.
+def reset_search():
+    global search
+    global search_stats
+    global path
+    global visited_nodes
+    global path_length
+    global status
+    if search is not None:
+        search.cancel()
+    search = None
+    search_stats = None
+    path = []
+    visited_nodes = 0
+    path_length = 0
+    status = False
 
 
 def print_grid():
@@ -283,12 +449,9 @@ def print_grid():
         print()
 
 
-# Let the loop know that we shouldn't be accepting inputs at the moment.
+# Is a search running on the worker thread?
 def is_running():
-    if not dfs_done or not bfs_done or not dijkstras_done or not a_star_done:
-        return True
-    else:
-        return False
+    return search is not None
 
 
 def print_neighbors(i, j):
@@ -297,482 +460,621 @@ def print_neighbors(i, j):
     print()
 
 
-def print_f_values():
-    for i in range(20):
-        for j in range(20):
-            if grid[i][j].f > 0:
-                target_node = grid[i][j]
-                f_val = smallest_font.render(str(target_node.f), True, BLACK)
-                screen.blit(f_val, (target_node.y * 32 + 12, target_node.x * 32 + 12))
+# Costs with diagonal steps aren't whole numbers, so round them to fit on a tile - 12, or 2.8.
+def format_number(value):
+    return '{:g}'.format(round(value, 1))
+
+
+# Write f values onto the given tiles. The overlays read the arrays straight, not through a Node - the numbers
+# here are whatever was copied in from a search or written by the distance field, and the visible grid's
+# arrays are wiped whenever it starts over, so there's nothing stale to hide.
+def print_f_values(indices):
+    for index in indices[grid.f[indices] > 0].tolist():
+        f_val = render_text('smallest', format_number(grid.f[index]), BLACK)
+        x, y = screen_position(index // grid.width, index % grid.width)
+        screen.blit(f_val, (x + zoom * 3 // 8, y + zoom * 3 // 8))
 
 
-def print_cost_values():
-    for i in range(20):
-        for j in range(20):
-            if grid[i][j].cost > 0:
-                target_node = grid[i][j]
-                cost_value = smallest_font.render(str(target_node.cost), True, BLACK)
-                screen.blit(cost_value, (target_node.y * 32 + 12, target_node.x * 32 + 12))
+# Write costs onto the given tiles.
+def print_cost_values(indices):
+    for index in indices[grid.cost[indices] > 0].tolist():
+        cost_value = render_text('smallest', format_number(grid.cost[index]), BLACK)
+        x, y = screen_position(index // grid.width, index % grid.width)
+        screen.blit(cost_value, (x + zoom * 3 // 8, y + zoom * 3 // 8))
 
 
 def clear_start_node():
-    # Find our start node and clear it.
-    for i in range(20):
-        for j in range(20):
-            if grid[i][j].value == 2:
-                grid[i][j].value = 0
+    # The grid knows where our start node is, so just clear it.
+    if grid.start is not None:
+        grid.set_value(grid.start, 0)
 
 
 def clear_end_node():
-    # Find our start node and clear it.
-    for i in range(20):
-        for j in range(20):
-            if grid[i][j].value == 3:
-                grid[i][j].value = 0
-
-
-def update_stats():
-    # at the end of every algorithm run, output the stats.
-    for i in range(20):
-        for j in range(20):
-            # if we have visited a node, count it.
-            if grid[i][j].value == 4:
-                global visited_nodes
-                visited_nodes += 1
-            # if our node is a path, count it as visited and as a path node.
-            if grid[i][j].value == 6:
-                global path_length
-                path_length += 1
-                visited_nodes += 1
-
-
-def calculate_heuristic(node_a, node_b):
-    # Since we only have 4 directions, use Manhattan Distance between node a and node b.
-    # Manhattan Distance is the absolute value of (node_a.x - node_b.x) - absolute value of (node_a.y - node_b.y).
-    if not diagonal_movement:
-        x = abs(node_a.x - node_b.x)
-        y = abs(node_a.y - node_b.y)
-
-    # Manhattan Distance with an emphasis on diagonal movement.
-    # on much larger grids, this can increase computation time.
+    # The grid knows where our end node is, so just clear it.
+    if grid.end is not None:
+        grid.set_value(grid.end, 0)
+
+
+# Paint the path between the start and end node. Anything painted onto the grid since the search started
+# (like a new obstacle) stays on top.
+def paint_path():
+    for index in path[1:-1]:
+        if cells[index] in (0, 4, 5):
+            cells[index] = 6
+
+
+# Look for this search in the cache. On a hit, paint the cached path and stats straight away instead of searching.
+def show_cached_result(algorithm):
+    global visited_nodes
+    global path_length
+    global status
+    global current_algorithm
+    global search_began
+    global search_stats
+    result = path_cache.get(grid, grid.position(grid.start), grid.position(grid.end), algorithm, diagonal_movement)
+    if result is None:
+        current_algorithm = algorithm
+        search_began = time.perf_counter()
+        return False
+    print("found cached result")
+    for x, y in result.path[1:-1]:
+        cells[grid.index(x, y)] = 6
+    visited_nodes = result.visited_nodes
+    path_length = result.path_length
+    status = result.status
+    search_stats = result.stats
+    return True
+
+
+# Put the search that just finished into the cache, in the same shape solve() hands back.
+def remember_search():
+    full_path = [grid.position(index) for index in path]
+    result = SearchResult(current_algorithm, full_path, visited_nodes, time.perf_counter() - search_began,
+                          search_stats.expanded, search_stats.peak_open, path_cost(grid, full_path), search_stats)
+    path_cache.put(grid, grid.position(grid.start), grid.position(grid.end), current_algorithm, diagonal_movement, result)
+
+
+# How fast the worker should run the search - steps_per_frame steps every run_speed-th of a second, or flat out.
+def search_pace():
+    return None if steps_per_frame is None else (steps_per_frame, 1 / run_speed)
+
+
+# Start a search for the algorithm picked in the sidebar. It runs on a worker thread, on a copy of the grid,
+# and the main loop paints what it's done every frame. Starting one while another is running cancels that one.
+def start_search(algorithm):
+    global search
+    global search_stats
+    reset_grid()
+    if grid.start is None or grid.end is None or show_cached_result(algorithm):
+        return
+    try:
+        search = BackgroundSearch(grid, grid.position(grid.start), grid.position(grid.end), algorithm,
+                                  diagonal_movement, search_pace())
+    except ValueError as error:
+        print(error)
+        return
+    search_stats = search.stats
+    print("starting", ALGORITHM_NAMES[algorithm])
+
+
+# Stop the running search where it is, leaving what it painted so far on the grid.
+def cancel_search():
+    global search
+    search.cancel()
+    search = None
+    print("cancelled")
+
+
+# Paint everything the worker has sent since last frame - nodes expanded and reached, and their costs for the
+# overlays - and finish up if it's done.
+def update_search():
+    touched = []
+    while search is not None:
+        try:
+            message = search.messages.get_nowait()
+        except queue.Empty:
+            break
+        if message[0] == 'done':
+            copy_search_state(np.flatnonzero(search.grid.visited))
+            finish_search(message[1], message[2])
+            return
+        for current, discovered in message[1]:
+            # change color if we are a neighboring node. Start and end nodes keep their colors.
+            if cells[current] == 5:
+                cells[current] = 4
+            for neighbor in discovered:
+                if cells[neighbor] == 0:
+                    cells[neighbor] = 5
+            touched.append(current)
+            touched.extend(discovered)
+    if touched and search is not None:
+        copy_search_state(np.array(touched))
+
+
+# The search keeps its numbers in its own copy of the grid. Copy the ones for these cells across so the
+# overlays can show them.
+def copy_search_state(indices):
+    searched = search.grid
+    grid.cost[indices] = searched.cost[indices]
+    grid.g[indices] = searched.g[indices]
+    grid.f[indices] = searched.f[indices]
+    grid.parent[indices] = searched.parent[indices]
+    grid.stamp[indices] = grid.generation
+
+
+# The search is over. Paint the path if it found one, and remember it for next time - as long as the grid
+# wasn't edited while it ran, since then the answer is for a grid that isn't there anymore.
+def finish_search(found, found_path):
+    global search
+    global path
+    global visited_nodes
+    global path_length
+    global status
+    finished = search
+    search = None
+    if found:
+        print("found end node")
     else:
-        x = abs(node_a.x - node_b.x) ** 2
-        y = abs(node_a.y - node_b.y) ** 2
+        print("no solution")
+    path = found_path
+    paint_path()
+    visited_nodes = search_stats.visited_nodes()
+    path_length = max(len(path) - 2, 0)
+    status = found
+    finished_runs.append(search_stats)
+    if (finished.version, finished.start, finished.end, finished.diagonal_movement) == (
+            grid.version, grid.start, grid.end, diagonal_movement):
+        remember_search()
+
+
+# LPA*, HPA* and the distance field only move 4 ways. Starting one turns diagonal movement off, so the
+# toggle never says 8 directions while what's on screen moved 4.
+def four_way_only(name):
+    global diagonal_movement
+    if diagonal_movement:
+        diagonal_movement = False
+        print(name, "only moves in 4 directions, so diagonal movement is off")
 
-    return x + y
 
+# The diagonal movement button. Does nothing while a 4-way mode is on.
+def toggle_diagonal():
+    global diagonal_movement
+    if four_way_mode() is not None:
+        print("diagonal movement stays off while", four_way_mode(), "is on")
+    else:
+        diagonal_movement = not diagonal_movement
 
-def bfs_start():
-    reset_grid()
-    if start_node_placed and end_node_placed:
-        for x in grid:
-            for y in x:
-                y.add_neighbors()
-        print("added neighbors for BFS")
-        # after adding the correct neighbors, let's try BFS.
-        global bfs_done
-        bfs_done = False
-        # set the starting point with no previous node.
-        grid[start_pos[0]][start_pos[1]].start_node = True
-        # add the start node to the queue!
-        bfs_queue.append(grid[start_pos[0]][start_pos[1]])
-
-
-def dfs_start():
-    reset_grid()
-    if start_node_placed and end_node_placed:
-        for x in grid:
-            for y in x:
-                y.add_dfs_neighbors()
-        print("added neighbors for DFS")
-        global dfs_done
-        dfs_done = False
-        grid[start_pos[0]][start_pos[1]].start_node = True
-        dfs_stack.append(grid[start_pos[0]][start_pos[1]])
-
-
-def dijkstras_start():
+
+# The 4-way mode that's on right now, if any. While one is on, the diagonal movement toggle is grayed out
+# and clicking it does nothing.
+def four_way_mode():
+    if lpa_planner is not None:
+        return "LPA*"
+    if show_distance_field:
+        return "the distance field"
+    return None
+
+
+def lpa_start():
     reset_grid()
-    if start_node_placed and end_node_placed:
-        for x in grid:
-            for y in x:
-                # we can use bfs add_neighbors since they work the same way in same-cost grids.
-                y.add_neighbors()
-        print("added neighbors for Dijkstra's Algorithm")
-        global dijkstras_done
-        dijkstras_done = False
-        grid[start_pos[0]][start_pos[1]].start_node = True
-        bfs_queue.append(grid[start_pos[0]][start_pos[1]])
-
-
-def a_star_start():
+    if grid.start is not None and grid.end is not None:
+        print("starting incremental replanning (LPA*)")
+        four_way_only("LPA*")
+        global lpa_planner
+        lpa_planner = IncrementalPlanner(grid, grid.position(grid.start), grid.position(grid.end))
+        show_incremental()
+
+
+# Turn incremental replanning off, if it's on.
+def stop_incremental():
+    global lpa_planner
+    if lpa_planner is not None:
+        lpa_planner.close()
+        lpa_planner = None
+
+
+# Bring the planner up to date and paint what it did - the nodes this replan had to expand, and the path.
+def show_incremental():
+    global visited_nodes
+    global path_length
+    global status
+    result = lpa_planner.plan()
+    grid.clear_visuals()
+    for index in lpa_planner.touched:
+        if cells[index] == 0:
+            cells[index] = 4
+    for x, y in result.path[1:-1]:
+        cells[grid.index(x, y)] = 6
+    print("replanned, expanded", result.expanded, "nodes")
+    visited_nodes = result.visited_nodes
+    path_length = result.path_length
+    status = result.status
+
+
+# Something was edited while incremental replanning is on. Replan if it changed anything.
+def update_incremental():
+    if grid.start is None or grid.end is None:
+        stop_incremental()
+        return
+    lpa_planner.move(grid.position(grid.start), grid.position(grid.end))
+    if lpa_planner.stale():
+        show_incremental()
+
+
+# Find a path with HPA* and paint it, along with the cluster entrances its abstract search expanded.
+def show_hierarchical():
+    global hpa_planner
+    global visited_nodes
+    global path_length
+    global status
+    global search_stats
     reset_grid()
-    if start_node_placed and end_node_placed:
-        for x in grid:
-            for y in x:
-                y.add_neighbors()
-        print("added neighbors for A* Algorithm")
-        global a_star_done
-        a_star_done = False
-        grid[start_pos[0]][start_pos[1]].start_node = True
-        a_star_open.append(grid[start_pos[0]][start_pos[1]])
+    if grid.start is None or grid.end is None:
+        return
+    four_way_only("hierarchical A*")
+    if hpa_planner is None:
+        hpa_planner = HierarchicalPlanner(grid)
+    result = hpa_planner.find_path(grid.position(grid.start), grid.position(grid.end))
+    for index in hpa_planner.touched:
+        if cells[index] == 0:
+            cells[index] = 4
+    for x, y in result.path[1:-1]:
+        cells[grid.index(x, y)] = 6
+    print("hierarchical A* expanded", result.expanded, "nodes in", round(1000 * result.elapsed, 3), "ms")
+    visited_nodes = result.visited_nodes
+    path_length = result.path_length
+    status = result.status
+    search_stats = result.stats
+    finished_runs.append(result.stats)
+
+
+# Write every cell's distance to the end node into the cost overlay, and follow the field down from the start node.
+def draw_distance_field():
+    global visited_nodes
+    global path_length
+    global status
+    global drawn_distance_field
+    grid.clear_visuals()
+    grid.clear_search()
+    drawn_distance_field = (grid.version, grid.start, grid.end)
+    four_way_only("the distance field")
+    if grid.end is None:
+        return
+    field = distance_fields.get(grid, grid.position(grid.end))
+    print("distance field to the end node reaches", field.reached, "cells")
+    # unreachable cells get no number.
+    grid.cost[:] = np.where(field.distances == field.unreachable, 0, field.distances)
+    if grid.start is not None:
+        field_path = field.path(grid.position(grid.start))
+        for x, y in field_path[1:-1]:
+            cells[grid.index(x, y)] = 6
+        visited_nodes = field.reached
+        path_length = max(len(field_path) - 2, 0)
+        status = len(field_path) > 0
+
+
+# The sidebar text and buttons never change, so draw them once onto their own surface, the first time it's needed.
+@lru_cache(maxsize=None)
+def sidebar_background():
+    background = pygame.Surface(sidebar_rect.size).convert()
+    background.fill(GRAY)
+    background.blit(render_text('font', 'Click to clear the grid', WHITE), (20, 100))
+    background.blit(render_text('smaller', 'Press Q to create start node', WHITE), (20, 656))
+    background.blit(render_text('smaller', 'Press E to create end node', WHITE), (25, 696))
+    background.blit(render_text('smaller', 'Click and drag left mouse', WHITE), (30, 536))
+    background.blit(render_text('smaller', 'to paint with the brush', WHITE), (55, 556))
+    background.blit(render_text('smaller', 'Click and drag right mouse', WHITE), (25, 596))
+    background.blit(render_text('smaller', 'to erase obstacles', WHITE), (55, 616))
+
+    # algorithm buttons.
+    background.blit(load_image('bfs'), (10, 150))
+    background.blit(load_image('dfs'), (70, 150))
+    background.blit(load_image('da'), (130, 150))
+    background.blit(load_image('astar'), (190, 150))
+    background.blit(load_image('jps'), (10, 200))
+    background.blit(load_image('bibfs'), (70, 200))
+    background.blit(load_image('biastar'), (130, 200))
+    background.blit(load_image('lpastar'), (190, 200))
+    background.blit(make_button('skip'), (10, 320))
+    background.blit(render_text('smallest', 'steps/frame', WHITE), (8, 302))
+
+    # A* conditional labels
+    background.blit(render_text('smallest', 'diagonal movement', WHITE), (85, 270))
+    background.blit(render_text('smallest', '(8 directions)', WHITE), (100, 280))
+    background.blit(render_text('smallest', 'show f values', WHITE), (110, 335))
+    return background
+
+
+# A see-through gray square to lay over a toggle that can't be clicked right now.
+@lru_cache(maxsize=None)
+def disabled_cover():
+    cover = pygame.Surface(load_image('off').get_size())
+    cover.fill(GRAY)
+    cover.set_alpha(170)
+    return cover
+
+
+# what the sidebar showed last frame.
+drawn_sidebar = None
+
+
+# Redraw the sidebar, but only when a toggle or the stats changed.
+def render_sidebar():
+    global drawn_sidebar
+    sidebar_state = (diagonal_movement, show_f_values, visited_nodes, path_length, status, brush,
+                     path_cache.hits, path_cache.misses, lpa_planner is not None, steps_per_frame, is_running(),
+                     four_way_mode(),
+                     None if search_stats is None else tuple(search_stats.as_dict().values()))
+    if sidebar_state == drawn_sidebar:
+        return []
+    drawn_sidebar = sidebar_state
+    screen.blit(sidebar_background(), sidebar_rect.topleft)
+
+    # Conditionals for A* and Dijkstra's that can be triggered.
+    if diagonal_movement:
+        screen.blit(load_image('on'), (sidebar_x + 190, 260))
+    else:
+        screen.blit(load_image('off'), (sidebar_x + 190, 260))
+    # grayed out while a 4-way mode is on.
+    if four_way_mode() is not None:
+        screen.blit(disabled_cover(), (sidebar_x + 190, 260))
+    if show_f_values:
+        screen.blit(load_image('on'), (sidebar_x + 190, 320))
+    else:
+        screen.blit(load_image('off'), (sidebar_x + 190, 320))
+    screen.blit(step_button(steps_per_frame), (sidebar_x + 10, 260))
+
+    # if we want to update our stats, blit the text.
+    if visited_nodes > 0:
+        stats_1_text = render_text('smaller', 'Visited Nodes: ' + str(visited_nodes), WHITE)
+        stats_2_text = render_text('smaller', 'Path Nodes: ' + str(path_length), WHITE)
+        stats_3_text = render_text('smaller', 'Status: ' + ('Succeeded' if status else 'Failed'), WHITE if status else RED)
+        screen.blit(stats_1_text, (sidebar_x + 20, 370))
+        screen.blit(stats_2_text, (sidebar_x + 20, 390))
+        screen.blit(stats_3_text, (sidebar_x + 20, 410))
+
+    # how often clicking an algorithm could reuse an earlier search.
+    cache_text = 'Cache: {} hits, {} misses'.format(path_cache.hits, path_cache.misses)
+    screen.blit(render_text('smallest', cache_text, WHITE), (sidebar_x + 20, 428))
+
+    # show which brush the left mouse paints with.
+    screen.blit(render_text('smaller', 'Brush (1-4): ' + brush, WHITE), (sidebar_x + 20, 445))
+    if lpa_planner is not None:
+        screen.blit(render_text('smallest', 'LPA* on - every edit replans', WHITE), (sidebar_x + 20, 463))
+    elif is_running():
+        screen.blit(render_text('smallest', 'Searching - Esc to cancel', WHITE), (sidebar_x + 20, 463))
+
+    # what the search is doing, counted as it goes.
+    if search_stats is not None:
+        counter_lines = (
+            'expanded {}   pushes {}'.format(search_stats.expanded, search_stats.pushes),
+            'pops {}   decrease keys {}'.format(search_stats.pops, search_stats.decrease_keys),
+            'peak open {}   touched {}'.format(search_stats.peak_open, search_stats.touched),
+            'setup {:.1f}   search {:.1f}   path {:.1f} ms'.format(
+                1000 * search_stats.setup_time, 1000 * search_stats.search_time, 1000 * search_stats.path_time),
+        )
+        for number, line in enumerate(counter_lines):
+            screen.blit(render_text('smallest', line, WHITE), (sidebar_x + 20, 480 + 13 * number))
+    return [sidebar_rect]
+
+
+# Grid dimensions come from the command line, defaulting to the original 20x20.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Visualize pathfinding algorithms on a grid.')
+    parser.add_argument('--width', type=int, default=20, help='number of columns in the grid')
+    parser.add_argument('--height', type=int, default=20, help='number of rows in the grid')
+    return parser.parse_args(argv)
 
 
 # -------- Main Program Loop -----------
-while not done:
-    # --- Main event loop ---
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            done = True
-
-        # Check if we clicked on the right side for various buttons.
-        # "clear grid" text.
-        if event.type == pygame.MOUSEBUTTONUP and not is_running():
-            pos = pygame.mouse.get_pos()
-            if 650 < pos[0] < 860 and 90 < pos[1] < 130:
-                clear_grid()
-                start_node_placed = False
-                end_node_placed = False
-
-            # Check if we clicked BFS.
-            elif 650 < pos[0] < 690 and 150 < pos[1] < 190:
-                bfs_start()
-
-            # Check if we clicked DFS.
-            elif 710 < pos[0] < 750 and 150 < pos[1] < 190:
-                dfs_start()
-
-            # Check if we clicked Dijkstra's.
-            elif 770 < pos[0] < 810 and 150 < pos[1] < 190:
-                dijkstras_start()
-
-            # Check if we clicked A*.
-            elif 830 < pos[0] < 870 and 150 < pos[1] < 190:
-                a_star_start()
-
-            # Check if we clicked Diagonal Movement Heuristic button.
-            elif 830 < pos[0] < 870 and 210 < pos[1] < 250:
-                if diagonal_movement:
-                    diagonal_movement = False
-                else:
-                    diagonal_movement = True
-
-            # Check if we clicked show f values button.
-            elif 830 < pos[0] < 870 and 270 < pos[1] < 310:
-                if show_f_values:
-                    show_f_values = False
-                else:
-                    show_f_values = True
-
-        # Check for mouse pressed down.
-        if event.type == pygame.MOUSEMOTION and not is_running():
-            pos = pygame.mouse.get_pos()
-            if pos[0] < 640:
-                # Set the corresponding grid value to new value.
-                # If we are left clicking, set value to 1 (obstacle)
-                if pygame.mouse.get_pressed()[0]:
-                    grid[pos[1] // 32][pos[0] // 32].value = 1
-
-                # If we are right clicking, "erase" by setting value to 0.
-                if pygame.mouse.get_pressed()[2]:
-                    grid[pos[1] // 32][pos[0] // 32].value = 0
-
-        if event.type == pygame.KEYDOWN and not is_running():
-            # Check for pressing down start_node button
-            if event.key == pygame.K_q:
+def main(argv=None):
+    global steps_per_frame
+    global show_f_values
+    global brush
+    global show_distance_field
+    args = parse_args(argv)
+    load_pygame()
+    pygame.init()
+    pygame.font.init()
+    setup(args.width, args.height)
+
+    # Keep loop running until we quit
+    done = False
+
+    # FPS clock
+    clock = pygame.time.Clock()
+
+    # background image. Everything after this is drawn as it changes.
+    screen.fill(GRAY)
+    pygame.display.flip()
+
+    while not done:
+        # --- Main event loop ---
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                done = True
+
+            # The mouse wheel zooms the camera in and out around the mouse. Scrolling also sends button 4 and 5
+            # clicks, which shouldn't press anything.
+            if event.type == pygame.MOUSEWHEEL:
                 pos = pygame.mouse.get_pos()
-                if pos[0] < 640:
-                    clear_start_node()
-                    grid[pos[1]//32][pos[0]//32].value = 2
-                    start_node_placed = True
+                if view_rect.collidepoint(pos):
+                    zoom_camera(1 if event.y > 0 else -1, pos)
+            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP) and event.button > 3:
+                continue
 
-            # Check for pressing down end_node button
-            if event.key == pygame.K_e:
+            # The steps and skip buttons work while a search is running.
+            if event.type == pygame.MOUSEBUTTONUP:
                 pos = pygame.mouse.get_pos()
-                if pos[0] < 640:
-                    clear_end_node()
-                    grid[pos[1]//32][pos[0]//32].value = 3
-                    end_node_placed = True
-
-            # Print out grid into console for debugging.
-            if event.key == pygame.K_p:
-                print_grid()
-
-    # run bfs
-    if not bfs_done:
-        fps_speed = run_speed
-        # do we have any more nodes left in queue?
-        if len(bfs_queue) > 0:
-            # set our current node (starts at start_node pos, ends at end_node pos)
-            current_node = bfs_queue.popleft()
-            # change color if we are a neighboring node.
-            if current_node.value == 5:
-                current_node.value = 4
-            # check if we are at the end.
-            if current_node.x == end_pos[0] and current_node.y == end_pos[1]:
-                print("found end node")
-                bfs_done = True
-                temp = current_node
-                # retrace our steps!
-                while not temp.previous_node.start_node:
-                    # print(temp.previous_node.y)
-                    path.append(temp.previous_node)
-                    temp = temp.previous_node
-                # change our path visuals.
-                for node in path:
-                    node.value = 6
-                update_stats()
-                status = True
-                fps_speed = 60
-
-            # if we are not at the end node...
-            else:
-                # get the neighbors of the current node and add them to queue.
-                for neighbor in current_node.neighbors:
-                    # If they are not visited and not an obstacle, keep going.
-                    if not neighbor.visited and neighbor.value != 1:
-                        neighbor.visited = True
-                        # keep start node and end node same colors.
-                        if neighbor.value != 2 and neighbor.value != 3:
-                            neighbor.value = 5
-                        neighbor.previous_node = current_node
-                        bfs_queue.append(neighbor)
-
-        # if the queue is empty and we don't have the end node yet, no solution.
-        else:
-            print("no solution")
-            bfs_done = True
-            update_stats()
-            status = False
-
-    # run dfs
-    if not dfs_done:
-        fps_speed = run_speed
-        # do we have any more nodes left in stack?
-        if len(dfs_stack) > 0:
-            # set our current node (starts at start_node pos, ends at end_node pos)
-            current_node = dfs_stack.pop()
-            # change color if we are a neighboring node.
-            if current_node.value == 5:
-                current_node.value = 4
-            # check if we are at the end.
-            if current_node.x == end_pos[0] and current_node.y == end_pos[1]:
-                print("found end node")
-                dfs_done = True
-                temp = current_node
-                # retrace our steps!
-                while not temp.previous_node.start_node:
-                    # print(temp.previous_node.y)
-                    path.append(temp.previous_node)
-                    temp = temp.previous_node
-                # change our path visuals.
-                for node in path:
-                    node.value = 6
-                update_stats()
-                status = True
-                fps_speed = 60
-
-            # if we are not at the end node...
-            else:
-                # get the neighbors of the current node and add them to queue.
-                for neighbor in current_node.neighbors:
-                    # If they are not visited and not an obstacle, keep going.
-                    if not neighbor.visited and neighbor.value != 1:
-                        neighbor.visited = True
-                        # keep start node and end node same colors.
-                        if neighbor.value != 2 and neighbor.value != 3:
-                            neighbor.value = 5
-                        neighbor.previous_node = current_node
-                        dfs_stack.append(neighbor)
-
-        # if the queue is empty and we don't have the end node yet, no solution.
-        else:
-            print("no solution")
-            dfs_done = True
-            update_stats()
-            status = False
-
-    # run dijkstra's
-    if not dijkstras_done:
-        fps_speed = run_speed
-        # do we have any more nodes left in queue?
-        if len(bfs_queue) > 0:
-            # set our current node (starts at start_node pos, ends at end_node pos)
-            current_node = bfs_queue.popleft()
-            # change color if we are a neighboring node and add cost.
-            if current_node.value == 5:
-                current_node.value = 4
-            # check if we are at the end.
-            if current_node.x == end_pos[0] and current_node.y == end_pos[1]:
-                print("found end node")
-                dijkstras_done = True
-                temp = current_node
-                # retrace our steps!
-                while not temp.previous_node.start_node:
-                    # print(temp.previous_node.y)
-                    path.append(temp.previous_node)
-                    temp = temp.previous_node
-                # change our path visuals.
-                for node in path:
-                    node.value = 6
-                update_stats()
-                status = True
-                fps_speed = 60
-
-            # if we are not at the end node...
-            else:
-                # get the neighbors of the current node and add them to queue.
-                for neighbor in current_node.neighbors:
-                    # If they are not visited and not an obstacle, keep going.
-                    if not neighbor.visited and neighbor.value != 1 and neighbor.value != 2:
-                        neighbor.visited = True
-                        neighbor.cost = current_node.cost + 1
-                        # keep start node and end node same colors.
-                        if neighbor.value != 2 and neighbor.value != 3:
-                            neighbor.value = 5
-                        neighbor.previous_node = current_node
-                        bfs_queue.append(neighbor)
-
-        # if the queue is empty and we don't have the end node yet, no solution.
-        else:
-            print("no solution")
-            dijkstras_done = True
-            update_stats()
-            status = False
-
-    # run A*
-    if not a_star_done:
-        fps_speed = run_speed
-        # store end node, as we need to use it to estimate the distance.
-        a_star_end = grid[end_pos[0]][end_pos[1]]
-        # do we have any more nodes left in list?
-        if len(a_star_open) > 0:
-            # set our current node. Needs to be the lowest F cost on open list.
-            # for starting node, all f values will be zero so it will remain the starting node.
-            winning_index = 0
-            for i in range(len(a_star_open)):
-                if a_star_open[i].f < a_star_open[winning_index].f:
-                    winning_index = i
-
-            # now, winning_index should be the index of lowest F cost node.
-            current_node = a_star_open[winning_index]
-            # change color if we are a neighboring node.
-            if current_node.value == 5:
-                current_node.value = 4
-
-            # check if we are at the end.
-            if current_node.x == end_pos[0] and current_node.y == end_pos[1]:
-                print("found end node")
-                a_star_done = True
-                temp = current_node
-                # retrace our steps!
-                while not temp.previous_node.start_node:
-                    path.append(temp.previous_node)
-                    temp = temp.previous_node
-                # change our path visuals.
-                for node in path:
-                    node.value = 6
-                update_stats()
-                status = True
-                fps_speed = 60
-
-            # if we are not at the end node...
-            else:
-                # we need to move the node from the open list to the closed one.
-                a_star_open.remove(current_node)
-                a_star_closed.append(current_node)
-
-                # get the neighbors of the current node and give them g, f, h values.
-                # .. but only if they are not in the closed list already or they are an obstacle.
-                for neighbor in current_node.neighbors:
-                    if neighbor.value == 1 or neighbor in a_star_closed:
-                        # if they are, just ignore everything else and go to next neighbor.
-                        continue
-                    placeholder = current_node.g + 1
-
-                    # now we need to see if the neighbor is in the open list.
-                    # if it is, just update the g value if we need to.
-                    if neighbor in a_star_open:
-                        if placeholder < neighbor.g:
-                            neighbor.g = placeholder
-
-                    # if it's not in either open or closed set, put it in the open set.
-                    else:
-                        if not neighbor.visited and neighbor.value != 1:
-                            neighbor.visited = True
-                            # keep start node and end node same colors.
-                            if neighbor.value != 2 and neighbor.value != 3:
-                                neighbor.value = 5
-                        neighbor.g = placeholder
-                        a_star_open.append(neighbor)
-
-                    # track previous node.
-                    neighbor.previous_node = current_node
-                    # update h and f according to heuristic and g.
-                    neighbor.h = calculate_heuristic(neighbor, a_star_end)
-                    neighbor.f = neighbor.g + neighbor.h
-
-        # if the open list is empty and we don't have the end node yet, no solution.
-        else:
-            print("no solution")
-            a_star_done = True
-            update_stats()
-            status = False
+                # Check if we clicked the steps per frame button, and go to the next choice.
+                if sidebar_x + 10 < pos[0] < sidebar_x + 50 and 260 < pos[1] < 300:
+                    steps_per_frame = STEP_CHOICES[(STEP_CHOICES.index(steps_per_frame) + 1) % len(STEP_CHOICES)]
+                    if is_running():
+                        search.pace = search_pace()
+                    continue
+
+                # Check if we clicked skip, and finish the search without drawing anything in between.
+                if sidebar_x + 10 < pos[0] < sidebar_x + 50 and 320 < pos[1] < 360:
+                    if is_running():
+                        search.skip()
+                    continue
+
+            # Check if we clicked on the right side for various buttons. Everything works while a search runs -
+            # it has its own copy of the grid, and starting another search or clearing the grid cancels it.
+            # "clear grid" text.
+            if event.type == pygame.MOUSEBUTTONUP:
+                pos = pygame.mouse.get_pos()
+                if sidebar_x + 10 < pos[0] < sidebar_x + 220 and 90 < pos[1] < 130:
+                    clear_grid()
 
-    # background image
-    screen.fill(GRAY)
+                # Check if we clicked BFS.
+                elif sidebar_x + 10 < pos[0] < sidebar_x + 50 and 150 < pos[1] < 190:
+                    start_search('bfs')
 
-    # rendering code
-    render_grid()
-    if show_f_values:
-        print_f_values()
+                # Check if we clicked DFS.
+                elif sidebar_x + 70 < pos[0] < sidebar_x + 110 and 150 < pos[1] < 190:
+                    start_search('dfs')
 
-    print_cost_values()
+                # Check if we clicked Dijkstra's.
+                elif sidebar_x + 130 < pos[0] < sidebar_x + 170 and 150 < pos[1] < 190:
+                    start_search('dijkstra')
 
-    # render text on screen.
-    screen.blit(clear_text, (660, 100))
-    screen.blit(start_text, (660, 550))
-    screen.blit(end_text, (665, 590))
-    screen.blit(obstacle_text_1, (670, 430))
-    screen.blit(obstacle_text_2, (695, 450))
-    screen.blit(obstacle_text_3, (665, 490))
-    screen.blit(obstacle_text_4, (695, 510))
+                # Check if we clicked A*.
+                elif sidebar_x + 190 < pos[0] < sidebar_x + 230 and 150 < pos[1] < 190:
+                    start_search('astar')
 
-    # render algorithm buttons.
-    screen.blit(bfs, (650, 150))
-    screen.blit(dfs, (710, 150))
-    screen.blit(da, (770, 150))
-    screen.blit(astar, (830, 150))
+                # Check if we clicked Jump Point Search.
+                elif sidebar_x + 10 < pos[0] < sidebar_x + 50 and 200 < pos[1] < 240:
+                    start_search('jps')
 
-    # Conditionals for A* and Dijkstra's that can be triggered.
-    if diagonal_movement:
-        screen.blit(on, (830, 210))
-    else:
-        screen.blit(off, (830, 210))
-    if show_f_values:
-        screen.blit(on, (830, 270))
-    else:
-        screen.blit(off, (830, 270))
+                # Check if we clicked Bidirectional BFS.
+                elif sidebar_x + 70 < pos[0] < sidebar_x + 110 and 200 < pos[1] < 240:
+                    start_search('bibfs')
 
-    # Display A* conditional labels
-    screen.blit(diagonal_priority1, (725, 220))
-    screen.blit(diagonal_priority2, (740, 230))
-    screen.blit(show_f, (750, 285))
+                # Check if we clicked Bidirectional A*.
+                elif sidebar_x + 130 < pos[0] < sidebar_x + 170 and 200 < pos[1] < 240:
+                    start_search('biastar')
 
-    # if we want to update our stats, blit the text.
-    if visited_nodes > 0:
-        stats_1_text = smaller_font.render('Visited Nodes: ' + str(visited_nodes), True, WHITE)
-        stats_2_text = smaller_font.render('Path Nodes: ' + str(path_length), True, WHITE)
-        stats_3_text = smaller_font.render('Status: ' + ('Succeeded' if status else 'Failed'), True, WHITE if status else RED)
-        screen.blit(stats_1_text, (660, 320))
-        screen.blit(stats_2_text, (660, 340))
-        screen.blit(stats_3_text, (660, 360))
-
-    # update screen and flip
-    pygame.display.flip()
+                # Check if we clicked LPA* (incremental replanning).
+                elif sidebar_x + 190 < pos[0] < sidebar_x + 230 and 200 < pos[1] < 240:
+                    lpa_start()
+
+                # Check if we clicked Diagonal Movement Heuristic button.
+                elif sidebar_x + 190 < pos[0] < sidebar_x + 230 and 260 < pos[1] < 300:
+                    toggle_diagonal()
 
-    # 60 fps unless we decide otherwise
-    clock.tick(fps_speed)
+                # Check if we clicked show f values button.
+                elif sidebar_x + 190 < pos[0] < sidebar_x + 230 and 320 < pos[1] < 360:
+                    if show_f_values:
+                        show_f_values = False
+                    else:
+                        show_f_values = True
+
+            # Dragging with the middle mouse pans the camera.
+            if event.type == pygame.MOUSEMOTION and pygame.mouse.get_pressed()[1]:
+                move_camera(camera_x - event.rel[0] / zoom, camera_y - event.rel[1] / zoom)
 
-# Quit after the main loop ends (i.e player presses the "x")
-pygame.quit()
+            # Check for mouse pressed down.
+            if event.type == pygame.MOUSEMOTION:
+                pos = pygame.mouse.get_pos()
+                cell = cell_at(pos)
+                if cell is not None:
+                    target_node = grid[cell[0]][cell[1]]
+                    # Set the corresponding grid value to new value.
+                    # If we are left clicking with the obstacle brush, set value to 1 (obstacle).
+                    # Terrain brushes change the weight instead, clearing any obstacle that was there.
+                    if pygame.mouse.get_pressed()[0]:
+                        if brush == 'obstacle':
+                            target_node.value = 1
+                        else:
+                            target_node.weight = TERRAIN[brush]
+                            if target_node.value == 1:
+                                target_node.value = 0
+
+                    # If we are right clicking, "erase" by setting value to 0 and the terrain back to road.
+                    if pygame.mouse.get_pressed()[2]:
+                        target_node.value = 0
+                        target_node.weight = ROAD
+
+            if event.type == pygame.KEYDOWN:
+                # Escape cancels the running search.
+                if event.key == pygame.K_ESCAPE and is_running():
+                    cancel_search()
+
+                # Arrow keys pan the camera, +/- zoom it around the middle of the view, and Home fits the grid in.
+                if event.key in PAN_KEYS:
+                    x, y = PAN_KEYS[event.key]
+                    move_camera(camera_x + x * PAN_STEP / zoom, camera_y + y * PAN_STEP / zoom)
+                if event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                    zoom_camera(1, view_rect.center)
+                if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    zoom_camera(-1, view_rect.center)
+                if event.key == pygame.K_HOME:
+                    fit_camera()
+
+                # Check for pressing down start_node button
+                if event.key == pygame.K_q:
+                    pos = pygame.mouse.get_pos()
+                    cell = cell_at(pos)
+                    if cell is not None:
+                        clear_start_node()
+                        grid[cell[0]][cell[1]].value = 2
+
+                # Check for pressing down end_node button
+                if event.key == pygame.K_e:
+                    pos = pygame.mouse.get_pos()
+                    cell = cell_at(pos)
+                    if cell is not None:
+                        clear_end_node()
+                        grid[cell[0]][cell[1]].value = 3
+
+                # Pick a brush for the left mouse.
+                if event.key in BRUSHES:
+                    brush = BRUSHES[event.key]
+
+                # Print out grid into console for debugging.
+                if event.key == pygame.K_p:
+                    print_grid()
+
+                # Save the counters of every search so far.
+                if event.key == pygame.K_s and finished_runs:
+                    save_json(finished_runs, 'search_stats.json')
+                    save_csv(finished_runs, 'search_stats.csv')
+                    print("saved", len(finished_runs), "runs to search_stats.json and search_stats.csv")
+
+                # Find a path with hierarchical A*.
+                if event.key == pygame.K_h:
+                    show_hierarchical()
+
+                # Show or hide the distance field.
+                if event.key == pygame.K_d:
+                    showing = show_distance_field
+                    reset_grid()
+                    show_distance_field = not showing
+
+            # with incremental replanning on, edits repair the path as they happen.
+            if lpa_planner is not None and event.type in (pygame.MOUSEMOTION, pygame.KEYDOWN):
+                update_incremental()
+
+        # keep the distance field up to date with any edits.
+        if show_distance_field and drawn_distance_field != (grid.version, grid.start, grid.end):
+            draw_distance_field()
+
+        # paint whatever the running search has done since last frame.
+        if is_running():
+            update_search()
+
+        # rendering code. Only the tiles and sidebar parts that changed get pushed to the display.
+        dirty_rects = render_grid() + render_sidebar()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+
+        # 60 fps unless we decide otherwise
+        clock.tick(fps_speed)
+
+    # Quit after the main loop ends (i.e player presses the "x")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Saving and loading maps, so a grid isn't lost as soon as the window closes.
+load_map and save_map pick the format from the file extension.
+
+Text (.txt, or anything else) is what print_grid in main.py prints - one line per row, cell
+values separated by spaces (0 blank, 1 obstacle, 2 start, 3 end). If any cell isn't road, a
+blank line and a second block of the same shape follow with every cell's terrain weight:
+    0 0 1 0
+    2 0 1 3
+
+    1 1 1 2
+    1 5 1 1
+
+MovingAI (.map) is the format of the Moving AI Lab's grid benchmarks:
+    type octile
+    height 2
+    width 4
+    map
+    ..@.
+    ..@S
+'.' and 'G' are open ground, 'S' is swamp, and '@', 'O', 'T' (trees) and 'W' (water) can't be
+travelled here. Start and end nodes aren't part of a .map - they live in .scen files - and
+grass is saved as plain ground, since the format has nothing for it.
+
+Binary (.grid) is the grid's own arrays written straight to disk, so loading one is just
+memory-mapping the file - nothing gets parsed, and pages are only read in as they're touched.
+The header (magic, width, height, the start and end node indices or -1, and how many cells have
+each of the 256 weights) is followed by the cells, weights and links arrays, one byte per cell
+each. With the counts and the start and end already in the header, loading never has to look
+at every cell. The arrays are mapped copy-on-write, so editing a loaded grid never changes the file.
+
+Scenario (.scen) files are MovingAI's lists of queries, one tab separated line each:
+    version 1
+    bucket  map  map width  map height  start x  start y  goal x  goal y  optimal length
+Big ones hold thousands of queries, so load_scenarios reads them a line at a time.
+
+Visited, unvisited and path cells are saved as blank, since they only mean something during a search.
+MovingAI positions are (column, row) - they get swapped to this project's (row, column) on the way in and out.
+
+Usage:
+    from maps import load_map, save_map, load_scenarios
+    save_map(grid, 'maze.grid')
+    grid = load_map('maze.grid')
+    for scenario in load_scenarios('arena.map.scen'):
+        print(scenario.start, scenario.end, scenario.optimal_length)
+"""
+import os
+import struct
+
+import numpy as np
+
+from grid import ROAD, SWAMP, Grid
+
+# what each MovingAI terrain character is here, as (cell value, weight).
+MOVINGAI_TERRAIN = {
+    '.': (0, ROAD), 'G': (0, ROAD), 'S': (0, SWAMP),
+    '@': (1, ROAD), 'O': (1, ROAD), 'T': (1, ROAD), 'W': (1, ROAD),
+}
+
+# .grid header - magic and format version, width and height as little endian uint32s, the start and end node
+# indices as int64s (-1 for none), then the 256 weight counts as int64s.
+GRID_MAGIC = b'PFGRID\x00\x02'
+GRID_HEADER = struct.Struct('<8sIIqq')
+WEIGHT_COUNTS = np.dtype('<i8')
+GRID_HEADER_SIZE = GRID_HEADER.size + 256 * WEIGHT_COUNTS.itemsize
+
+
+# Cell values with the search visuals (visited, unvisited, path) turned back into blank space.
+def _saved_cells(grid):
+    return np.where(grid.cells > 3, 0, grid.cells).astype(np.uint8)
+
+
+def save_text(grid, path):
+    cells = _saved_cells(grid).reshape(grid.height, grid.width)
+    blocks = [cells]
+    if grid.weight_counts[ROAD] != grid.size:
+        blocks.append(grid.weights.reshape(grid.height, grid.width))
+    with open(path, 'w') as map_file:
+        map_file.write('\n\n'.join('\n'.join(' '.join(str(value) for value in row) for row in block)
+                                   for block in blocks))
+        map_file.write('\n')
+
+
+def load_text(path):
+    with open(path) as map_file:
+        blocks = [block for block in map_file.read().strip().split('\n\n') if block.strip()]
+    if not blocks or len(blocks) > 2:
+        raise ValueError('{} should have a block of cells and optionally a block of weights'.format(path))
+    rows = [[[int(value) for value in line.split()] for line in block.strip().splitlines()] for block in blocks]
+    for block in rows:
+        if len(set(len(row) for row in block)) != 1 or len(block) != len(rows[0]) or len(block[0]) != len(rows[0][0]):
+            raise ValueError('{} is not rectangular'.format(path))
+    return Grid.from_rows(rows[0], rows[1] if len(rows) > 1 else None)
+
+
+def save_movingai(grid, path):
+    cells = _saved_cells(grid)
+    characters = np.full(grid.size, '.', dtype='<U1')
+    characters[grid.weights == SWAMP] = 'S'
+    characters[cells == 1] = '@'
+    with open(path, 'w') as map_file:
+        map_file.write('type octile\nheight {}\nwidth {}\nmap\n'.format(grid.height, grid.width))
+        for row in characters.reshape(grid.height, grid.width):
+            map_file.write(''.join(row) + '\n')
+
+
+def load_movingai(path):
+    with open(path) as map_file:
+        header = {}
+        for line in map_file:
+            line = line.strip()
+            if line == 'map':
+                break
+            if line:
+                key, _, value = line.partition(' ')
+                header[key] = value.strip()
+        try:
+            height = int(header['height'])
+            width = int(header['width'])
+        except (KeyError, ValueError):
+            raise ValueError('{} is missing its height or width'.format(path))
+        rows = [line.rstrip('\r\n') for line in map_file if line.strip()]
+    if len(rows) != height or any(len(row) != width for row in rows):
+        raise ValueError('{} should have {} rows of {} characters'.format(path, height, width))
+    # look every character up at once through a 256 entry table.
+    values = np.ones(256, dtype=np.uint8)
+    weights = np.full(256, ROAD, dtype=np.uint8)
+    for character, (value, weight) in MOVINGAI_TERRAIN.items():
+        values[ord(character)] = value
+        weights[ord(character)] = weight
+    codes = np.frombuffer(''.join(rows).encode('ascii'), dtype=np.uint8)
+    return Grid.from_arrays(width, height, values[codes], weights[codes])
+
+
+def save_binary(grid, path):
+    start = -1 if grid.start is None else grid.start
+    end = -1 if grid.end is None else grid.end
+    with open(path, 'wb') as map_file:
+        map_file.write(GRID_HEADER.pack(GRID_MAGIC, grid.width, grid.height, start, end))
+        map_file.write(grid.weight_counts.astype(WEIGHT_COUNTS).tobytes())
+        map_file.write(_saved_cells(grid).tobytes())
+        map_file.write(np.ascontiguousarray(grid.weights).tobytes())
+        map_file.write(np.ascontiguousarray(grid.links).tobytes())
+
+
+def load_binary(path):
+    with open(path, 'rb') as map_file:
+        header = map_file.read(GRID_HEADER_SIZE)
+    if len(header) != GRID_HEADER_SIZE or header[:len(GRID_MAGIC)] != GRID_MAGIC:
+        raise ValueError('{} is not a .grid file'.format(path))
+    _, width, height, start, end = GRID_HEADER.unpack_from(header)
+    weight_counts = np.frombuffer(header, dtype=WEIGHT_COUNTS, offset=GRID_HEADER.size)
+    size = width * height
+    if os.path.getsize(path) != GRID_HEADER_SIZE + 3 * size:
+        raise ValueError('{} should hold {} cells but is the wrong size'.format(path, size))
+    arrays = np.memmap(path, dtype=np.uint8, mode='c', offset=GRID_HEADER_SIZE, shape=(3, size))
+    summary = (weight_counts, None if start < 0 else start, None if end < 0 else end)
+    return Grid.from_arrays(width, height, arrays[0], arrays[1], arrays[2], summary)
+
+
+def save_map(grid, path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.map':
+        save_movingai(grid, path)
+    elif extension == '.grid':
+        save_binary(grid, path)
+    else:
+        save_text(grid, path)
+
+
+def load_map(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.map':
+        return load_movingai(path)
+    if extension == '.grid':
+        return load_binary(path)
+    return load_text(path)
+
+
+# One query out of a .scen file, with positions as (row, column) like everywhere else in the project.
+class Scenario:
+    def __init__(self, bucket, map_path, width, height, start, end, optimal_length):
+        self.bucket = bucket
+        self.map_path = map_path
+        self.width = width
+        self.height = height
+        self.start = start
+        self.end = end
+        self.optimal_length = optimal_length
+
+    def __repr__(self):
+        return 'Scenario(map={!r}, start={}, end={}, optimal_length={})'.format(
+            self.map_path, self.start, self.end, self.optimal_length)
+
+
+# Read a .scen file one line at a time, yielding Scenarios as we go.
+def load_scenarios(path):
+    with open(path) as scenario_file:
+        for number, line in enumerate(scenario_file):
+            line = line.strip()
+            if not line or line.startswith('version'):
+                continue
+            fields = line.split('\t')
+            if len(fields) != 9:
+                raise ValueError('{} line {} should have 9 tab separated fields'.format(path, number + 1))
+            bucket, map_path, width, height, start_x, start_y, end_x, end_y, optimal_length = fields
+            yield Scenario(int(bucket), map_path, int(width), int(height), (int(start_y), int(start_x)),
+                           (int(end_y), int(end_x)), float(optimal_length))
+
+
+def save_scenarios(scenarios, path):
+    with open(path, 'w') as scenario_file:
+        scenario_file.write('version 1\n')
+        for scenario in scenarios:
+            scenario_file.write('{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{:.8f}\n'.format(
+                scenario.bucket, scenario.map_path, scenario.width, scenario.height,
+                scenario.start[1], scenario.start[0], scenario.end[1], scenario.end[0], scenario.optimal_length))
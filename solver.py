@@ -0,0 +1,1014 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Headless solver for the pathfinding algorithms - BFS, DFS, Dijkstra's, A*, Jump Point Search,
+bidirectional BFS and A*, and a NumPy wavefront BFS for very large grids.
+Nothing in here touches pygame, so it can be imported without opening a window
+and every search runs to completion at full speed instead of one node per frame.
+
+Usage:
+    from solver import solve
+    result = solve(grid, (0, 0), (19, 19), algorithm='astar')
+    print(result.path, result.visited_nodes, result.elapsed)
+
+Every algorithm is written once, as a generator that expands one node per step. solve() runs it to
+the end, and main.py runs the very same generator a few steps per frame. To step through one yourself:
+    steps = search_steps(grid, (0, 0), (19, 19), algorithm='astar')
+    for current, discovered in steps:
+        print('expanded', current, 'found', discovered)
+
+The grid is a Grid from grid.py, or any rectangular 2D sequence of cell values which gets
+turned into one. 1 is an obstacle, everything else can be travelled. The search writes its
+previous nodes and costs into the grid's arrays but never changes the cell values. Starting a
+search doesn't wipe those arrays - it starts a new generation (see grid.py), so a search only
+touches the cells it reaches, however big the grid is.
+Positions are (x, y) where x = row and y = column, just like the Nodes in grid.py.
+
+Every algorithm moves 4 ways unless it's asked for diagonal_movement, which lets it move 8 ways.
+A diagonal step costs sqrt(2) times the weight of the cell it moves into and can't cut the corner
+of an obstacle (see grid.py). The algorithms with a heuristic switch from Manhattan distance to
+octile distance for it - the cheapest way to cover the distance with straight and diagonal steps
+on an empty grid - so they still never overestimate and still find the cheapest path.
+BFS and DFS ignore costs either way, so BFS finds the path with the fewest steps.
+"""
+import heapq
+import time
+from collections import deque
+
+import numpy as np
+
+from grid import (BESIDE, DIAGONAL_COST, DIAGONAL_DIRECTIONS, DIRECTIONS, DOWN, DOWN_LEFT, DOWN_RIGHT, LEFT, RIGHT, UP,
+                  UP_LEFT, UP_RIGHT, Grid)
+from stats import SearchStats
+
+ALGORITHMS = ('bfs', 'dfs', 'dijkstra', 'astar', 'jps', 'bibfs', 'biastar', 'wavefront')
+
+
+# Everything we want to know about a finished search.
+class SearchResult:
+    def __init__(self, algorithm, path, visited_nodes, elapsed, expanded=0, peak_frontier=0, path_cost=0, stats=None):
+        self.algorithm = algorithm
+        # list of (x, y) positions from start to end, empty if there is no solution.
+        self.path = path
+        self.status = len(path) > 0
+        # total terrain weight of every cell entered along the path.
+        self.path_cost = path_cost
+        # same numbers the sidebar shows - visited nodes and path nodes between start and end.
+        self.visited_nodes = visited_nodes
+        self.path_length = max(len(path) - 2, 0)
+        # wall time of the search in seconds.
+        self.elapsed = elapsed
+        # every node taken off the queue/stack/heap, start and end included, and the most nodes waiting on it at once.
+        self.expanded = expanded
+        self.peak_frontier = peak_frontier
+        # the SearchStats with the rest of the counters and the time spent in each phase, see stats.py.
+        self.stats = stats
+
+    def __repr__(self):
+        return ('SearchResult(algorithm={!r}, status={}, visited_nodes={}, path_length={}, path_cost={}, expanded={}, '
+                'elapsed={:.6f})').format(self.algorithm, self.status, self.visited_nodes, self.path_length,
+                                          self.path_cost, self.expanded, self.elapsed)
+
+
+# Follow previous nodes back from the end and return (x, y) positions from start to end.
+def _retrace(grid, end):
+    parent = memoryview(grid.parent)
+    path = []
+    current = end
+    while current >= 0:
+        path.append(divmod(current, grid.width))
+        current = parent[current]
+    path.reverse()
+    return path
+
+
+# Estimate the distance between cell indices a and b for A*.
+# Every step costs at least the cheapest terrain weight on the grid, so scaling by it keeps the estimate
+# from ever being too high while still pulling the search towards the end node.
+def calculate_heuristic(a, b, width, diagonal_movement=False, min_weight=1):
+    ax, ay = divmod(a, width)
+    bx, by = divmod(b, width)
+    # With only 4 directions, use Manhattan Distance between a and b.
+    # Manhattan Distance is the absolute value of (ax - bx) + absolute value of (ay - by).
+    if not diagonal_movement:
+        return (abs(ax - bx) + abs(ay - by)) * min_weight
+
+    # With diagonals, use Octile Distance - go diagonally until we're level with b, then straight the rest of the way.
+    dx = abs(ax - bx)
+    dy = abs(ay - by)
+    return (max(dx, dy) - min(dx, dy) + DIAGONAL_COST * min(dx, dy)) * min_weight
+
+
+# What a path costs - the weight of every cell it moves into, times sqrt(2) for the diagonal steps.
+def path_cost(grid, path):
+    weights = grid.weights
+    cost = 0
+    for (ax, ay), (bx, by) in zip(path, path[1:]):
+        step = int(weights[bx * grid.width + by])
+        cost += step * DIAGONAL_COST if ax != bx and ay != by else step
+    return cost
+
+
+# Every search below is a generator. Each time it expands a node it yields (that node, the nodes it just reached
+# for the first time), so the visualizer can run it a few steps per frame and paint as it goes, while solve()
+# just runs it to the end. When it's done it returns whether it reached the end. The end node is expanded
+# but never yielded, since there's nothing left to paint once it's found.
+# With diagonal_movement they step through the grid's 8-way tables instead of the 4-way ones - the searches
+# that add up costs use its move tables, which pair each offset with what a step that way costs per unit weight.
+# Counters go into a SearchStats (see stats.py). They're kept in local variables and only copied over when the
+# search finishes, or after every step when the stats are live. Pushes and pops aren't counted one by one - every
+# push is either a node reached for the first time or a decrease key, and whatever was pushed but isn't waiting
+# on the frontier any more was popped.
+
+# BFS expands in the order nodes were found and ignores terrain.
+# The hot loops read the grid arrays through memoryviews, which index much faster than NumPy does one item at a time,
+# and step to neighbors with the grid's precomputed links table, which already leaves out obstacles and the edges.
+def _breadth_first(grid, start, end, diagonal_movement, stats):
+    links = memoryview(grid.links)
+    stamp = memoryview(grid.stamp)
+    generation = grid.generation
+    parent = memoryview(grid.parent)
+    neighbor_table = grid.diagonal_neighbor_table if diagonal_movement else grid.neighbor_table
+    live = stats.live
+    stamp[start] = generation
+    parent[start] = -1
+    queue = deque([start])
+    expanded = 0
+    peak = 1
+    while queue:
+        if len(queue) > peak:
+            peak = len(queue)
+        current = queue.popleft()
+        expanded += 1
+        if current == end:
+            # every pop is an expansion and every node is pushed once, so what's been pushed is what's been touched.
+            stats.count(expanded, expanded + len(queue), expanded, 0, peak, expanded + len(queue))
+            return True
+        discovered = []
+        for offset in neighbor_table[links[current]]:
+            neighbor = current + offset
+            if stamp[neighbor] != generation:
+                stamp[neighbor] = generation
+                parent[neighbor] = current
+                queue.append(neighbor)
+                discovered.append(neighbor)
+        if live:
+            stats.step(current, expanded, expanded + len(queue), expanded, 0, peak, expanded + len(queue))
+        yield current, discovered
+    stats.count(expanded, expanded, expanded, 0, peak, expanded)
+    return False
+
+
+# The wavefront is BFS a whole layer at a time. Instead of popping cells off a queue one by one, the
+# frontier is a NumPy array of cell indices. For each direction, the frontier cells whose links bit says
+# that way is open step over by that direction's offset, and whatever lands on a cell nobody reached yet
+# is the next layer - so all the per-cell work happens inside NumPy, a handful of array operations per
+# layer. Each cell's layer is its distance, which ends up in grid.cost, and the path is found afterwards
+# by stepping from the end to any neighbor one layer closer to the start.
+# Path lengths always match BFS, but when there are several shortest paths it may pick a different one.
+# It steps a whole layer at a time, so it yields (this layer, the next layer) as arrays of cell indices.
+def _wavefront(grid, start, end, diagonal_movement, stats):
+    links = grid.links
+    offsets = grid.offsets
+    directions = DIAGONAL_DIRECTIONS if diagonal_movement else DIRECTIONS
+    distance = np.full(grid.size, -1, dtype=np.int32)
+    distance[start] = 0
+    # claim[cell] says which entry of a new layer got to a cell first, so each cell only goes in once.
+    claim = np.zeros(grid.size, dtype=np.int64)
+    frontier = np.array([start], dtype=np.int64)
+    layer = 0
+    expanded = 0
+    peak = 1
+    # every cell joins exactly one layer.
+    touched = 1
+    while distance[end] < 0 and len(frontier) > 0:
+        expanded += len(frontier)
+        current = frontier
+        masks = links[frontier]
+        grown = np.concatenate([frontier[(masks >> direction) & 1 == 1] + offsets[direction] for direction in directions])
+        grown = grown[distance[grown] < 0]
+        order = np.arange(len(grown))
+        claim[grown] = order
+        frontier = grown[claim[grown] == order]
+        layer += 1
+        distance[frontier] = layer
+        if len(frontier) > peak:
+            peak = len(frontier)
+        touched += len(frontier)
+        if stats.live:
+            stats.step(current, expanded, touched, expanded, 0, peak, touched)
+        yield current, frontier
+    grid.cost[:] = np.maximum(distance, 0)
+    grid.stamp[distance >= 0] = grid.generation
+    grid.parent[start] = -1
+    if distance[end] < 0:
+        stats.count(expanded, touched, expanded, 0, peak, touched)
+        return False
+    # walk back down the layers from the end, in the same down, right, up, left order BFS uses.
+    parent = memoryview(grid.parent)
+    cell_links = memoryview(links)
+    layers = memoryview(distance)
+    neighbor_table = grid.diagonal_neighbor_table if diagonal_movement else grid.neighbor_table
+    current = end
+    # stop one layer short - the start could be an obstacle, and obstacles are never linked to.
+    while layers[current] > 1:
+        for offset in neighbor_table[cell_links[current]]:
+            if layers[current + offset] == layers[current] - 1:
+                parent[current] = current + offset
+                current += offset
+                break
+    if current != start:
+        parent[current] = start
+    # the end node counts as expanded, like it does for BFS.
+    stats.count(expanded + 1, touched, expanded + 1, 0, peak, touched)
+    return True
+
+
+def _depth_first(grid, start, end, diagonal_movement, stats):
+    links = memoryview(grid.links)
+    stamp = memoryview(grid.stamp)
+    generation = grid.generation
+    parent = memoryview(grid.parent)
+    neighbor_table = grid.diagonal_dfs_neighbor_table if diagonal_movement else grid.dfs_neighbor_table
+    live = stats.live
+    stamp[start] = generation
+    parent[start] = -1
+    stack = [start]
+    expanded = 0
+    peak = 1
+    while stack:
+        if len(stack) > peak:
+            peak = len(stack)
+        current = stack.pop()
+        expanded += 1
+        if current == end:
+            # every pop is an expansion and every node is pushed once, so what's been pushed is what's been touched.
+            stats.count(expanded, expanded + len(stack), expanded, 0, peak, expanded + len(stack))
+            return True
+        discovered = []
+        for offset in neighbor_table[links[current]]:
+            neighbor = current + offset
+            if stamp[neighbor] != generation:
+                stamp[neighbor] = generation
+                parent[neighbor] = current
+                stack.append(neighbor)
+                discovered.append(neighbor)
+        if live:
+            stats.step(current, expanded, expanded + len(stack), expanded, 0, peak, expanded + len(stack))
+        yield current, discovered
+    stats.count(expanded, expanded, expanded, 0, peak, expanded)
+    return False
+
+
+# Dijkstra's always expands the cheapest node so far, counting the terrain weight of every cell it enters.
+# Like A* below, the open set is a binary heap of (cost, order, index) entries with lazy deletion, so on
+# a grid that is all road it expands in exactly the same order as BFS.
+def _dijkstra(grid, start, end, diagonal_movement, stats):
+    links = memoryview(grid.links)
+    stamp = memoryview(grid.stamp)
+    generation = grid.generation
+    parent = memoryview(grid.parent)
+    cost = memoryview(grid.cost)
+    weights = memoryview(grid.weights)
+    move_table = grid.diagonal_move_table if diagonal_movement else grid.move_table
+    live = stats.live
+    stamp[start] = generation
+    parent[start] = -1
+    cost[start] = 0
+    order = {start: 0}
+    open_heap = [(0, 0, start)]
+    closed = set()
+    expanded = 0
+    decreased = 0
+    peak = 1
+    while open_heap:
+        if len(open_heap) > peak:
+            peak = len(open_heap)
+        current_cost, _, current = heapq.heappop(open_heap)
+        if current in closed or current_cost != cost[current]:
+            continue
+        expanded += 1
+        if current == end:
+            pushes = len(order) + decreased
+            stats.count(expanded, pushes, pushes - len(open_heap), decreased, peak, len(order))
+            return True
+        closed.add(current)
+        discovered = []
+        for offset, step in move_table[links[current]]:
+            neighbor = current + offset
+            if neighbor in closed:
+                continue
+            placeholder = current_cost + weights[neighbor] * step
+            if stamp[neighbor] == generation:
+                if placeholder >= cost[neighbor]:
+                    continue
+                decreased += 1
+            else:
+                stamp[neighbor] = generation
+                order[neighbor] = len(order)
+                discovered.append(neighbor)
+            cost[neighbor] = placeholder
+            parent[neighbor] = current
+            heapq.heappush(open_heap, (placeholder, order[neighbor], neighbor))
+        if live:
+            pushes = len(order) + decreased
+            stats.step(current, expanded, pushes, pushes - len(open_heap), decreased, peak, len(order))
+        yield current, discovered
+    pushes = len(order) + decreased
+    stats.count(expanded, pushes, pushes, decreased, peak, len(order))
+    return False
+
+
+# A* keeps its open set in a binary heap of (f, order, index) entries, where order is when the cell first
+# joined the open set so equal f values still come out first-in first-out like the old list scan.
+# A cheaper path just pushes a fresh entry and the stale one is skipped when it reaches the top.
+# A cell is on the open list once it's stamped with this search's generation and it is not closed yet.
+def _a_star(grid, start, end, diagonal_movement, stats):
+    links = memoryview(grid.links)
+    stamp = memoryview(grid.stamp)
+    generation = grid.generation
+    parent = memoryview(grid.parent)
+    g = memoryview(grid.g)
+    f = memoryview(grid.f)
+    weights = memoryview(grid.weights)
+    move_table = grid.diagonal_move_table if diagonal_movement else grid.move_table
+    width = grid.width
+    min_weight = grid.min_weight()
+    live = stats.live
+    stamp[start] = generation
+    parent[start] = -1
+    g[start] = 0
+    f[start] = 0
+    order = {start: 0}
+    open_heap = [(0, 0, start)]
+    closed = set()
+    expanded = 0
+    decreased = 0
+    peak = 1
+    while open_heap:
+        if len(open_heap) > peak:
+            peak = len(open_heap)
+        current_f, _, current = heapq.heappop(open_heap)
+        if current in closed or current_f != f[current]:
+            continue
+        expanded += 1
+        if current == end:
+            pushes = len(order) + decreased
+            stats.count(expanded, pushes, pushes - len(open_heap), decreased, peak, len(order))
+            return True
+        closed.add(current)
+        discovered = []
+        for offset, step in move_table[links[current]]:
+            neighbor = current + offset
+            if neighbor in closed:
+                continue
+            placeholder = g[current] + weights[neighbor] * step
+            if stamp[neighbor] == generation:
+                if placeholder >= g[neighbor]:
+                    continue
+                decreased += 1
+            else:
+                stamp[neighbor] = generation
+                order[neighbor] = len(order)
+                discovered.append(neighbor)
+            g[neighbor] = placeholder
+            parent[neighbor] = current
+            f[neighbor] = placeholder + calculate_heuristic(neighbor, end, width, diagonal_movement, min_weight)
+            heapq.heappush(open_heap, (f[neighbor], order[neighbor], neighbor))
+        if live:
+            pushes = len(order) + decreased
+            stats.step(current, expanded, pushes, pushes - len(open_heap), decreased, peak, len(order))
+        yield current, discovered
+    pushes = len(order) + decreased
+    stats.count(expanded, pushes, pushes, decreased, peak, len(order))
+    return False
+
+
+# Jump Point Search is A* that only puts "jump points" on the open list. From each node it keeps stepping
+# in a straight line until something interesting happens - it reaches the end node, a wall opens up beside
+# it (a forced neighbor), or, when moving up or down a column, a sideways scan from that cell finds one.
+# Every cell passed over in between has an equally short path that doesn't go through it, so none of them
+# need to be expanded. It needs every cell to cost the same, and finds paths just as short as A*'s.
+#
+# Stepping cell by cell, every step up or down a column scans its whole row both ways, which made JPS slower
+# than plain A*. Where each line of cells stops only depends on the obstacles, though, so it's worked out for
+# the whole grid at once (see JumpTables) and a jump is a couple of lookups plus a check for the end node.
+
+
+# Where every straight jump stops, for one version of a grid. Built with NumPy a whole line of cells at a time.
+#     stops[d][cell]        the first cell at or past cell in direction d (DOWN, RIGHT, UP or LEFT from grid.py),
+#                           before a wall, with a forced neighbor - or -1 when a wall or the edge comes first
+#     column_stops[d][cell] the same for DOWN and UP without diagonals, where a cell also stops the jump when a
+#                           sideways jump from it would stop somewhere along its row
+#     rows, columns         which open stretch of its row and column a cell is on, -1 for obstacles, so whether
+#                           the end node can be reached in a straight line is one comparison
+# That's 32 bytes a cell. They're kept on the grid with the version they were built for, and rebuilt the
+# first time JPS runs after an obstacle changes.
+class JumpTables:
+    def __init__(self, grid):
+        height, width = grid.height, grid.width
+        self.version = grid.version
+        # open cells with a border of walls round them, so looking one past the edge is just a wall.
+        padded = np.zeros((height + 2, width + 2), dtype=bool)
+        padded[1:-1, 1:-1] = (grid.cells != 1).reshape(height, width)
+        open_cells = padded[1:-1, 1:-1]
+
+        def beside(dx, dy):
+            return padded[1 + dx:1 + dx + height, 1 + dy:1 + dy + width]
+
+        stops = {}
+        forced = {}
+        for direction, (dx, dy) in ((DOWN, (1, 0)), (RIGHT, (0, 1)), (UP, (-1, 0)), (LEFT, (0, -1))):
+            if dx == 0:
+                forced[direction] = ((beside(-1, 0) & ~beside(-1, -dy)) | (beside(1, 0) & ~beside(1, -dy)))
+            else:
+                forced[direction] = ((beside(0, -1) & ~beside(-dx, -1)) | (beside(0, 1) & ~beside(-dx, 1)))
+            stops[direction] = _first_stop(open_cells, forced[direction], dx, dy)
+
+        # a sideways jump from a cell starts on the cell beside it, so shift each row's stops over by one.
+        sideways = np.zeros((height, width), dtype=bool)
+        sideways[:, :-1] |= stops[RIGHT].reshape(height, width)[:, 1:] >= 0
+        sideways[:, 1:] |= stops[LEFT].reshape(height, width)[:, :-1] >= 0
+        self.stops = {direction: memoryview(stop) for direction, stop in stops.items()}
+        self.column_stops = {direction: memoryview(_first_stop(open_cells, forced[direction] | sideways, dx, 0))
+                             for direction, dx in ((DOWN, 1), (UP, -1))}
+        self.rows = memoryview(_stretches(open_cells))
+        self.columns = memoryview(np.ascontiguousarray(_stretches(open_cells.T).reshape(width, height).T).reshape(-1))
+
+
+# For every cell, the index of the first cell at or past it in direction (dx, dy) where stop is set, without
+# crossing a wall - or -1. A running minimum (or maximum, going backwards) along each row or column finds the
+# nearest stop and the nearest wall for every cell at once, and the stop counts if it comes before the wall.
+def _first_stop(open_cells, stop, dx, dy):
+    height, width = open_cells.shape
+    axis = 0 if dx != 0 else 1
+    length = open_cells.shape[axis]
+    coordinates = np.arange(length, dtype=np.int32).reshape((-1, 1) if axis == 0 else (1, -1))
+    flip = (slice(None, None, -1), slice(None)) if axis == 0 else (slice(None), slice(None, None, -1))
+
+    def nearest(found):
+        if dx + dy < 0:
+            return np.maximum.accumulate(np.where(found, coordinates, -1), axis=axis)
+        return np.minimum.accumulate(np.where(found, coordinates, length)[flip], axis=axis)[flip]
+
+    stops = nearest(stop & open_cells)
+    walls = nearest(~open_cells)
+    found = stops > walls if dx + dy < 0 else stops < walls
+    if axis == 0:
+        index = stops * width + np.arange(width, dtype=np.int32)
+    else:
+        index = np.arange(height, dtype=np.int32)[:, None] * width + stops
+    return np.where(found, index, -1).astype(np.int32, copy=False).reshape(-1)
+
+
+# Number every open stretch of each row, so two cells can see each other along the row exactly when they
+# have the same number. Obstacles get -1.
+def _stretches(open_cells):
+    height, width = open_cells.shape
+    last_wall = np.maximum.accumulate(np.where(open_cells, -1, np.arange(width)), axis=1)
+    numbers = np.arange(height)[:, None] * (width + 1) + last_wall + 1
+    return np.where(open_cells, numbers, -1).astype(np.int32).reshape(-1)
+
+
+# The tables for the grid as it is now, built if the grid has changed since they last were.
+def jump_tables(grid):
+    if grid.jump_tables is None or grid.jump_tables.version != grid.version:
+        grid.jump_tables = JumpTables(grid)
+    return grid.jump_tables
+
+
+# A straight jump from cell, which is already one step along, in the direction of step (an offset from grid.py).
+# Hands back the first jump point, or -1. stops and line are the stops and the row or column numbering to use.
+def _jump(stops, line, cell, step, end):
+    if line[cell] < 0:
+        return -1
+    stop = stops[cell]
+    # the end node is a jump point too, if it's on the way there.
+    if line[end] == line[cell] and (end - cell) * step >= 0 and (stop < 0 or (stop - end) * step >= 0):
+        return end
+    return stop
+
+
+# Jumping up or down a column without diagonals also stops on the end node's row, at turn, when the end node
+# can be seen along it from there - that's where the sideways jump would find it.
+def _column_jump(tables, stops, cell, step, end, turn):
+    columns = tables.columns
+    if columns[cell] < 0:
+        return -1
+    stop = stops[cell]
+    if (columns[turn] == columns[cell] and (turn - cell) * step >= 0 and tables.rows[turn] == tables.rows[end]
+            and (stop < 0 or (stop - turn) * step >= 0)):
+        return turn
+    return stop
+
+
+# Which way each (row, column) step goes, and after arriving at a jump point going one way, which ways to jump
+# next - straight ahead and the two sides. Going back the way we came is never shorter.
+STEP_DIRECTIONS = {(1, 0): DOWN, (0, 1): RIGHT, (-1, 0): UP, (0, -1): LEFT,
+                   (1, 1): DOWN_RIGHT, (-1, 1): UP_RIGHT, (-1, -1): UP_LEFT, (1, -1): DOWN_LEFT}
+JUMP_DIRECTIONS = {DOWN: (DOWN, RIGHT, LEFT), RIGHT: (RIGHT, DOWN, UP), UP: (UP, RIGHT, LEFT), LEFT: (LEFT, DOWN, UP)}
+# with diagonals, after a diagonal step the row, the column and the same diagonal. After a straight one, straight
+# ahead, both sides, and the two diagonals that lean forwards - a wall that ends beside us can open one of them up.
+DIAGONAL_JUMP_DIRECTIONS = {
+    DOWN: (DOWN, RIGHT, LEFT, DOWN_RIGHT, DOWN_LEFT), RIGHT: (RIGHT, DOWN, UP, DOWN_RIGHT, UP_RIGHT),
+    UP: (UP, RIGHT, LEFT, UP_RIGHT, UP_LEFT), LEFT: (LEFT, DOWN, UP, DOWN_LEFT, UP_LEFT),
+    DOWN_RIGHT: (RIGHT, DOWN, DOWN_RIGHT), UP_RIGHT: (RIGHT, UP, UP_RIGHT),
+    UP_LEFT: (LEFT, UP, UP_LEFT), DOWN_LEFT: (LEFT, DOWN, DOWN_LEFT)}
+
+
+# The way we were going when we got from previous to current.
+def _arrived(width, current, previous):
+    x, y = divmod(current, width)
+    previous_x, previous_y = divmod(previous, width)
+    return STEP_DIRECTIONS[(x > previous_x) - (x < previous_x), (y > previous_y) - (y < previous_y)]
+
+
+# The jump points reachable from current, given the jump point we came from (-1 for the start node). The start
+# node looks in every direction. A direction whose link isn't set is a wall or the edge, so there's no jump.
+# Also hands back how many cells it looked at, for the stats.
+def jump_point_successors(grid, tables, current, previous, end):
+    width = grid.width
+    mask = grid.links[current]
+    directions = DIRECTIONS if previous < 0 else JUMP_DIRECTIONS[_arrived(width, current, previous)]
+    # where this column crosses the end node's row.
+    turn = end - end % width + current % width
+    successors = []
+    looked = 0
+    for direction in directions:
+        if not mask & (1 << direction):
+            continue
+        looked += 1
+        step = grid.offsets[direction]
+        if direction == DOWN or direction == UP:
+            jump_point = _column_jump(tables, tables.column_stops[direction], current + step, step, end, turn)
+        else:
+            jump_point = _jump(tables.stops[direction], tables.rows, current + step, step, end)
+        if jump_point >= 0:
+            successors.append(jump_point)
+    return successors, looked
+
+
+# With diagonal movement, jumping works the same way along rows and columns except for the sideways scan.
+# Instead, a diagonal jump stops wherever a straight jump along either part of the diagonal - the row or the
+# column - finds a jump point, and only keeps going while its diagonal link is set, which also means it never
+# cuts a corner. Hands back the jump point (or -1) and how many cells it looked at.
+def _diagonal_jump(grid, tables, cell, direction, end):
+    links = grid.links
+    vertical, sideways = BESIDE[direction]
+    down_or_up = grid.offsets[vertical]
+    across = grid.offsets[sideways]
+    step = grid.offsets[direction]
+    vertical_stops = tables.stops[vertical]
+    sideways_stops = tables.stops[sideways]
+    looked = 0
+    while True:
+        looked += 1
+        if cell == end:
+            return cell, looked
+        mask = links[cell]
+        if mask & (1 << vertical):
+            looked += 1
+            if _jump(vertical_stops, tables.columns, cell + down_or_up, down_or_up, end) >= 0:
+                return cell, looked
+        if mask & (1 << sideways):
+            looked += 1
+            if _jump(sideways_stops, tables.rows, cell + across, across, end) >= 0:
+                return cell, looked
+        if not mask & (1 << direction):
+            return -1, looked
+        cell += step
+
+
+# The jump points reachable from current with diagonal movement, and how many cells it looked at.
+def diagonal_jump_point_successors(grid, tables, current, previous, end):
+    mask = grid.links[current]
+    if previous < 0:
+        directions = DIAGONAL_DIRECTIONS
+    else:
+        directions = DIAGONAL_JUMP_DIRECTIONS[_arrived(grid.width, current, previous)]
+    successors = []
+    looked = 0
+    for direction in directions:
+        if not mask & (1 << direction):
+            continue
+        step = grid.offsets[direction]
+        if direction >= DOWN_RIGHT:
+            jump_point, cells = _diagonal_jump(grid, tables, current + step, direction, end)
+            looked += cells
+        else:
+            looked += 1
+            lines = tables.columns if direction == DOWN or direction == UP else tables.rows
+            jump_point = _jump(tables.stops[direction], lines, current + step, step, end)
+        if jump_point >= 0:
+            successors.append(jump_point)
+    return successors, looked
+
+
+# Jump points only know the jump point before them. Walk the finished path back from the end node and
+# point every cell in between at its neighbor, so the path can be retraced one cell at a time.
+def fill_jump_path(grid, end):
+    parent = memoryview(grid.parent)
+    stamp = memoryview(grid.stamp)
+    width = grid.width
+    current = end
+    while parent[current] >= 0:
+        jump_point = parent[current]
+        # one step along the straight (or diagonal) line from the jump point to current.
+        dx = (current // width > jump_point // width) - (current // width < jump_point // width)
+        dy = (current % width > jump_point % width) - (current % width < jump_point % width)
+        step = dx * width + dy
+        cell = current
+        while cell != jump_point:
+            parent[cell] = cell - step
+            stamp[cell] = grid.generation
+            cell -= step
+        current = jump_point
+
+
+def _jump_point_search(grid, start, end, diagonal_movement, stats):
+    stamp = memoryview(grid.stamp)
+    generation = grid.generation
+    parent = memoryview(grid.parent)
+    g = memoryview(grid.g)
+    f = memoryview(grid.f)
+    width = grid.width
+    weight = grid.min_weight()
+    successors = diagonal_jump_point_successors if diagonal_movement else jump_point_successors
+    tables = jump_tables(grid)
+    end_x, end_y = divmod(end, width)
+    live = stats.live
+    stamp[start] = generation
+    parent[start] = -1
+    g[start] = 0
+    f[start] = 0
+    order = {start: 0}
+    open_heap = [(0, 0, start)]
+    closed = set()
+    expanded = 0
+    decreased = 0
+    peak = 1
+    # cells the jumps looked at on the way, on top of the jump points themselves.
+    looked = 0
+    while open_heap:
+        if len(open_heap) > peak:
+            peak = len(open_heap)
+        current_f, _, current = heapq.heappop(open_heap)
+        if current in closed or current_f != f[current]:
+            continue
+        expanded += 1
+        if current == end:
+            fill_jump_path(grid, end)
+            pushes = len(order) + decreased
+            stats.count(expanded, pushes, pushes - len(open_heap), decreased, peak, len(order) + looked)
+            return True
+        closed.add(current)
+        discovered = []
+        jump_points, cells = successors(grid, tables, current, parent[current], end)
+        looked += cells
+        x, y = divmod(current, width)
+        for jump_point in jump_points:
+            if jump_point in closed:
+                continue
+            # jump points are always in a straight or diagonal line from each other, so the distance between
+            # them - the heuristic's sum, worked out here since this runs for every jump point - is exactly
+            # the cost of the steps in between.
+            jump_x, jump_y = divmod(jump_point, width)
+            dx, dy = abs(jump_x - x), abs(jump_y - y)
+            to_x, to_y = abs(jump_x - end_x), abs(jump_y - end_y)
+            if diagonal_movement:
+                distance = max(dx, dy) - min(dx, dy) + DIAGONAL_COST * min(dx, dy)
+                remaining = max(to_x, to_y) - min(to_x, to_y) + DIAGONAL_COST * min(to_x, to_y)
+            else:
+                distance = dx + dy
+                remaining = to_x + to_y
+            placeholder = g[current] + distance * weight
+            if stamp[jump_point] == generation:
+                if placeholder >= g[jump_point]:
+                    continue
+                decreased += 1
+            else:
+                stamp[jump_point] = generation
+                order[jump_point] = len(order)
+                discovered.append(jump_point)
+            g[jump_point] = placeholder
+            parent[jump_point] = current
+            f[jump_point] = placeholder + remaining * weight
+            heapq.heappush(open_heap, (f[jump_point], order[jump_point], jump_point))
+        if live:
+            pushes = len(order) + decreased
+            stats.step(current, expanded, pushes, pushes - len(open_heap), decreased, peak, len(order) + looked)
+        yield current, discovered
+    pushes = len(order) + decreased
+    stats.count(expanded, pushes, pushes, decreased, peak, len(order) + looked)
+    return False
+
+
+# The bidirectional searches keep the backward half of the path as a dict of node -> next node towards the end.
+# Hang it onto the forward half so following previous nodes from the end leads all the way back to the start.
+# If the two halves ever cross (only possible with the greedy heuristic), cut across at the last crossing.
+def splice_path(grid, meeting, following):
+    parent = memoryview(grid.parent)
+    forward = set()
+    current = meeting
+    while current >= 0:
+        forward.add(current)
+        current = parent[current]
+    current = meeting
+    while following[current] >= 0:
+        if following[current] in forward:
+            meeting = following[current]
+        current = following[current]
+    current = meeting
+    while following[current] >= 0:
+        parent[following[current]] = current
+        current = following[current]
+
+
+# Bidirectional BFS grows one frontier from the start and one from the end, a whole layer at a time, always
+# from whichever side has the smaller frontier. The forward side keeps its previous nodes and depths (in g)
+# in the grid like plain BFS, the backward side keeps them in dicts. Once a layer touches the other side the
+# rest of that layer is still finished, so the shortest way across wins.
+def _bidirectional_breadth_first(grid, start, end, diagonal_movement, stats):
+    links = memoryview(grid.links)
+    stamp = memoryview(grid.stamp)
+    generation = grid.generation
+    parent = memoryview(grid.parent)
+    depth = memoryview(grid.g)
+    neighbor_table = grid.diagonal_neighbor_table if diagonal_movement else grid.neighbor_table
+    live = stats.live
+    stamp[start] = generation
+    parent[start] = -1
+    depth[start] = 0
+    if start == end:
+        stats.count(1, 1, 1, 0, 1, 1)
+        return True
+    # nothing is linked to an obstacle, so an end node on one can't be reached - but it can still be searched from.
+    if grid.cells[end] == 1:
+        stats.count(1, 1, 1, 0, 1, 1)
+        return False
+    forward = [start]
+    backward = [end]
+    backward_depth = {end: 0}
+    following = {end: -1}
+    expanded = 0
+    peak = 2
+    # every node joins one layer once, so the nodes reached are the pushes and the cells touched.
+    reached = 2
+    while forward and backward:
+        if len(forward) + len(backward) > peak:
+            peak = len(forward) + len(backward)
+        meeting = -1
+        shortest = 0
+        layer = []
+        if len(forward) <= len(backward):
+            for current in forward:
+                expanded += 1
+                discovered = []
+                for offset in neighbor_table[links[current]]:
+                    neighbor = current + offset
+                    if stamp[neighbor] == generation:
+                        continue
+                    stamp[neighbor] = generation
+                    parent[neighbor] = current
+                    depth[neighbor] = depth[current] + 1
+                    layer.append(neighbor)
+                    discovered.append(neighbor)
+                    if neighbor in backward_depth:
+                        length = depth[neighbor] + backward_depth[neighbor]
+                        if meeting < 0 or length < shortest:
+                            meeting, shortest = neighbor, length
+                reached += len(discovered)
+                if live:
+                    stats.step(current, expanded, reached, expanded, 0, peak, reached)
+                yield current, discovered
+            forward = layer
+        else:
+            for current in backward:
+                expanded += 1
+                discovered = []
+                for offset in neighbor_table[links[current]]:
+                    neighbor = current + offset
+                    if neighbor in backward_depth:
+                        continue
+                    backward_depth[neighbor] = backward_depth[current] + 1
+                    following[neighbor] = current
+                    layer.append(neighbor)
+                    discovered.append(neighbor)
+                    if stamp[neighbor] == generation:
+                        length = depth[neighbor] + backward_depth[neighbor]
+                        if meeting < 0 or length < shortest:
+                            meeting, shortest = neighbor, length
+                reached += len(discovered)
+                if live:
+                    stats.step(current, expanded, reached, expanded, 0, peak, reached)
+                yield current, discovered
+            backward = layer
+        if meeting >= 0:
+            splice_path(grid, meeting, following)
+            stats.count(expanded, reached, expanded, 0, peak, reached)
+            return True
+    stats.count(expanded, reached, expanded, 0, peak, reached)
+    return False
+
+
+# Bidirectional A* runs one A* from the start towards the end and one from the end towards the start, expanding
+# from whichever open set is smaller. Whenever one side reaches a node the other side has already reached, that
+# is a complete path - the cheapest one so far is kept as the best cost. Once the lowest f on either side is no
+# better than the best cost, nothing left can beat it and the search stops. Walking backwards, stepping from a
+# neighbor into the current node costs the current node's weight, just like it does going forwards.
+def _bidirectional_a_star(grid, start, end, diagonal_movement, stats):
+    links = memoryview(grid.links)
+    stamp = memoryview(grid.stamp)
+    generation = grid.generation
+    parent = memoryview(grid.parent)
+    g = memoryview(grid.g)
+    f = memoryview(grid.f)
+    weights = memoryview(grid.weights)
+    move_table = grid.diagonal_move_table if diagonal_movement else grid.move_table
+    width = grid.width
+    min_weight = grid.min_weight()
+    live = stats.live
+
+    stamp[start] = generation
+    parent[start] = -1
+    g[start] = 0
+    f[start] = calculate_heuristic(start, end, width, diagonal_movement, min_weight)
+    forward_open = [(f[start], 0, start)]
+    forward_order = {start: 0}
+    forward_closed = set()
+    backward_g = {end: 0}
+    backward_f = {end: calculate_heuristic(end, start, width, diagonal_movement, min_weight)}
+    backward_open = [(backward_f[end], 0, end)]
+    backward_order = {end: 0}
+    backward_closed = set()
+    following = {end: -1}
+    meeting = start if start == end else -1
+    best_cost = 0 if start == end else float('inf')
+    # nothing is linked to an obstacle, so an end node on one can't be reached - but it can still be searched from.
+    if start != end and grid.cells[end] == 1:
+        backward_open = []
+    expanded = 0
+    decreased = 0
+    peak = 2
+    while True:
+        # throw away stale heap entries on both sides.
+        while forward_open and (forward_open[0][2] in forward_closed or forward_open[0][0] != f[forward_open[0][2]]):
+            heapq.heappop(forward_open)
+        while backward_open and (backward_open[0][2] in backward_closed
+                                 or backward_open[0][0] != backward_f[backward_open[0][2]]):
+            heapq.heappop(backward_open)
+        if not forward_open or not backward_open:
+            break
+        if forward_open[0][0] >= best_cost or backward_open[0][0] >= best_cost:
+            break
+        if len(forward_open) + len(backward_open) > peak:
+            peak = len(forward_open) + len(backward_open)
+        expanded += 1
+        if len(forward_open) <= len(backward_open):
+            current = heapq.heappop(forward_open)[2]
+            forward_closed.add(current)
+            discovered = []
+            for offset, step in move_table[links[current]]:
+                neighbor = current + offset
+                if neighbor in forward_closed:
+                    continue
+                placeholder = g[current] + weights[neighbor] * step
+                if stamp[neighbor] == generation:
+                    if placeholder >= g[neighbor]:
+                        continue
+                    decreased += 1
+                else:
+                    stamp[neighbor] = generation
+                    forward_order[neighbor] = len(forward_order)
+                    discovered.append(neighbor)
+                g[neighbor] = placeholder
+                parent[neighbor] = current
+                f[neighbor] = placeholder + calculate_heuristic(neighbor, end, width, diagonal_movement, min_weight)
+                heapq.heappush(forward_open, (f[neighbor], forward_order[neighbor], neighbor))
+                if neighbor in backward_g and placeholder + backward_g[neighbor] < best_cost:
+                    meeting, best_cost = neighbor, placeholder + backward_g[neighbor]
+        else:
+            current = heapq.heappop(backward_open)[2]
+            backward_closed.add(current)
+            discovered = []
+            for offset, step in move_table[links[current]]:
+                neighbor = current + offset
+                if neighbor in backward_closed:
+                    continue
+                placeholder = backward_g[current] + weights[current] * step
+                if neighbor in backward_g:
+                    if placeholder >= backward_g[neighbor]:
+                        continue
+                    decreased += 1
+                else:
+                    backward_order[neighbor] = len(backward_order)
+                    discovered.append(neighbor)
+                backward_g[neighbor] = placeholder
+                following[neighbor] = current
+                backward_f[neighbor] = placeholder + calculate_heuristic(neighbor, start, width, diagonal_movement, min_weight)
+                heapq.heappush(backward_open, (backward_f[neighbor], backward_order[neighbor], neighbor))
+                if stamp[neighbor] == generation and g[neighbor] + placeholder < best_cost:
+                    meeting, best_cost = neighbor, g[neighbor] + placeholder
+        if live:
+            touched = len(forward_order) + len(backward_order)
+            stats.step(current, expanded, touched + decreased, touched + decreased - len(forward_open) - len(backward_open),
+                       decreased, peak, touched)
+        yield current, discovered
+    touched = len(forward_order) + len(backward_order)
+    stats.count(expanded, touched + decreased, touched + decreased - len(forward_open) - len(backward_open),
+                decreased, peak, touched)
+    if meeting < 0:
+        return False
+    splice_path(grid, meeting, following)
+    return True
+
+
+# Make sure the algorithm exists and both positions are on the grid, turning a plain 2D list into a Grid.
+def _check_query(grid, start, end, algorithm):
+    if algorithm not in ALGORITHMS:
+        raise ValueError('unknown algorithm {!r}, expected one of {}'.format(algorithm, ', '.join(ALGORITHMS)))
+    if not isinstance(grid, Grid):
+        grid = Grid.from_rows(grid)
+    for x, y in (start, end):
+        if not grid.in_bounds(x, y):
+            raise ValueError('position ({}, {}) is outside the {}x{} grid'.format(x, y, grid.height, grid.width))
+    return grid
+
+
+# Start a search without running any of it. Hands back the algorithm's generator - every next() expands one
+# node and gives back (that node, the nodes it reached for the first time), see above. Its counters go into
+# stats, a SearchStats from stats.py. The grid's search arrays are reset here, so don't start another search
+# on the same grid until this one is finished.
+def search_steps(grid, start, end, algorithm='bfs', diagonal_movement=False, stats=None):
+    grid = _check_query(grid, start, end, algorithm)
+    # jumping over cells only works when they all cost the same.
+    if algorithm == 'jps' and np.count_nonzero(grid.weight_counts) > 1:
+        raise ValueError('jump point search needs every cell to have the same terrain weight')
+    if stats is None:
+        stats = SearchStats(algorithm)
+    start_index = grid.index(*start)
+    end_index = grid.index(*end)
+    grid.reset_search()
+    if algorithm == 'bfs':
+        return _breadth_first(grid, start_index, end_index, diagonal_movement, stats)
+    if algorithm == 'dijkstra':
+        return _dijkstra(grid, start_index, end_index, diagonal_movement, stats)
+    if algorithm == 'dfs':
+        return _depth_first(grid, start_index, end_index, diagonal_movement, stats)
+    if algorithm == 'astar':
+        return _a_star(grid, start_index, end_index, diagonal_movement, stats)
+    if algorithm == 'jps':
+        return _jump_point_search(grid, start_index, end_index, diagonal_movement, stats)
+    if algorithm == 'wavefront':
+        return _wavefront(grid, start_index, end_index, diagonal_movement, stats)
+    if algorithm == 'bibfs':
+        return _bidirectional_breadth_first(grid, start_index, end_index, diagonal_movement, stats)
+    return _bidirectional_a_star(grid, start_index, end_index, diagonal_movement, stats)
+
+
+# Run whatever is left of a search without looking at its steps and return whether it found the end.
+# The yield from and the zero length deque keep the whole loop in C, so skipping the steps costs next to nothing.
+def finish_steps(steps):
+    outcome = []
+
+    def run():
+        outcome.append((yield from steps))
+
+    deque(run(), maxlen=0)
+    return outcome[0]
+
+
+# cache can be a PathCache from cache.py. A result it already has for this grid version is handed back
+# without searching, and a fresh result is stored in it.
+# on_expand is called as on_expand(index, stats) after every node is expanded, for profiling - see stats.py.
+def solve(grid, start, end, algorithm='bfs', diagonal_movement=False, cache=None, on_expand=None):
+    grid = _check_query(grid, start, end, algorithm)
+    if cache is not None:
+        result = cache.get(grid, start, end, algorithm, diagonal_movement)
+        if result is not None:
+            return result
+
+    began = time.perf_counter()
+    stats = SearchStats(algorithm, on_expand)
+    steps = search_steps(grid, start, end, algorithm, diagonal_movement, stats)
+    searching = time.perf_counter()
+    stats.found = finish_steps(steps)
+    retracing = time.perf_counter()
+    end_index = grid.index(*end)
+
+    if not stats.found:
+        path = []
+        cost = 0
+    else:
+        path = _retrace(grid, end_index)
+        cost = path_cost(grid, path)
+    finished = time.perf_counter()
+    stats.setup_time = searching - began
+    stats.search_time = retracing - searching
+    stats.path_time = finished - retracing
+    result = SearchResult(algorithm, path, stats.visited_nodes(), finished - began, stats.expanded, stats.peak_open,
+                          cost, stats)
+    if cache is not None:
+        cache.put(grid, start, end, algorithm, diagonal_movement, result)
+    return result
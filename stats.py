@@ -0,0 +1,98 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Counters for what a search actually did, beyond how many nodes it visited and how long the path is.
+    expanded        nodes taken off the frontier and expanded
+    pushes          entries put on the frontier - the queue, stack or heap. A node on a heap that finds
+                    a cheaper way in gets pushed again, so this can be more than the nodes reached
+    pops            entries taken off the frontier, stale heap entries that get thrown away included
+    decrease_keys   times a node already on the frontier was given a cheaper cost
+    peak_open       the most entries waiting on the frontier at once
+    touched         cells the search wrote any state for. Jump point search also counts every cell its
+                    jumps looked at, since it looks at far more cells than it writes
+    setup_time      seconds spent getting ready - checking the query and resetting the grid
+    search_time     seconds spent searching
+    path_time       seconds spent walking the previous nodes back into a path
+
+The searches in solver.py keep their counters in local variables and only copy them in here once
+they finish, so counting costs next to nothing. Pass live=True, or an on_expand hook, to have them
+copied after every expansion as well - the visualizer does that to show them while a search runs.
+on_expand is called as on_expand(index, stats) right after each node is expanded.
+
+Usage:
+    from solver import solve
+    from stats import save_csv, save_json
+    result = solve(grid, (0, 0), (19, 19), 'astar', on_expand=lambda index, stats: print(index, stats.pushes))
+    print(result.stats)
+    save_json([result.stats], 'runs.json')
+    save_csv([result.stats], 'runs.csv')
+"""
+
+# every column of an exported run, in order.
+FIELDS = ('algorithm', 'found', 'expanded', 'pushes', 'pops', 'decrease_keys', 'peak_open', 'touched',
+          'setup_time', 'search_time', 'path_time')
+
+
+class SearchStats:
+    def __init__(self, algorithm='', on_expand=None, live=False):
+        self.algorithm = algorithm
+        self.on_expand = on_expand
+        # copy the counters in after every expansion, not just at the end.
+        self.live = live or on_expand is not None
+        self.found = False
+        self.expanded = 0
+        self.pushes = 0
+        self.pops = 0
+        self.decrease_keys = 0
+        self.peak_open = 0
+        self.touched = 0
+        self.setup_time = 0.0
+        self.search_time = 0.0
+        self.path_time = 0.0
+
+    # Copy a search's counters in.
+    def count(self, expanded, pushes, pops, decrease_keys, peak_open, touched):
+        self.expanded = expanded
+        self.pushes = pushes
+        self.pops = pops
+        self.decrease_keys = decrease_keys
+        self.peak_open = peak_open
+        self.touched = touched
+
+    # Live searches call this after expanding each node.
+    def step(self, index, expanded, pushes, pops, decrease_keys, peak_open, touched):
+        self.count(expanded, pushes, pops, decrease_keys, peak_open, touched)
+        if self.on_expand is not None:
+            self.on_expand(index, self)
+
+    # Same number the sidebar shows - every expanded node but the start, and the end if it was found.
+    def visited_nodes(self):
+        return max(self.expanded - (2 if self.found else 1), 0)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __repr__(self):
+        return ('SearchStats(algorithm={!r}, found={}, expanded={}, pushes={}, pops={}, decrease_keys={}, peak_open={}, '
+                'touched={}, setup={:.6f}, search={:.6f}, path={:.6f})').format(
+                    self.algorithm, self.found, self.expanded, self.pushes, self.pops, self.decrease_keys,
+                    self.peak_open, self.touched, self.setup_time, self.search_time, self.path_time)
+
+
+# Write a list of runs out as a JSON array, one object per run.
+def save_json(runs, path):
+    # imported here so only saving pays for json and csv, not every import of the solver.
+    import json
+    with open(path, 'w') as stats_file:
+        json.dump([run.as_dict() for run in runs], stats_file, indent=2)
+
+
+# Write a list of runs out as CSV, one row per run.
+def save_csv(runs, path):
+    import csv
+    with open(path, 'w', newline='') as stats_file:
+        writer = csv.DictWriter(stats_file, fieldnames=FIELDS)
+        writer.writeheader()
+        for run in runs:
+            writer.writerow(run.as_dict())
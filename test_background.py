@@ -0,0 +1,53 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks on running a search on a worker thread - what it posts, and stopping or skipping it part way.
+
+Run with:  python -m pytest test_background.py
+"""
+from background import BackgroundSearch
+from grid import Grid
+from solver import solve
+
+
+# Everything the search posted, once it's stopped.
+def messages(search):
+    search.join(5)
+    assert not search.running()
+    posted = []
+    while not search.messages.empty():
+        posted.append(search.messages.get())
+    return posted
+
+
+def test_posts_every_step_then_done():
+    grid = Grid(10, 10)
+    search = BackgroundSearch(grid, (0, 0), (9, 9), 'astar', pace=None)
+    posted = messages(search)
+    kind, found, path = posted[-1]
+    assert (kind, found) == ('done', True)
+    assert [grid.position(index) for index in path] == solve(grid, (0, 0), (9, 9), 'astar').path
+    assert all(kind == 'steps' for kind, *_ in posted[:-1])
+    # the end node is expanded, but the search stops there instead of handing back a step for it.
+    assert sum(len(message[1]) for message in posted[:-1]) == search.stats.expanded - 1
+
+
+def test_skip_posts_the_rest_in_one_batch():
+    grid = Grid(30, 30)
+    # one step every 10 seconds - skip has to wake it up.
+    search = BackgroundSearch(grid, (0, 0), (29, 29), 'bfs', pace=(1, 10))
+    search.skip()
+    posted = messages(search)
+    kinds = [message[0] for message in posted]
+    # at most the one step that ran before the skip, then everything else at once.
+    assert kinds in (['steps', 'done'], ['steps', 'steps', 'done'])
+    assert len(posted[-2][1]) > 100
+    assert sum(len(message[1]) for message in posted[:-1]) == search.stats.expanded - 1
+    assert posted[-1][1] is True
+
+
+def test_cancel_stops_a_wait():
+    search = BackgroundSearch(Grid(30, 30), (0, 0), (29, 29), 'bfs', pace=(1, 10))
+    search.cancel()
+    assert all(message[0] == 'steps' for message in messages(search))
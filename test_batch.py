@@ -0,0 +1,82 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks on the batch solver - good jobs get the same answer solve() gives, and bad ones get an error
+result without stopping the rest of the batch.
+
+Run with:  python -m pytest test_batch.py
+"""
+import io
+
+import pytest
+
+from batch import read_jobs, run_batch
+from grid import Grid
+from maps import save_text
+from solver import solve
+
+
+@pytest.fixture
+def maze(tmp_path):
+    grid = Grid.from_rows([[0, 0, 0, 0], [1, 1, 1, 0], [0, 0, 0, 0]])
+    path = str(tmp_path / 'maze.txt')
+    save_text(grid, path)
+    return grid, path
+
+
+# Every result, by job id.
+def run(jobs, **options):
+    results = {}
+    for result in run_batch(jobs, workers=2, **options):
+        assert result['id'] not in results
+        results[result['id']] = result
+    return results
+
+
+def test_solves_every_job(maze):
+    grid, path = maze
+    jobs = [{'id': number, 'map': path, 'start': [0, 0], 'end': [2, 0], 'algorithm': algorithm}
+            for number, algorithm in enumerate(('bfs', 'astar', 'dijkstra', 'jps'))]
+    results = run(jobs, chunk_size=3, include_path=True)
+    assert sorted(results) == [0, 1, 2, 3]
+    expected = solve(grid, (0, 0), (2, 0), 'astar')
+    for result in results.values():
+        assert 'error' not in result
+        assert result['status'] is True
+        assert result['path_steps'] == len(expected.path) - 1
+        assert result['path_cost'] == expected.path_cost
+        assert [tuple(position) for position in result['path']][0] == (0, 0)
+
+
+def test_bad_jobs_get_errors(maze, tmp_path):
+    _, path = maze
+    lines = [
+        '{"map": "%s", "start": [0, 0], "end": [2, 3]}' % path,
+        'not json',
+        '[1, 2, 3]',
+        '{"map": "%s", "start": [0, 0]}' % path,
+        '{"map": "%s", "start": [0, 0], "end": [9, 9]}' % path,
+        '{"map": "%s", "start": [0, 0], "end": [2, 3], "algorithm": "teleport"}' % path,
+        '{"map": "%s", "start": [0, 0], "end": [2, 3]}' % (tmp_path / 'missing.txt'),
+        '',
+        '{"map": "%s", "start": [2, 0], "end": [0, 3]}' % path,
+    ]
+    results = run(read_jobs(io.StringIO('\n'.join(lines))))
+    assert sorted(results) == [0, 1, 2, 3, 4, 5, 6, 8]
+    assert results[0]['status'] is True and 'error' not in results[0]
+    assert 'not valid JSON' in results[1]['error']
+    assert 'not a JSON object' in results[2]['error']
+    assert 'needs a map, start and end' in results[3]['error']
+    for number in (4, 5):
+        assert results[number]['error']
+    assert 'could not load map' in results[6]['error']
+    assert results[8]['status'] is True and 'error' not in results[8]
+
+
+def test_unreachable_end_is_not_an_error(tmp_path):
+    path = str(tmp_path / 'walled.txt')
+    save_text(Grid.from_rows([[0, 1, 0]]), path)
+    [result] = run([{'map': path, 'start': [0, 0], 'end': [0, 2]}]).values()
+    assert 'error' not in result
+    assert result['status'] is False and result['path_steps'] is None
@@ -0,0 +1,70 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks on PathCache - that asking again is a hit, and that editing the grid never hands back a path
+for the map as it was.
+
+Run with:  python -m pytest test_cache.py
+"""
+import pytest
+
+from cache import PathCache
+from grid import SWAMP, Grid
+from solver import solve
+
+
+def test_asking_again_is_a_hit():
+    grid = Grid(10, 10)
+    cache = PathCache()
+    first = solve(grid, (0, 0), (9, 9), 'astar', cache=cache)
+    assert solve(grid, (0, 0), (9, 9), 'astar', cache=cache) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    # a different question is a different result.
+    solve(grid, (0, 0), (9, 9), 'astar', diagonal_movement=True, cache=cache)
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+
+
+def test_obstacle_edit_misses():
+    grid = Grid(5, 5)
+    cache = PathCache()
+    solve(grid, (0, 0), (0, 4), 'bfs', cache=cache)
+    grid[0][2].value = 1
+    result = solve(grid, (0, 0), (0, 4), 'bfs', cache=cache)
+    assert (0, 2) not in result.path
+    assert cache.hits == 0
+    # and taking the obstacle away again is another new map.
+    grid[0][2].value = 0
+    assert (0, 2) in solve(grid, (0, 0), (0, 4), 'bfs', cache=cache).path
+    assert cache.hits == 0
+
+
+def test_weight_edit_misses():
+    grid = Grid(5, 5)
+    cache = PathCache()
+    solve(grid, (0, 0), (0, 4), 'dijkstra', cache=cache)
+    grid[0][2].weight = SWAMP
+    result = solve(grid, (0, 0), (0, 4), 'dijkstra', cache=cache)
+    assert cache.hits == 0
+    assert (0, 2) not in result.path
+    assert result.path_cost == 6
+    # setting the weight it already has doesn't count as an edit.
+    grid[0][2].weight = SWAMP
+    assert solve(grid, (0, 0), (0, 4), 'dijkstra', cache=cache) is result
+
+
+def test_drops_the_least_recently_used():
+    grid = Grid(5, 5)
+    cache = PathCache(maxsize=2)
+    solve(grid, (0, 0), (4, 4), 'bfs', cache=cache)
+    solve(grid, (0, 0), (4, 4), 'dfs', cache=cache)
+    solve(grid, (0, 0), (4, 4), 'bfs', cache=cache)
+    solve(grid, (0, 0), (4, 4), 'astar', cache=cache)
+    assert len(cache) == 2
+    assert cache.get(grid, (0, 0), (4, 4), 'dfs') is None
+    assert cache.get(grid, (0, 0), (4, 4), 'bfs') is not None
+
+
+def test_needs_room():
+    with pytest.raises(ValueError):
+        PathCache(maxsize=0)
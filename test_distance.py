@@ -0,0 +1,55 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks on distance fields - every cell's distance has to be what Dijkstra's finds from that cell to
+the goal, and walking the field down has to be a real path that costs exactly that.
+
+Run with:  python -m pytest test_distance.py
+"""
+import pytest
+
+from distance import DistanceField, DistanceFields
+from grid import Grid
+from solver import solve
+from test_solver import random_grid, walk
+
+
+@pytest.mark.parametrize('weighted', (False, True), ids=('uniform', 'weighted'))
+@pytest.mark.parametrize('seed', range(10))
+def test_matches_dijkstra(seed, weighted):
+    grid, _, goal = random_grid(seed, weighted)
+    field = DistanceField(grid, goal)
+    for x in range(grid.height):
+        for y in range(grid.width):
+            if grid.cells[grid.index(x, y)] == 1:
+                assert not field.reachable((x, y))
+                continue
+            expected = solve(grid, (x, y), goal, 'dijkstra')
+            assert field.reachable((x, y)) == expected.status
+            if not expected.status:
+                assert field.distance((x, y)) is None and field.path((x, y)) == []
+                continue
+            assert field.distance((x, y)) == expected.path_cost
+            path = field.path((x, y))
+            assert path[0] == (x, y) and path[-1] == goal
+            assert walk(grid, path, False) == expected.path_cost
+
+
+def test_goal_on_obstacle_reaches_nothing():
+    grid = Grid.from_rows([[0, 0], [0, 1]])
+    field = DistanceField(grid, (1, 1))
+    assert field.reached == 0
+    assert not field.reachable((0, 0))
+
+
+def test_fields_are_kept_per_version_and_goal():
+    grid = Grid(6, 6)
+    fields = DistanceFields(maxsize=2)
+    field = fields.get(grid, (5, 5))
+    assert fields.get(grid, (5, 5)) is field
+    assert fields.get(grid, (0, 5)) is not field
+    grid[3][3].value = 1
+    edited = fields.get(grid, (5, 5))
+    assert edited is not field and not edited.reachable((3, 3))
+    assert (fields.hits, fields.misses, len(fields)) == (1, 3, 2)
@@ -0,0 +1,80 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks on the HPA* planner against Dijkstra's on seeded random grids big enough for a few clusters.
+HPA* doesn't always find the cheapest path, so it's held to:
+    - it finds a path exactly when Dijkstra's does
+    - every path is a real one - each step moves to an open neighbor, and path_cost adds up
+    - no path is cheaper than Dijkstra's
+and the same again after edits, which only rebuild the clusters they touched.
+
+Run with:  python -m pytest test_hierarchical.py
+"""
+import random
+
+import pytest
+
+from grid import GRASS, ROAD, SWAMP, Grid
+from hierarchical import HierarchicalPlanner
+from solver import solve
+from test_solver import walk
+
+
+# A random grid with about a quarter of it obstacles. weighted grids mix road, grass and swamp.
+def random_grid(rng, weighted):
+    width = rng.randint(10, 30)
+    height = rng.randint(10, 30)
+    rows = [[1 if rng.random() < 0.25 else 0 for _ in range(width)] for _ in range(height)]
+    weights = None
+    if weighted:
+        weights = [[rng.choice((ROAD, GRASS, SWAMP)) for _ in range(width)] for _ in range(height)]
+    return Grid.from_rows(rows, weights)
+
+
+def check(planner, grid, start, end):
+    result = planner.find_path(start, end)
+    expected = solve(grid, start, end, 'dijkstra')
+    assert result.status == expected.status
+    if not result.status:
+        assert result.path == []
+        return
+    assert result.path[0] == start and result.path[-1] == end
+    assert walk(grid, result.path, False) == result.path_cost
+    assert result.path_cost >= expected.path_cost
+
+
+@pytest.mark.parametrize('weighted', (False, True), ids=('uniform', 'weighted'))
+@pytest.mark.parametrize('seed', range(10))
+def test_paths_are_real(seed, weighted):
+    rng = random.Random(seed)
+    grid = random_grid(rng, weighted)
+    open_cells = [grid.position(index) for index in range(grid.size) if grid.cells[index] != 1]
+    planner = HierarchicalPlanner(grid, cluster_size=rng.choice((4, 5, 8)))
+    for _ in range(10):
+        start, end = rng.sample(open_cells, 2)
+        check(planner, grid, start, end)
+    # flip some cells and ask again - the planner only rebuilds what the edits touched.
+    for _ in range(20):
+        x, y = rng.randrange(grid.height), rng.randrange(grid.width)
+        grid[x][y].value = 0 if grid[x][y].value == 1 else 1
+    open_cells = [grid.position(index) for index in range(grid.size) if grid.cells[index] != 1]
+    for _ in range(10):
+        start, end = rng.sample(open_cells, 2)
+        check(planner, grid, start, end)
+    planner.close()
+
+
+def test_crosses_clusters_on_open_ground():
+    grid = Grid(16, 16)
+    planner = HierarchicalPlanner(grid, cluster_size=4)
+    result = planner.find_path((0, 0), (15, 15))
+    assert result.path_cost == 30
+    planner.close()
+
+
+def test_off_the_grid():
+    planner = HierarchicalPlanner(Grid(8, 8), cluster_size=4)
+    with pytest.raises(ValueError):
+        planner.find_path((0, 0), (8, 0))
+    planner.close()
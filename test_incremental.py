@@ -0,0 +1,87 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks on the LPA* planner - after every edit, its path has to be as cheap as a fresh Dijkstra's
+search on the edited grid, and an edit far from the path shouldn't mean searching everything again.
+
+Run with:  python -m pytest test_incremental.py
+"""
+import random
+
+import pytest
+
+from grid import GRASS, ROAD, SWAMP, Grid
+from incremental import IncrementalPlanner
+from solver import solve
+
+
+# Walk the path and make sure every step moves to an open neighbor. Returns what it cost.
+def walk(grid, path):
+    cost = 0
+    for (x, y), (next_x, next_y) in zip(path, path[1:]):
+        assert abs(next_x - x) + abs(next_y - y) == 1
+        assert grid.cells[grid.index(next_x, next_y)] != 1
+        cost += grid.weights[grid.index(next_x, next_y)]
+    return cost
+
+
+def check(planner, grid, start, end):
+    result = planner.plan()
+    expected = solve(grid, start, end, 'dijkstra')
+    assert result.status == expected.status
+    if result.status:
+        assert result.path[0] == start and result.path[-1] == end
+        assert walk(grid, result.path) == result.path_cost == pytest.approx(expected.path_cost)
+    return result
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_matches_dijkstra_after_edits(seed):
+    rng = random.Random(seed)
+    grid = Grid(12, 12)
+    start, end = (0, 0), (11, 11)
+    planner = IncrementalPlanner(grid, start, end)
+    check(planner, grid, start, end)
+    for _ in range(40):
+        x, y = rng.randrange(12), rng.randrange(12)
+        if (x, y) in (start, end):
+            continue
+        if rng.random() < 0.3:
+            grid[x][y].weight = rng.choice((ROAD, GRASS, SWAMP))
+        else:
+            grid[x][y].value = 0 if grid[x][y].value == 1 else 1
+        check(planner, grid, start, end)
+    planner.close()
+
+
+def test_walls_off_and_reopens():
+    grid = Grid(5, 5)
+    planner = IncrementalPlanner(grid, (0, 0), (4, 4))
+    assert check(planner, grid, (0, 0), (4, 4)).status
+    for y in range(5):
+        grid[2][y].value = 1
+    assert not check(planner, grid, (0, 0), (4, 4)).status
+    grid[2][4].value = 0
+    assert (2, 4) in check(planner, grid, (0, 0), (4, 4)).path
+    planner.close()
+
+
+def test_small_edit_is_a_small_replan():
+    grid = Grid(30, 30)
+    planner = IncrementalPlanner(grid, (0, 0), (0, 29))
+    first = planner.plan()
+    # an obstacle nowhere near the straight path along the top row.
+    grid[29][0].value = 1
+    assert planner.plan().expanded < first.expanded
+    planner.close()
+
+
+def test_moving_the_end_starts_over():
+    grid = Grid(6, 6)
+    planner = IncrementalPlanner(grid, (0, 0), (5, 5))
+    planner.plan()
+    planner.move((0, 0), (0, 5))
+    assert planner.stale()
+    check(planner, grid, (0, 0), (0, 5))
+    planner.close()
@@ -0,0 +1,83 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks on what the visualizer draws. They open pygame's dummy display, so no window shows up.
+
+Run with:  python -m pytest test_main.py
+"""
+import os
+
+import numpy as np
+import pytest
+
+pygame = pytest.importorskip('pygame')
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def visualizer():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    main.load_pygame()
+    pygame.init()
+    main.setup(5, 5)
+    yield
+    pygame.quit()
+
+
+# Swap render_text for one that remembers the text it was asked for.
+def record_text(monkeypatch):
+    drawn = []
+
+    def render_text(font_name, text, color):
+        drawn.append(text)
+        return pygame.Surface((1, 1))
+
+    monkeypatch.setattr(main, 'render_text', render_text)
+    return drawn
+
+
+def test_distance_overlay_shows_distances(visualizer, monkeypatch):
+    main.grid[0][4].value = 3
+    main.draw_distance_field()
+    drawn = record_text(monkeypatch)
+    main.print_cost_values(np.arange(5))
+    # the end node itself is 0 away, and 0 is never written.
+    assert drawn == ['4', '3', '2', '1']
+
+
+def test_search_overlay_shows_costs(visualizer, monkeypatch):
+    main.grid[0][0].value = 2
+    main.grid[0][4].value = 3
+    main.start_search('dijkstra')
+    main.search.join()
+    main.update_search()
+    drawn = record_text(monkeypatch)
+    main.print_cost_values(np.arange(5))
+    assert drawn == ['1', '2', '3', '4']
+
+
+def test_four_way_modes_turn_diagonal_movement_off(visualizer):
+    main.grid[0][0].value = 2
+    main.grid[0][4].value = 3
+    main.toggle_diagonal()
+    assert main.diagonal_movement
+    main.lpa_start()
+    assert not main.diagonal_movement
+    # the toggle can't turn it back on while LPA* is replanning.
+    main.toggle_diagonal()
+    assert not main.diagonal_movement
+    main.render_sidebar()
+    main.stop_incremental()
+    main.toggle_diagonal()
+    assert main.diagonal_movement
+    main.show_hierarchical()
+    assert not main.diagonal_movement
+    main.toggle_diagonal()
+    main.show_distance_field = True
+    main.draw_distance_field()
+    assert not main.diagonal_movement
+    main.toggle_diagonal()
+    assert not main.diagonal_movement
+    main.show_distance_field = False
@@ -0,0 +1,99 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks that every map format in maps.py gives back the grid that was saved, as far as the format can
+hold it, and that .scen files give back their queries.
+
+Run with:  python -m pytest test_maps.py
+"""
+import numpy as np
+import pytest
+
+from grid import GRASS, ROAD, SWAMP, Grid
+from maps import Scenario, load_map, load_scenarios, save_map, save_scenarios
+
+
+# A small map with obstacles, a start and end node, every terrain, and a leftover search visual.
+def sample_grid():
+    return Grid.from_rows(
+        [[2, 0, 1, 0, 0],
+         [0, 1, 1, 0, 0],
+         [0, 0, 0, 4, 3]],
+        [[ROAD, GRASS, ROAD, SWAMP, ROAD],
+         [SWAMP, ROAD, ROAD, ROAD, GRASS],
+         [ROAD, ROAD, SWAMP, ROAD, ROAD]])
+
+
+def same_grid(loaded, grid, cells):
+    assert (loaded.width, loaded.height) == (grid.width, grid.height)
+    assert loaded.cells.tolist() == cells.tolist()
+    assert np.array_equal(loaded.links, grid.links)
+
+
+@pytest.mark.parametrize('extension', ('.txt', '.grid'))
+def test_round_trip(tmp_path, extension):
+    grid = sample_grid()
+    path = str(tmp_path / ('sample' + extension))
+    save_map(grid, path)
+    loaded = load_map(path)
+    # the visited cell comes back blank.
+    cells = np.where(grid.cells == 4, 0, grid.cells)
+    same_grid(loaded, grid, cells)
+    assert loaded.weights.tolist() == grid.weights.tolist()
+    assert (loaded.start, loaded.end) == (grid.start, grid.end)
+    assert loaded.weight_counts.tolist() == grid.weight_counts.tolist()
+
+
+def test_movingai_round_trip(tmp_path):
+    grid = sample_grid()
+    path = str(tmp_path / 'sample.map')
+    save_map(grid, path)
+    loaded = load_map(path)
+    # no start or end in a .map, and grass comes back as plain ground.
+    cells = np.where(grid.cells == 1, 1, 0)
+    same_grid(loaded, grid, cells)
+    assert loaded.weights.tolist() == np.where(grid.weights == GRASS, ROAD, grid.weights).tolist()
+    assert loaded.start is None and loaded.end is None
+
+
+def test_grid_header_matches_a_fresh_count(tmp_path):
+    grid = sample_grid()
+    path = str(tmp_path / 'sample.grid')
+    save_map(grid, path)
+    loaded = load_map(path)
+    recounted = Grid.from_arrays(loaded.width, loaded.height, loaded.cells.copy(), loaded.weights.copy())
+    assert loaded.weight_counts.tolist() == recounted.weight_counts.tolist()
+    assert (loaded.start, loaded.end) == (recounted.start, recounted.end)
+    assert loaded.min_weight() == ROAD
+
+
+def test_edits_never_reach_the_grid_file(tmp_path):
+    path = str(tmp_path / 'sample.grid')
+    save_map(sample_grid(), path)
+    loaded = load_map(path)
+    loaded[0][1].value = 1
+    loaded[0][0].weight = SWAMP
+    again = load_map(path)
+    assert again[0][1].value == 0 and again[0][0].weight == ROAD
+
+
+def test_bad_grid_files(tmp_path):
+    path = tmp_path / 'bad.grid'
+    path.write_bytes(b'not a grid')
+    with pytest.raises(ValueError):
+        load_map(str(path))
+    save_map(sample_grid(), str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        load_map(str(path))
+
+
+def test_scenario_round_trip(tmp_path):
+    scenarios = [Scenario(0, 'sample.map', 5, 3, (0, 0), (2, 4), 6.0),
+                 Scenario(1, 'sample.map', 5, 3, (2, 0), (0, 4), 7.5)]
+    path = str(tmp_path / 'sample.map.scen')
+    save_scenarios(scenarios, path)
+    loaded = list(load_scenarios(path))
+    assert [(s.bucket, s.map_path, s.width, s.height, s.start, s.end, s.optimal_length) for s in loaded] == [
+        (s.bucket, s.map_path, s.width, s.height, s.start, s.end, s.optimal_length) for s in scenarios]
@@ -0,0 +1,155 @@
+"""
+Author: Jarett Sutula
+Pathfinding Algorithms Thesis Project
+
+Checks every algorithm in solver.py against Dijkstra's on seeded random grids, moving 4 ways and 8 ways.
+Dijkstra's always finds the cheapest path, and it's the simplest of the searches, so it's the one the
+others are held to:
+    - every algorithm finds a path exactly when Dijkstra's does
+    - every path is a real one - each step moves to a neighbor it's allowed to, and path_cost adds up
+    - Dijkstra's, A*, JPS and bidirectional A* find paths as cheap as Dijkstra's
+    - BFS, bidirectional BFS and the wavefront ignore weights, so they find paths with the fewest steps
+    - DFS only has to find some path
+JPS only runs on grids where every cell costs the same, so it's only checked on those.
+
+Run with:  python -m pytest test_solver.py
+"""
+import math
+import random
+
+import pytest
+
+from grid import GRASS, ROAD, SWAMP, Grid
+from solver import ALGORITHMS, solve
+
+SEEDS = range(20)
+CHEAPEST = ('dijkstra', 'astar', 'jps', 'biastar')
+FEWEST_STEPS = ('bfs', 'bibfs', 'wavefront')
+
+
+# A random grid with about a quarter of it obstacles. weighted grids mix road, grass and swamp.
+def random_grid(seed, weighted):
+    rng = random.Random(seed)
+    width = rng.randint(2, 16)
+    height = rng.randint(2, 16)
+    rows = [[1 if rng.random() < 0.25 else 0 for _ in range(width)] for _ in range(height)]
+    weights = None
+    if weighted:
+        weights = [[rng.choice((ROAD, GRASS, SWAMP)) for _ in range(width)] for _ in range(height)]
+    open_cells = [(x, y) for x in range(height) for y in range(width) if rows[x][y] != 1]
+    if len(open_cells) < 2:
+        rows[0][0] = rows[-1][-1] = 0
+        open_cells = [(0, 0), (height - 1, width - 1)]
+    start, end = rng.sample(open_cells, 2)
+    return Grid.from_rows(rows, weights), start, end
+
+
+# Walk the path and make sure every step is one the search was allowed to take. Returns what it cost.
+def walk(grid, path, diagonal_movement):
+    cost = 0
+    for (x, y), (next_x, next_y) in zip(path, path[1:]):
+        assert grid.cells[grid.index(next_x, next_y)] != 1
+        dx, dy = next_x - x, next_y - y
+        if dx and dy:
+            assert diagonal_movement and abs(dx) == abs(dy) == 1
+            # no cutting the corner of an obstacle.
+            assert grid.cells[grid.index(x + dx, y)] != 1 and grid.cells[grid.index(x, y + dy)] != 1
+            cost += math.sqrt(2) * grid.weights[grid.index(next_x, next_y)]
+        else:
+            assert abs(dx) + abs(dy) == 1
+            cost += grid.weights[grid.index(next_x, next_y)]
+    return cost
+
+
+# The fewest steps from start to end, by a plain BFS over the moves walk allows. None if there's no path.
+def fewest_steps(grid, start, end, diagonal_movement):
+    moves = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if diagonal_movement:
+        moves += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+    steps = {start: 0}
+    frontier = [start]
+    while frontier:
+        next_frontier = []
+        for x, y in frontier:
+            for dx, dy in moves:
+                if (x + dx, y + dy) in steps or not grid.in_bounds(x + dx, y + dy):
+                    continue
+                if grid.cells[grid.index(x + dx, y + dy)] == 1:
+                    continue
+                if dx and dy and (grid.cells[grid.index(x + dx, y)] == 1 or grid.cells[grid.index(x, y + dy)] == 1):
+                    continue
+                steps[x + dx, y + dy] = steps[x, y] + 1
+                next_frontier.append((x + dx, y + dy))
+        frontier = next_frontier
+    return steps.get(end)
+
+
+@pytest.mark.parametrize('diagonal_movement', (False, True), ids=('4-way', '8-way'))
+@pytest.mark.parametrize('weighted', (False, True), ids=('uniform', 'weighted'))
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_matches_dijkstra(seed, algorithm, weighted, diagonal_movement):
+    if algorithm == 'jps' and weighted:
+        pytest.skip("JPS only runs on grids where every cell costs the same")
+    grid, start, end = random_grid(seed, weighted)
+    expected = solve(grid, start, end, 'dijkstra', diagonal_movement)
+    result = solve(grid, start, end, algorithm, diagonal_movement)
+
+    assert result.status == expected.status == (fewest_steps(grid, start, end, diagonal_movement) is not None)
+    if not result.status:
+        assert result.path == []
+        return
+    assert result.path[0] == start and result.path[-1] == end
+    assert walk(grid, result.path, diagonal_movement) == pytest.approx(result.path_cost)
+    if algorithm in CHEAPEST:
+        assert result.path_cost == pytest.approx(expected.path_cost)
+    if algorithm in FEWEST_STEPS:
+        assert len(result.path) - 1 == fewest_steps(grid, start, end, diagonal_movement)
+
+
+@pytest.mark.parametrize('diagonal_movement', (False, True), ids=('4-way', '8-way'))
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_end_on_obstacle(algorithm, diagonal_movement):
+    grid = Grid.from_rows([[0, 0, 0], [0, 0, 0], [0, 0, 1]])
+    assert not solve(grid, (0, 0), (2, 2), algorithm, diagonal_movement).status
+
+
+# JPS keeps where its jumps stop on the grid, so an edit has to make it work them out again.
+@pytest.mark.parametrize('diagonal_movement', (False, True), ids=('4-way', '8-way'))
+def test_jps_sees_edits(diagonal_movement):
+    grid = Grid(5, 5)
+    assert solve(grid, (0, 0), (4, 4), 'jps', diagonal_movement).status
+    for y in range(5):
+        grid[2][y].value = 1
+    assert not solve(grid, (0, 0), (4, 4), 'jps', diagonal_movement).status
+    grid[2][3].value = 0
+    result = solve(grid, (0, 0), (4, 4), 'jps', diagonal_movement)
+    assert (2, 3) in result.path
+    assert result.path_cost == solve(grid, (0, 0), (4, 4), 'dijkstra', diagonal_movement).path_cost
+
+
+# An obstacle under the start node doesn't stop the searches walking off it, the same as Dijkstra's -
+# and the wavefront has to finish either way rather than keep growing an empty layer.
+@pytest.mark.parametrize('diagonal_movement', (False, True), ids=('4-way', '8-way'))
+def test_wavefront_start_on_obstacle(diagonal_movement):
+    grid = Grid.from_rows([[1, 0, 0], [0, 0, 0], [0, 0, 0]])
+    expected = solve(grid, (0, 0), (2, 2), 'dijkstra', diagonal_movement)
+    assert solve(grid, (0, 0), (2, 2), 'wavefront', diagonal_movement).status == expected.status
+    walled = Grid.from_rows([[1, 1, 0], [1, 1, 0], [0, 0, 0]])
+    assert not solve(walled, (0, 0), (2, 2), 'wavefront', diagonal_movement).status
+
+
+# The wavefront writes every cell's layer - how many steps it is from the start - into grid.cost.
+# Cells past the end's layer were never reached, and read as 0.
+@pytest.mark.parametrize('diagonal_movement', (False, True), ids=('4-way', '8-way'))
+def test_wavefront_costs_are_layers(diagonal_movement):
+    grid = Grid.from_rows([[0, 0, 0, 0, 0], [0, 1, 1, 1, 0], [0, 0, 0, 1, 0], [0, 0, 0, 0, 0]])
+    assert solve(grid, (0, 0), (2, 2), 'wavefront', diagonal_movement).status
+    end_layer = fewest_steps(grid, (0, 0), (2, 2), diagonal_movement)
+    for x in range(grid.height):
+        for y in range(grid.width):
+            layer = fewest_steps(grid, (0, 0), (x, y), diagonal_movement)
+            if grid.cells[grid.index(x, y)] == 1 or layer > end_layer:
+                assert grid[x][y].cost == 0
+            else:
+                assert grid[x][y].cost == layer